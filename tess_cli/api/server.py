@@ -1,6 +1,10 @@
 import os
 import sys
+import json
+import asyncio
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -171,6 +175,52 @@ async def update_config(request: ConfigRequest):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+def _describe_action(action_response):
+    """Turns an executed action into the short text shown in the web UI."""
+    action_type = action_response.get("action")
+    response_text = "Task executed successfully."
+    
+    if action_type == "reply_op":
+        response_text = action_response.get("content")
+    elif action_type == "error":
+        response_text = f"Error: {action_response.get('reason')}"
+    elif action_type == "whatsapp_op":
+        sub = action_response.get("sub_action")
+        contact = action_response.get("contact")
+        if sub == "monitor":
+            response_text = f"Now monitoring WhatsApp chat with {contact}. I'll alert you to new messages."
+        else:
+            response_text = f"WhatsApp message sent to {contact}."
+    elif action_type == "launch_app":
+        response_text = f"Launched {action_response.get('app_name')}."
+    elif action_type == "execute_command":
+         response_text = "PowerShell command executed."
+    return response_text
+
+async def _run_chat_turn(brain, user_input, on_token=None):
+    """Generate -> security check -> execute. Returns the /api/chat response body."""
+    # 1. GENERATE (native async, keeps the event loop free for other chats)
+    action_response = await brain.agenerate_command(user_input, on_token=on_token)
+    
+    # 2. SECURITY CHECK
+    is_safe, reason = security.validate_action(action_response)
+    if not is_safe:
+        return {
+            "response": f"🛡️ SECURITY BLOCK: {reason}",
+            "action_log": "Action blocked by Guardian.",
+            "status": "blocked"
+        }
+        
+    # 3. EXECUTE (Full Orchestrator; tools are blocking, so off the loop)
+    await run_in_threadpool(process_action, action_response, components, brain)
+    
+    # 4. CAPTURE RESPONSE
+    return {
+        "response": _describe_action(action_response),
+        "action_log": str(action_response),
+        "status": "success"
+    }
+
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
     user_input = request.message
@@ -180,47 +230,7 @@ async def chat(request: ChatRequest):
     try:
         # Get isolated brain for this user
         brain = profiles.get_brain(user_id)
-        
-        # 1. GENERATE
-        action_response = brain.generate_command(user_input)
-        
-        # 2. SECURITY CHECK
-        is_safe, reason = security.validate_action(action_response)
-        if not is_safe:
-            return {
-                "response": f"🛡️ SECURITY BLOCK: {reason}",
-                "action_log": "Action blocked by Guardian.",
-                "status": "blocked"
-            }
-            
-        # 3. EXECUTE (Full Orchestrator)
-        process_action(action_response, components, brain)
-        
-        # 4. CAPTURE RESPONSE
-        action_type = action_response.get("action")
-        response_text = "Task executed successfully."
-        
-        if action_type == "reply_op":
-            response_text = action_response.get("content")
-        elif action_type == "error":
-            response_text = f"Error: {action_response.get('reason')}"
-        elif action_type == "whatsapp_op":
-            sub = action_response.get("sub_action")
-            contact = action_response.get("contact")
-            if sub == "monitor":
-                response_text = f"Now monitoring WhatsApp chat with {contact}. I'll alert you to new messages."
-            else:
-                response_text = f"WhatsApp message sent to {contact}."
-        elif action_type == "launch_app":
-            response_text = f"Launched {action_response.get('app_name')}."
-        elif action_type == "execute_command":
-             response_text = "PowerShell command executed."
-             
-        return {
-            "response": response_text,
-            "action_log": str(action_response),
-            "status": "success"
-        }
+        return await _run_chat_turn(brain, user_input)
 
     except Exception as e:
         return {
@@ -229,6 +239,45 @@ async def chat(request: ChatRequest):
             "status": "error"
         }
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Same as /api/chat, but streamed as NDJSON:
+    {"type": "delta", "content": ...} lines while the reply is generated,
+    then one {"type": "done", ...} line carrying the usual /api/chat body.
+    """
+    print(f"🌐 [WEB] User ({request.user_id}) [stream]: {request.message}")
+    queue = asyncio.Queue()
+
+    async def turn():
+        try:
+            brain = profiles.get_brain(request.user_id)
+            result = await _run_chat_turn(
+                brain, request.message,
+                on_token=lambda d: queue.put_nowait({"type": "delta", "content": d})
+            )
+        except Exception as e:
+            result = {"response": f"Error: {str(e)}", "action_log": str(e), "status": "error"}
+        queue.put_nowait({"type": "done", **result})
+
+    async def events():
+        task = asyncio.create_task(turn())
+        try:
+            while True:
+                event = await queue.get()
+                yield json.dumps(event) + "\n"
+                if event["type"] == "done":
+                    break
+        finally:
+            if not task.done(): task.cancel() # Client went away
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Closes pooled LLM connections when uvicorn stops."""
+    await profiles.aclose()
+
 # Serve Static Files (The Frontend)
 # We expect src/web to exist
 web_path = os.path.join(os.path.dirname(__file__), '../web')
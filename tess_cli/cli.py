@@ -137,6 +137,31 @@ def main():
             logger.error(e, exc_info=True)
         return
 
+    # Fast Exit for Knowledge-Base Snapshots: tess kb export|import <file>
+    if len(sys.argv) > 1 and sys.argv[1].lower() == "kb":
+        action = sys.argv[2].lower() if len(sys.argv) > 2 else ""
+        if action not in ("export", "import") or len(sys.argv) < 4:
+            print_info("Usage: tess kb export <file>  |  tess kb import <file>")
+            return
+        target = sys.argv[3]
+        try:
+            kb = KnowledgeBase()
+            progress = lambda s: print(f"{action.capitalize()}ed {s['chunks']}/{s['total']} chunks...", end="\r")
+            if action == "export":
+                result = kb.export_snapshot(target, progress=progress)
+            else:
+                result = kb.import_snapshot(target, progress=progress)
+            print()
+            if result.startswith("Error") or not kb.available:
+                print_error(result)
+                sys.exit(1)
+            print_success(result)
+        except Exception as e:
+            print_error(f"Knowledge-base {action} failed: {e}")
+            logger.error(e, exc_info=True)
+            sys.exit(1)
+        return
+
     print_banner()
 
     # Core Initialization
@@ -311,6 +336,7 @@ def main():
             print_error(f"Error: {e}")
             logger.error(e, exc_info=True)
 
+    profiles.close()
     print_goodbye(user_profile.name)
 
 if __name__ == "__main__":
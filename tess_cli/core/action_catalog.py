@@ -0,0 +1,218 @@
+import math
+import re
+import threading
+from .schemas import TessAction
+from .logger import setup_logger
+
+logger = setup_logger("ActionCatalog")
+
+# Hand-written usage notes, in prompt order. These used to be inlined in
+# Config.get_system_prompt; actions missing here get a line generated from schemas.py.
+ACTION_DOCS = {
+    "final_reply": "- final_reply: Use 'content' for the final message.\n",
+    "reply_op": "- reply_op: Use 'content' for the chat message.\n",
+    "launch_app": "- launch_app: Use 'app_name' or 'content'.\n",
+    "system_control": "- system_control: sub_action ('screenshot', 'lock', etc.).\n",
+    "execute_command": "- execute_command: Use 'command' or 'content'. REQUIRED.\n",
+    "file_op": "- file_op: sub_action ('read', 'list', 'write'). Use 'path' and 'content'.\n",
+    "web_search_op": "- web_search_op: Use 'query' or 'content'. finds info, not for playing music.\n",
+    "web_op": "- web_op: Use 'url' or 'content'. Extracts text. DO NOT use for YouTube.\n",
+    "youtube_op": (
+        "- youtube_op: sub_action ('play', 'pause', 'next', 'stop'). Use 'query' for 'play'. STRICTLY for playing music. Example: play='him and i', stop=sub_action 'stop'.\n"
+        "  * CRITICAL: TESS manages its own headless browser. DO NOT check if Chrome is open or try to launch 'youtube' first.\n"
+        "  * CRITICAL: If YouTube fails, DO NOT fallback to web_search. Report the error.\n"
+    ),
+    "gmail_op": "- gmail_op: Use 'to', 'subject', 'body'.\n",
+    "calendar_op": "- calendar_op: Use 'summary', 'start'.\n",
+    "pdf_op": (
+        "- pdf_op: sub_action ('merge', 'split', 'extract_text', 'replace_text', 'create'). Use 'source', 'output_name', 'pages', 'search', 'replace', 'content'.\n"
+        "  * merge (source: 'file1,file2'), split (pages: '1-5'), extract_text, replace_text\n"
+    ),
+    "code_op": (
+        "- code_op(sub_action, filename, content, pattern, search, replace): \n"
+        "  * scaffold, write, execute, test, fix\n"
+        "  * analyze, outline, replace_block, ls\n"
+        "  * ralph_build: Launch the autonomous GSD builder loop for an entire directory. Use path='path/to/project'.\n"
+    ),
+    "git_op": "- git_op(sub_action, message): status, commit, push, log, diff.\n",
+    "whatsapp_op": (
+        "- whatsapp_op: Use 'contact' and 'message'.\n"
+        "  * sub_action='send'. Use this to literally SEND a message to someone on WhatsApp.\n"
+        "  * sub_action='monitor' or 'chat'. Use this to just OPEN the chat window.\n"
+        "  * CRITICAL: If user asks you to 'tell X something', 'talk to X', or 'message X', USE THIS TOOL. DO NOT say you cannot send messages.\n"
+    ),
+    "instagram_op": (
+        "- instagram_op: Use 'username' and 'message' (if sending).\n"
+        "  * sub_action='authenticate'. Run this ONCE if the user asks you to log into Instagram.\n"
+        "  * sub_action='send'. Use this to autonomously send a DM to an Instagram username without opening the UI.\n"
+        "  * sub_action='read'. Use this to read the recent chat history with a username BEFORE replying to them.\n"
+        "  * sub_action='monitor' or 'chat'. Use this to visibly open the DM conversation with a username.\n"
+    ),
+    "experimental_op": "- experimental_op: sub_action ('toggle_privacy', 'simulate'). Use 'target' for simulation.\n",
+    "presentation_op": "- presentation_op: topic, count, style ('modern', 'classic', 'tech', 'minimal', 'gaia', 'uncover'), format ('pptx', 'md'), output_name.\n",
+    "broadcast_op": "- broadcast_op: sub_action ('start', 'stop'). Streams screen to phone/other devices.\n",
+    "vault_op": (
+        "- vault_op: sub_action ('store', 'get', 'list', 'delete'). Use 'key' and 'value' (for store).\n"
+        "  * Secure storage for sensitive API keys, passwords, or personal secrets.\n"
+        "  * Use 'get' to retrieve a secret. NEVER reveal secrets unless explicitly asked.\n"
+    ),
+    "memory_op": (
+        "- memory_op: sub_action ('remember', 'recall', 'forget'). Use 'content' (fact) or 'query'.\n"
+        "  * Explicitly store user facts/details. E.g. 'Remember that my favorite color is blue'.\n"
+    ),
+    "pentest_op": (
+        "- pentest_op: sub_action ('scan'). Use 'target'. Example: target='127.0.0.1'.\n"
+        "  * Launch network vulnerability mapping via Nmap. Only use on permitted local targets.\n"
+    ),
+    "rag_op": (
+        "- rag_op: sub_action ('index', 'query'). Use 'path' for index, 'query' for query.\n"
+        "  * Indexes local documents (PDF, TXT, MD, DOCX) into a vector database for semantic search.\n"
+    ),
+    "coding_mode_op": (
+        "- coding_mode_op: sub_action ('enter'). Optional 'path' to specify workspace directory.\n"
+        "  * Enters an interactive coding agent mode (like Claude Code). Use when the user wants to do complex multi-step coding work.\n"
+    ),
+}
+
+# Words users say that the docs don't, per action
+ACTION_KEYWORDS = {
+    "launch_app": "open launch start app application program",
+    "system_control": "volume mute louder quieter screenshot lock sleep shutdown restart type press key media pause song track",
+    "execute_command": "run command powershell terminal shell install process service script",
+    "file_op": "file folder directory read write save list open document txt",
+    "web_search_op": "search google find look up news weather who what when price latest",
+    "web_op": "website page url scrape link article",
+    "youtube_op": "youtube music song video play listen watch",
+    "gmail_op": "email mail inbox gmail send",
+    "calendar_op": "calendar meeting schedule event appointment tomorrow today",
+    "pdf_op": "pdf merge split extract",
+    "code_op": "code script program function bug error debug python javascript project build test",
+    "git_op": "git commit push repo repository branch diff",
+    "whatsapp_op": "whatsapp message text tell chat send call",
+    "instagram_op": "instagram insta dm message",
+    "experimental_op": "simulate predict what if privacy",
+    "presentation_op": "presentation slides slide deck ppt powerpoint",
+    "broadcast_op": "broadcast stream screen share cast phone",
+    "vault_op": "vault password secret key api token credential",
+    "memory_op": "remember recall forget memory favorite",
+    "pentest_op": "pentest scan nmap port vulnerability network",
+    "rag_op": "index documents knowledge search docs",
+    "coding_mode_op": "coding mode workspace refactor codebase",
+    "research_op": "research report deep dive topic",
+    "trip_planner_op": "trip travel plan itinerary vacation flight hotel",
+    "planner_op": "plan goal steps",
+    "organize_op": "organize sort clean tidy folder",
+    "converter_op": "convert image jpg png docx pdf",
+    "sysadmin_op": "wifi bluetooth battery system info microphone mic",
+    "design_op": "design post poster quote image instagram",
+    "knowledge_op": "learn knowledge index search",
+    "task_op": "task background job stop",
+}
+
+# Always offered: the model must be able to answer or fall back to a shell command
+ALWAYS_INCLUDED = ("final_reply", "reply_op", "execute_command")
+
+_STOPWORDS = {
+    "the", "and", "for", "use", "with", "this", "that", "you", "your", "are", "not", "can", "from",
+    "into", "please", "tess", "what", "how", "then", "when", "just", "only", "all", "any", "me", "my",
+}
+
+
+def _tokens(text):
+    words = re.findall(r"[a-z0-9]+", str(text).lower().replace("_", " "))
+    return [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words if len(w) > 1 and w not in _STOPWORDS]
+
+
+def _schema_doc(model):
+    """One-line doc for a schema action that has no hand-written notes."""
+    fields = model.model_fields
+    action = fields["action"].annotation.__args__[0]
+    parts = []
+    if "sub_action" in fields:
+        options = getattr(fields["sub_action"].annotation, "__args__", ())
+        parts.append("sub_action (" + ", ".join(f"'{o}'" for o in options) + ")")
+    args = [name for name in fields if name not in ("action", "sub_action", "thought", "reason", "is_dangerous")]
+    if args:
+        parts.append("Use " + ", ".join(f"'{a}'" for a in args))
+    return f"- {action}: {'. '.join(parts) or 'No parameters'}.\n"
+
+
+class ActionEntry:
+    def __init__(self, name, doc, keywords="", documented=False):
+        self.name = name
+        self.doc = doc
+        self.documented = documented  # Part of the legacy full prompt
+        self.name_terms = set(_tokens(name.replace("_op", ""))) | set(_tokens(keywords))
+        self.doc_terms = set(_tokens(doc))
+
+
+class ActionCatalog:
+    """
+    Every action TESS can emit, from ACTION_DOCS, schemas.TessAction and the skills
+    registered by SkillLoader, with keyword retrieval over them.
+
+    select() picks the few actions relevant to a request; render() lists them in
+    catalog order, so the same selection always produces the same text.
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {}
+        for name, doc in ACTION_DOCS.items():
+            self.add(ActionEntry(name, doc, ACTION_KEYWORDS.get(name, ""), documented=True))
+        for model in TessAction.__args__:
+            name = model.model_fields["action"].annotation.__args__[0]
+            if name not in self.entries and name != "error":
+                self.add(ActionEntry(name, _schema_doc(model), ACTION_KEYWORDS.get(name, "")))
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def add(self, entry):
+        with self._lock:
+            self.entries[entry.name] = entry
+            self._idf = None
+
+    def add_skill(self, skill):
+        """Registers a SkillLoader plugin's intents (skills may handle actions not in schemas.py)."""
+        for intent in skill.intents:
+            if intent in self.entries: continue
+            doc = f"- {intent}: {skill.description}\n"
+            self.add(ActionEntry(intent, doc, f"{skill.name} {ACTION_KEYWORDS.get(intent, '')}"))
+
+    def _weights(self):
+        if self._idf is None:
+            docs = [e.name_terms | e.doc_terms for e in self.entries.values()]
+            terms = set().union(*docs) if docs else set()
+            n = len(docs)
+            self._idf = {t: math.log(1 + n / sum(1 for d in docs if t in d)) for t in terms}
+        return self._idf
+
+    def score(self, query):
+        """Relevance of every action to the query (name/keyword hits count double)."""
+        idf = self._weights()
+        terms = set(_tokens(query))
+        scores = {}
+        for name, entry in self.entries.items():
+            s = sum(2 * idf.get(t, 0) for t in terms & entry.name_terms)
+            s += sum(idf.get(t, 0) for t in terms & entry.doc_terms - entry.name_terms)
+            if s > 0: scores[name] = s
+        return scores
+
+    def select(self, query, top_k=6, recent=()):
+        """Names of the actions to offer for this request, in catalog order."""
+        with self._lock:
+            scores = self.score(query)
+            best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+            chosen = set(ALWAYS_INCLUDED) | set(best) | {r for r in recent if r in self.entries}
+            return [name for name in self.entries if name in chosen]
+
+    def render(self, names=None):
+        names = names if names is not None else [n for n, e in self.entries.items() if e.documented]
+        return "".join(self.entries[n].doc for n in names if n in self.entries)
@@ -1,5 +1,5 @@
 import time
-from .terminal_ui import print_thinking, clear_thinking, print_tess_action, print_error, print_info
+from .terminal_ui import print_thinking, clear_thinking, print_tess_action, print_error, print_info, TessMessageStream
 from .orchestrator import process_action
 from .config import Config
 
@@ -27,7 +27,11 @@ class AgenticLoop:
             try:
                 # Get next action
                 input_msg = user_query if current_step == 1 else "Continue."
-                response = self.brain.generate_command(input_msg)
+                stream = TessMessageStream()
+                try:
+                    response = self.brain.generate_command(input_msg, on_token=stream.write)
+                finally:
+                    stream.close()
                 clear_thinking()
 
                 # Parse
@@ -35,8 +39,8 @@ class AgenticLoop:
                 if not isinstance(response, dict):
                     response = {"action": "reply_op", "content": str(response)}
 
-                # UI: Show Thought
-                if response.get("thought"):
+                # UI: Show Thought (a streamed reply is already on screen, so skip it there)
+                if response.get("thought") and not response.get("streamed"):
                     from .terminal_ui import print_thought
                     print_thought(response["thought"])
 
@@ -54,7 +58,8 @@ class AgenticLoop:
 
                 # Execute
                 terminal_actions = ["final_reply", "reply_op", "whatsapp_op", "youtube_op", "broadcast_op", "instagram_op"]
-                if action in terminal_actions:
+                # Fast-path actions were routed locally from a one-shot command; nothing to reason about after
+                if action in terminal_actions or response.get("fast_path"):
                     if action not in ["final_reply", "reply_op"]:
                         print_tess_action(f"Executing {action}...")
                     process_action(response, self.components, self.brain)
@@ -2,43 +2,111 @@ import json
 import re
 import os
 import time
-import warnings
-import logging
 import random
-
-# Suppress warnings
-warnings.filterwarnings("ignore", category=FutureWarning)
-import google.generativeai as genai
-from groq import Groq
-from openai import OpenAI
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from .config import Config
 from .logger import setup_logger
 from .memory_engine import MemoryEngine
+from .llm_pool import LLMClientFactory, LLMClientPool
+from .llm_cache import ResponseCache
+from .llm_router import ProviderRouter
+from .llm_limiter import KeyLimiter, estimate_tokens, retry_after, usage_tokens
+from .context_window import ConversationWindow
+from .intent_router import IntentRouter
+from .action_catalog import ActionCatalog
+from .context_providers import ContextGatherer
 
 logger = setup_logger("Brain")
 
-class LLMClientFactory:
-    """Factory to create LLM clients."""
-    @staticmethod
-    def get_client(provider, model, api_key):
-        if not api_key: return None, f"Missing API Key for {provider}"
-        try:
-            if provider == "groq": return Groq(api_key=api_key), None
-            elif provider == "openai": return OpenAI(api_key=api_key), None
-            elif provider == "deepseek": return OpenAI(api_key=api_key, base_url="https://api.deepseek.com"), None
-            elif provider == "gemini":
-                genai.configure(api_key=api_key)
-                return genai.GenerativeModel(model), None
-        except Exception as e:
-            return None, str(e)
-        return None, "Unknown Provider"
+# Worker threads for hedged requests, shared by every Brain in the process
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tess-hedge")
+
+class ReplyStreamParser:
+    """
+    Incrementally pulls the user-facing 'content' string out of a JSON action
+    while it is still being streamed, so replies can be shown token by token.
+    Only reply actions are surfaced; tool calls stay silent until fully parsed.
+    """
+    REPLY_ACTIONS = ("reply_op", "final_reply")
+    _ACTION_RE = re.compile(r'"action"\s*:\s*"(\w+)"')
+    _CONTENT_RE = re.compile(r'"content"\s*:\s*"')
+    _ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', '\\': '\\', '/': '/'}
+
+    def __init__(self):
+        self.buffer = ""
+        self.emitted = False
+        self._cursor = None  # Position inside buffer of the next unread content char
+        self._done = False
+
+    def feed(self, delta):
+        """Adds a raw delta and returns any newly decoded reply text ('' if none)."""
+        self.buffer += delta
+        if self._done:
+            return ""
+
+        if self._cursor is None:
+            action = self._ACTION_RE.search(self.buffer)
+            if not action or action.group(1) not in self.REPLY_ACTIONS:
+                return ""
+            content = self._CONTENT_RE.search(self.buffer)
+            if not content:
+                return ""
+            self._cursor = content.end()
+
+        text = self._drain()
+        if text: self.emitted = True
+        return text
+
+    def _drain(self):
+        buf, i, out = self.buffer, self._cursor, []
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            if ch != '\\':
+                out.append(ch)
+                i += 1
+                continue
+
+            # Escapes: wait for the rest of the sequence if it was split across deltas
+            if i + 1 >= len(buf): break
+            nxt = buf[i + 1]
+            if nxt != 'u':
+                out.append(self._ESCAPES.get(nxt, nxt))
+                i += 2
+                continue
+            if i + 6 > len(buf): break
+            try:
+                code = int(buf[i + 2:i + 6], 16)
+            except ValueError:
+                i += 6
+                continue
+            if 0xD800 <= code < 0xDC00 and buf[i + 6:i + 8] in ('\\u', '\\', ''):
+                # Surrogate pair: need the low half too
+                if i + 12 > len(buf): break
+                try:
+                    low = int(buf[i + 8:i + 12], 16)
+                    code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                    i += 6
+                except ValueError:
+                    pass
+            out.append(chr(code))
+            i += 6
+
+        self._cursor = i
+        return "".join(out)
 
 class Brain:
     """
     Handles LLM interactions with robust retries and failover.
     """
-    def __init__(self, user_id="default", knowledge_db=None, personality="casual"):
+    def __init__(self, user_id="default", knowledge_db=None, personality="casual", client_pool=None, response_cache=None, router=None, limiter=None):
         self.user_id = str(user_id)
         self.personality = personality
         self.history = [{"role": "system", "content": Config.get_system_prompt(personality)}]
@@ -47,109 +115,578 @@ class Brain:
         self.knowledge_db = knowledge_db 
         self.provider = Config.LLM_PROVIDER
         self.model = Config.LLM_MODEL
-        self.current_key_index = 0
+        self._reservations = {}  # provider -> (key index, reserved tokens) of the latest attempt
+        self.client_pool = client_pool or LLMClientPool.shared()
+        self.response_cache = response_cache or ResponseCache.shared()
+        self.router = router or ProviderRouter.shared()
+        self.limiter = limiter or KeyLimiter.shared()
+        self.window = ConversationWindow(self)
+        self.intent_router = IntentRouter() if Config.is_module_enabled("intent_router") else None
+        self.catalog = ActionCatalog.shared()
+        self.context_sources = ContextGatherer.for_brain(self)
         
         logger.info(f"Brain Initialized | Provider: {self.provider.upper()} | Model: {self.model}")
 
     def update_history(self, role, content):
         self.history.append({"role": role, "content": content})
 
-    def _get_client(self):
-        key = Config.get_api_key(self.provider, index=self.current_key_index)
-        return LLMClientFactory.get_client(self.provider, self.model, key)
+    def _key_slot(self, provider=None):
+        """Key index the limiter handed out for this provider's latest attempt."""
+        provider = provider or self.provider
+        return self._reservations.get(provider, (0, 0))[0] % max(Config.get_key_count(provider), 1)
 
-    def _call_api_with_retry(self, messages, json_mode=False, temperature=0.7, max_retries=5):
-        """Centralized API caller with exponential backoff."""
+    def _acquire_key(self, provider, messages, can_failover=False):
+        """
+        Takes the provider key with the most headroom from the shared limiter.
+        Returns seconds to wait before using it, or None when every key is
+        cooling down and another provider can take the request instead.
+        """
+        tokens = estimate_tokens(messages)
+        slot, wait = self.limiter.acquire(provider, tokens, max_wait=0 if can_failover else None)
+        self._reservations[provider] = (slot, tokens)
+        if wait > 0 and can_failover:
+            logger.info(f"All {provider} keys are cooling down; trying the next provider.")
+            return None
+        if wait > 0:
+            logger.info(f"All {provider} keys are busy. Waiting {wait:.2f}s...")
+        return wait
+
+    def _get_client(self, provider=None, model=None):
+        provider, model = provider or self.provider, model or self.model
+        slot = self._key_slot(provider)
+        key = Config.get_api_key(provider, index=slot)
+        return self.client_pool.get(provider, model, key, key_index=slot)
+
+    def _aget_client(self, provider=None, model=None):
+        """Async SDK client for the running event loop."""
+        provider, model = provider or self.provider, model or self.model
+        slot = self._key_slot(provider)
+        key = Config.get_api_key(provider, index=slot)
+        return self.client_pool.get_async(provider, model, key, key_index=slot)
+
+    def _gemini_request(self, messages, json_mode):
+        """Flattens chat messages into a Gemini prompt plus generate_content kwargs."""
+        prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+        # JSON mode hack for Gemini
+        if json_mode and "json" not in prompt.lower(): 
+            prompt += "\nOutput strict JSON."
+        
+        kwargs = {}
+        # Bypass standard safety rails for TESS personality tuning (Rogue Mode)
+        # OR when Autonomous Coding is enabled
+        if self.personality == "rogue" or Config.AUTONOMOUS_CODING:
+            kwargs["safety_settings"] = [
+                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
+            ]
+        return prompt, kwargs
+
+    def _chat_args(self, messages, json_mode, temperature, stream=False, provider=None, model=None):
+        """Request body for the OpenAI-compatible providers (OpenAI / Groq / DeepSeek)."""
+        provider = provider or self.provider
+        args = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature
+        }
+        # Groq rejects response_format on streamed requests; the system prompt already demands JSON
+        if json_mode and not (stream and provider == "groq"):
+            args["response_format"] = {"type": "json_object"}
+        if stream: args["stream"] = True
+        return args
+
+    def _retry_delay(self, error, attempt, max_retries, messages, json_mode, provider=None, model=None, can_failover=False):
+        """
+        Shared error policy for every call path (sync, async, streaming).
+        Returns the seconds to wait before the next attempt, or None to give up
+        on this provider (the router then moves on to the next one, if any).
+        """
+        provider = provider or self.provider
+        self.client_pool.report_failure(provider, self._key_slot(provider), error, model=model or self.model)
+        self.router.report_failure(provider, error)
+        err_msg = str(error).lower()
+        logger.warning(f"API Attempt {attempt+1} Failed ({provider}): {err_msg}")
+        
+        # Rate Limits (429) or Overloaded (503)
+        if "429" in err_msg or "resource exhausted" in err_msg:
+            # Cool this key down; the next attempt takes whichever key has headroom
+            # and only waits if all of them are exhausted
+            self.limiter.penalize(provider, self._key_slot(provider), retry_after(error))
+            return 0
+        
+        # JSON Errors
+        if "json" in err_msg and json_mode:
+            messages.append({"role": "user", "content": "Previous response was invalid JSON. Retrying."})
+            return 0
+
+        # Anything else (5xx, timeouts, dropped connections) is usually transient:
+        # hand it to the next provider if there is one, otherwise back off and retry here
+        if can_failover or attempt + 1 >= max_retries:
+            return None
+        delay = min(2 ** attempt, 8) + random.uniform(0, 1) # 1s, 2s, 4s, 8s...
+        logger.info(f"Retrying {provider} in {delay:.2f}s...")
+        return delay
+
+    def _record_success(self, provider, model, response=None):
+        slot, reserved = self._reservations.get(provider, (0, 0))
+        self.limiter.record_usage(provider, slot, usage_tokens(response), reserved)
+        self.client_pool.report_success(provider, self._key_slot(provider), model=model)
+        self.router.report_success(provider)
+
+    def _call_provider(self, provider, model, messages, json_mode, temperature, max_retries, can_failover=False, cancelled=None):
+        """Blocking completion against one provider, retrying per _retry_delay."""
         for attempt in range(max_retries):
-            client, err = self._get_client()
+            if cancelled is not None and cancelled.is_set():
+                return None # Lost a hedge race; stop spending requests
+
+            wait = self._acquire_key(provider, messages, can_failover)
+            if wait is None:
+                return None
+            if wait: time.sleep(wait)
+
+            client, err = self._get_client(provider, model)
             if not client:
                 logger.error(f"Client Init Error: {err}")
                 return None
 
             try:
                 # Gemini
-                if self.provider == "gemini":
-                    prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
-                    # JSON mode hack for Gemini
-                    if json_mode and "json" not in prompt.lower(): 
-                        prompt += "\nOutput strict JSON."
-                    
-                    # Bypass standard safety rails for TESS personality tuning (Rogue Mode)
-                    # OR when Autonomous Coding is enabled
-                    if self.personality == "rogue" or Config.AUTONOMOUS_CODING:
-                        safety_settings = [
-                            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-                        ]
-                        response = client.generate_content(prompt, safety_settings=safety_settings)
-                    else:
-                        response = client.generate_content(prompt)
-                    return response.text
-
-                # OpenAI / Groq / DeepSeek
-                args = {
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": temperature
-                }
-                if json_mode: args["response_format"] = {"type": "json_object"}
-                
-                completion = client.chat.completions.create(**args)
-                return completion.choices[0].message.content
+                if provider == "gemini":
+                    prompt, kwargs = self._gemini_request(messages, json_mode)
+                    response = client.generate_content(prompt, **kwargs)
+                    text = response.text
+                else:
+                    # OpenAI / Groq / DeepSeek
+                    response = client.chat.completions.create(
+                        **self._chat_args(messages, json_mode, temperature, provider=provider, model=model)
+                    )
+                    text = response.choices[0].message.content
+
+                self._record_success(provider, model, response)
+                return text
 
             except Exception as e:
-                err_msg = str(e).lower()
-                logger.warning(f"API Attempt {attempt+1} Failed: {err_msg}")
-                
-                # Rate Limits (429) or Overloaded (503)
-                if "429" in err_msg or "resource exhausted" in err_msg:
-                    sleep_time = (2 ** attempt) + random.uniform(0, 1) # 1s, 2s, 4s, 8s...
-                    logger.info(f"Rate limit hit. Sleeping {sleep_time:.2f}s...")
-                    time.sleep(sleep_time)
-                    # Rotate key for next attempt
-                    self.current_key_index += 1
-                    continue
+                delay = self._retry_delay(e, attempt, max_retries, messages, json_mode, provider, model, can_failover)
+                if delay is None:
+                    return None
+                if delay: time.sleep(delay)
                 
-                # JSON Errors
-                if "json" in err_msg and json_mode:
-                    messages.append({"role": "user", "content": "Previous response was invalid JSON. Retrying."})
-                    continue
+        logger.error(f"Max retries exceeded ({provider}).")
+        return None
 
-                # Provider Failover Logic could go here
-                
-        logger.error("Max retries exceeded.")
+    def _call_api_with_retry(self, messages, json_mode=False, temperature=0.7, max_retries=5):
+        """Centralized API caller: retries with backoff, then fails over / hedges per llm.routing."""
+        candidates = self.router.candidates(self.provider, self.model)
+        if len(candidates) == 1:
+            provider, model = candidates[0]
+            return self._call_provider(provider, model, messages, json_mode, temperature, max_retries)
+
+        if self.router.mode == "hedged":
+            return self._call_hedged(candidates, messages, json_mode, temperature, max_retries)
+
+        for i, (provider, model) in enumerate(candidates):
+            # Every provider but the last may be skipped while its keys cool down
+            can_failover = i < len(candidates) - 1
+            text = self._call_provider(provider, model, list(messages), json_mode, temperature, max_retries, can_failover)
+            if text:
+                return text
+        logger.error("All providers failed.")
+        return None
+
+    def _call_hedged(self, candidates, messages, json_mode, temperature, max_retries):
+        """
+        Sends the request to the first provider and, if it hasn't answered within
+        hedge_after_ms (or fails), to the next one as well. First answer wins.
+        A blocking HTTP call can't be aborted from another thread, so losers are
+        told to stop retrying and their late results are dropped.
+        """
+        cancelled = threading.Event()
+        queue = list(candidates)
+
+        def launch():
+            provider, model = queue.pop(0)
+            return _HEDGE_EXECUTOR.submit(
+                self._call_provider, provider, model, list(messages), json_mode,
+                temperature, max_retries, bool(queue), cancelled
+            )
+
+        pending = {launch()}
+        while pending:
+            done, pending = wait(pending, timeout=self.router.hedge_after if queue else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                text = future.result() if not future.exception() else None
+                if text:
+                    cancelled.set()
+                    for loser in pending: loser.cancel()
+                    return text
+            if queue:
+                if not done: logger.info(f"No answer after {self.router.hedge_after:.1f}s, hedging to {queue[0][0]}.")
+                pending.add(launch())
+
+        logger.error("All providers failed.")
+        return None
+
+    def _stream_deltas(self, client, messages, json_mode, temperature, provider=None, model=None):
+        """Raw provider stream, yielding text fragments as they arrive."""
+        if (provider or self.provider) == "gemini":
+            prompt, kwargs = self._gemini_request(messages, json_mode)
+            for chunk in client.generate_content(prompt, stream=True, **kwargs):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue # Safety-blocked or empty candidate
+                if text: yield text
+            return
+
+        args = self._chat_args(messages, json_mode, temperature, stream=True, provider=provider, model=model)
+        for chunk in client.chat.completions.create(**args):
+            if not chunk.choices: continue
+            delta = chunk.choices[0].delta.content
+            if delta: yield delta
+
+    def _stream_provider(self, provider, model, messages, json_mode, temperature, max_retries, can_failover=False):
+        """
+        Streams from one provider. Returns (via StopIteration) True once output has
+        started or completed, False if it gave up before the first token.
+        """
+        for attempt in range(max_retries):
+            wait = self._acquire_key(provider, messages, can_failover)
+            if wait is None:
+                return False
+            if wait: time.sleep(wait)
+
+            client, err = self._get_client(provider, model)
+            if not client:
+                logger.error(f"Client Init Error: {err}")
+                return False
+
+            started = False
+            try:
+                for delta in self._stream_deltas(client, messages, json_mode, temperature, provider, model):
+                    started = True
+                    yield delta
+                self._record_success(provider, model)
+                return True
+            except Exception as e:
+                if started:
+                    logger.error(f"Stream interrupted: {e}")
+                    return True
+                delay = self._retry_delay(e, attempt, max_retries, messages, json_mode, provider, model, can_failover)
+                if delay is None:
+                    return False
+                if delay: time.sleep(delay)
+
+        logger.error(f"Max retries exceeded ({provider}).")
+        return False
+
+    def stream_completion(self, messages, json_mode=False, temperature=0.7, max_retries=5):
+        """
+        Generator over completion text deltas.
+        Retries and failover follow the same policy as _call_api_with_retry, but only
+        until the first token has been yielded; a stream that breaks midway just ends.
+        Streams are never hedged: two half-written replies can't be merged.
+        """
+        candidates = self.router.candidates(self.provider, self.model)
+        for i, (provider, model) in enumerate(candidates):
+            finished = yield from self._stream_provider(
+                provider, model, list(messages), json_mode, temperature, max_retries, can_failover=i < len(candidates) - 1
+            )
+            if finished:
+                return
+        if len(candidates) > 1: logger.error("All providers failed.")
+
+    # ─── Async API (API server / Telegram) ───────────────────────────────
+
+    async def _acall_provider(self, provider, model, messages, json_mode, temperature, max_retries, can_failover=False):
+        """Async twin of _call_provider on the providers' native async clients."""
+        for attempt in range(max_retries):
+            wait = self._acquire_key(provider, messages, can_failover)
+            if wait is None:
+                return None
+            if wait: await asyncio.sleep(wait)
+
+            client, err = self._aget_client(provider, model)
+            if not client:
+                logger.error(f"Client Init Error: {err}")
+                return None
+
+            try:
+                if provider == "gemini":
+                    prompt, kwargs = self._gemini_request(messages, json_mode)
+                    response = await client.generate_content_async(prompt, **kwargs)
+                    text = response.text
+                else:
+                    response = await client.chat.completions.create(
+                        **self._chat_args(messages, json_mode, temperature, provider=provider, model=model)
+                    )
+                    text = response.choices[0].message.content
+
+                self._record_success(provider, model, response)
+                return text
+
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, max_retries, messages, json_mode, provider, model, can_failover)
+                if delay is None:
+                    return None
+                await asyncio.sleep(delay)
+
+        logger.error(f"Max retries exceeded ({provider}).")
+        return None
+
+    async def _acall_api_with_retry(self, messages, json_mode=False, temperature=0.7, max_retries=5):
+        """Async twin of _call_api_with_retry."""
+        candidates = self.router.candidates(self.provider, self.model)
+        if len(candidates) == 1:
+            provider, model = candidates[0]
+            return await self._acall_provider(provider, model, messages, json_mode, temperature, max_retries)
+
+        if self.router.mode == "hedged":
+            return await self._acall_hedged(candidates, messages, json_mode, temperature, max_retries)
+
+        for i, (provider, model) in enumerate(candidates):
+            can_failover = i < len(candidates) - 1
+            text = await self._acall_provider(provider, model, list(messages), json_mode, temperature, max_retries, can_failover)
+            if text:
+                return text
+        logger.error("All providers failed.")
         return None
 
-    def think(self, prompt):
+    async def _acall_hedged(self, candidates, messages, json_mode, temperature, max_retries):
+        """Async _call_hedged. Here the losing request really is cancelled mid-flight."""
+        queue = list(candidates)
+
+        def launch():
+            provider, model = queue.pop(0)
+            return asyncio.ensure_future(self._acall_provider(
+                provider, model, list(messages), json_mode, temperature, max_retries, can_failover=bool(queue)
+            ))
+
+        pending = {launch()}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=self.router.hedge_after if queue else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    text = task.result() if not task.exception() else None
+                    if text:
+                        return text
+                if queue:
+                    if not done: logger.info(f"No answer after {self.router.hedge_after:.1f}s, hedging to {queue[0][0]}.")
+                    pending.add(launch())
+        finally:
+            for task in pending: task.cancel()
+
+        logger.error("All providers failed.")
+        return None
+
+    async def _astream_deltas(self, client, messages, json_mode, temperature, provider=None, model=None):
+        if (provider or self.provider) == "gemini":
+            prompt, kwargs = self._gemini_request(messages, json_mode)
+            response = await client.generate_content_async(prompt, stream=True, **kwargs)
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                if text: yield text
+            return
+
+        args = self._chat_args(messages, json_mode, temperature, stream=True, provider=provider, model=model)
+        stream = await client.chat.completions.create(**args)
+        async for chunk in stream:
+            if not chunk.choices: continue
+            delta = chunk.choices[0].delta.content
+            if delta: yield delta
+
+    async def astream_completion(self, messages, json_mode=False, temperature=0.7, max_retries=5):
+        """Async iterator over completion deltas (same retry and failover rules as stream_completion)."""
+        candidates = self.router.candidates(self.provider, self.model)
+        for i, (provider, model) in enumerate(candidates):
+            can_failover = i < len(candidates) - 1
+            attempt_messages = list(messages)
+            for attempt in range(max_retries):
+                wait = self._acquire_key(provider, attempt_messages, can_failover)
+                if wait is None:
+                    break
+                if wait: await asyncio.sleep(wait)
+
+                client, err = self._aget_client(provider, model)
+                if not client:
+                    logger.error(f"Client Init Error: {err}")
+                    break
+
+                started = False
+                try:
+                    async for delta in self._astream_deltas(client, attempt_messages, json_mode, temperature, provider, model):
+                        started = True
+                        yield delta
+                    self._record_success(provider, model)
+                    return
+                except Exception as e:
+                    if started:
+                        logger.error(f"Stream interrupted: {e}")
+                        return
+                    delay = self._retry_delay(e, attempt, max_retries, attempt_messages, json_mode, provider, model, can_failover)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+            else:
+                logger.error(f"Max retries exceeded ({provider}).")
+
+        if len(candidates) > 1: logger.error("All providers failed.")
+
+    async def arequest_completion(self, messages, json_mode=False, temperature=0.7, use_cache=False):
+        """Async request_completion, sharing the same response cache."""
+        cache = self.response_cache if use_cache else None
+        if cache:
+            key = cache.make_key(self.provider, self.model, temperature, messages, json_mode)
+            cached = cache.get(key)
+            if cached is not None:
+                logger.debug("Response cache hit.")
+                return cached
+
+        response = await self._acall_api_with_retry(list(messages), json_mode, temperature)
+        if cache and response:
+            cache.put(key, response)
+        return response
+
+    async def agenerate_command(self, user_query, on_token=None):
+        """
+        Async generate_command. The LLM call runs on the event loop; context
+        enrichment and history distillation (disk I/O, blocking calls) run in a worker thread.
+        """
+        fast = self._fast_path(user_query)
+        if fast: return fast
+
+        messages = await asyncio.to_thread(self._prepare_turn, user_query)
+
+        streamed = False
+        if on_token:
+            parser = ReplyStreamParser()
+            async for delta in self.astream_completion(messages, json_mode=True):
+                text = parser.feed(delta)
+                if text:
+                    try:
+                        on_token(text)
+                    except Exception as e:
+                        logger.debug(f"Stream handler error: {e}")
+            response_text, streamed = parser.buffer or None, parser.emitted
+        else:
+            response_text = await self._acall_api_with_retry(messages, json_mode=True)
+
+        return self._finish_turn(response_text, streamed)
+
+    def think(self, prompt, system_prompt=None, use_cache=False, temperature=0.7):
         """Simple thought generation."""
-        return self.request_completion([{"role": "user", "content": prompt}]) or "Thinking failed."
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        return self.request_completion(messages, temperature=temperature, use_cache=use_cache) or "Thinking failed."
+
+    def request_completion(self, messages, json_mode=False, temperature=0.7, use_cache=False):
+        """
+        Public method for one-off completions.
+        use_cache=True answers identical re-asks from the persistent response
+        cache. Only deterministic callers opt in (temperature 0, same input ->
+        same useful answer); creative, repair and safety calls always hit the model.
+        """
+        cache = self.response_cache if use_cache else None
+        if cache:
+            key = cache.make_key(self.provider, self.model, temperature, messages, json_mode)
+            cached = cache.get(key)
+            if cached is not None:
+                logger.debug("Response cache hit.")
+                return cached
+
+        # Copy: retries may append repair prompts, which must not leak into the caller's list
+        response = self._call_api_with_retry(list(messages), json_mode, temperature)
+        if cache and response:
+            cache.put(key, response)
+        return response
+
+    def generate_command(self, user_query, on_token=None):
+        """
+        Main chat loop entry point.
+        If on_token is given, the completion is streamed and the user-facing text of
+        reply actions is passed to it as it arrives; such commands come back with
+        "streamed": True so front ends don't render them twice.
+        Frequent one-shot commands are answered by the local intent router
+        and come back with "fast_path": True.
+        """
+        fast = self._fast_path(user_query)
+        if fast: return fast
+
+        messages = self._prepare_turn(user_query)
+
+        streamed = False
+        if on_token:
+            response_text, streamed = self._stream_reply(messages, on_token)
+        else:
+            response_text = self._call_api_with_retry(messages, json_mode=True)
+        
+        return self._finish_turn(response_text, streamed)
 
-    def request_completion(self, messages, json_mode=False, temperature=0.7):
-        """Public method for one-off completions."""
-        return self._call_api_with_retry(messages, json_mode, temperature)
+    def _fast_path(self, user_query):
+        """Local intent routing; records the turn so the conversation stays coherent."""
+        if not self.intent_router: return None
+        cmd = self.intent_router.route(user_query)
+        if cmd:
+            recorded = {k: v for k, v in cmd.items() if k not in ("fast_path", "confidence")}
+            self.history.append({"role": "user", "content": user_query})
+            self.history.append({"role": "assistant", "content": json.dumps(recorded)})
+        return cmd
 
-    def generate_command(self, user_query):
-        """Main chat loop entry point."""
+    def _prepare_turn(self, user_query):
+        """Records the user turn and returns the messages to send, within the context budget."""
         self._enrich_context(user_query)
         self.history.append({"role": "user", "content": user_query})
-        self._maybe_distill_context()
-        
-        # Prepare messages
-        messages = list(self.history)
-        if hasattr(self, '_current_context') and self._current_context:
-             messages.insert(-1, {"role": "system", "content": f"[CTX]\n{self._current_context}\n[/CTX]"})
+        # Old turns are summarised off the critical path; this request uses what's there now
+        self.window.maybe_fold()
+        return self.window.build(getattr(self, "_current_context", None), self._relevant_actions(user_query))
 
-        response_text = self._call_api_with_retry(messages, json_mode=True)
-        
+    def _relevant_actions(self, user_query):
+        """[ACTIONS] block for this request, or None when the system prompt lists them all."""
+        settings = Config._data["llm"].get("action_catalog", {})
+        if not settings.get("enabled", True): return None
+
+        # Keep offering whatever the last few turns used, so multi-step tasks can continue
+        recent = []
+        for message in self.history[-6:]:
+            if message.get("role") != "assistant": continue
+            try:
+                recent.append(json.loads(message["content"]).get("action"))
+            except (ValueError, TypeError, AttributeError):
+                pass
+
+        names = self.catalog.select(user_query, top_k=settings.get("top_k", 6), recent=recent)
+        return f"[ACTIONS]\n{self.catalog.render(names)}[/ACTIONS]"
+
+    def _finish_turn(self, response_text, streamed=False):
+        """Parses the model output into a command and records it in history."""
         if not response_text:
             return {"action": "error", "reason": "Brain unresponsive (Rate Limit?)"}
             
         cmd = self._parse_json(response_text)
         self.history.append({"role": "assistant", "content": json.dumps(cmd)})
+        if streamed and isinstance(cmd, dict):
+            cmd["streamed"] = True
         return cmd
 
+    def _stream_reply(self, messages, on_token):
+        """Streams a JSON action, forwarding reply text to on_token. Returns (raw_text, streamed)."""
+        parser = ReplyStreamParser()
+        for delta in self.stream_completion(messages, json_mode=True):
+            text = parser.feed(delta)
+            if text:
+                try:
+                    on_token(text)
+                except Exception as e:
+                    logger.debug(f"Stream handler error: {e}")
+        return parser.buffer or None, parser.emitted
+
     def _parse_json(self, text):
         try:
             # 1. Strip Markdown Code Blocks
@@ -197,52 +734,6 @@ class Brain:
             logger.error(f"JSON Parse fail: {e}")
             return {"action": "reply_op", "content": text}
 
-    def _maybe_distill_context(self):
-        if len(self.history) < 100: return
-        logger.info("Distilling history...")
-        
-        summary = self.request_completion(
-            self.history + [{"role": "user", "content": "Summarize key facts concisely."}], 
-            temperature=0.3
-        )
-        
-        if summary:
-            if self.memory: self.memory.store_memory(f"Context: {summary}")
-            self.history = [self.history[0], {"role": "system", "content": f"[SUMMARY]\n{summary}"}] + self.history[-8:]
-
     def _enrich_context(self, query):
         if len(query) < 4: return
-        extras = []
-        
-        # Profile
-        try:
-            from .user_profile import UserProfile
-            extras.append(UserProfile().get_facts_context())
-        except Exception as e:
-            logger.warning(f"Failed to load user profile context: {e}")
-        
-        # Memory
-        if self.knowledge_db:
-            try:
-                mem = self.knowledge_db.search_memory(query, n_results=1)
-                if "No match" not in mem: extras.append(f"[KEY_MEMORY] {mem}")
-            except Exception as e:
-                logger.warning(f"Failed to search memory context: {e}")
-        
-        # Vault Awareness
-        if Config.is_module_enabled("vault"):
-            try:
-                from .vault_manager import VaultManager
-                # Just quick instantiation to check
-                # Ideally, we should pass components to Brain, but for now we lazy load or assume path
-                # A better way is to check if 'vault' is in self.components if available, 
-                # but Brain doesn't have direct access to components dict in this version.
-                # So we instantiate a lightweight manager just to list keys.
-                vm = VaultManager()
-                keys = vm.list_secrets()
-                if keys:
-                    extras.append(f"[VAULT] Available Keys: {', '.join(keys)}")
-            except Exception as e:
-                logger.warning(f"Failed to list vault keys: {e}")
-
-        self._current_context = "\n".join(filter(None, extras))
+        self._current_context = self.context_sources.gather(query)
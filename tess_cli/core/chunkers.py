@@ -0,0 +1,248 @@
+import ast
+import os
+from abc import ABC, abstractmethod
+import re
+from .config import Config
+from .context_window import TokenCounter
+from .logger import setup_logger
+
+logger = setup_logger("Chunkers")
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+_counter = None
+
+
+def token_counter():
+    global _counter
+    if _counter is None:
+        _counter = TokenCounter("")
+    return _counter
+
+
+def make_chunk(lines, start_line, symbol=None):
+    """A chunk: its text, 1-based inclusive line range and, when known, the symbol or heading it covers."""
+    chunk = {"text": "".join(lines), "start_line": start_line, "end_line": start_line + max(len(lines), 1) - 1}
+    if symbol:
+        chunk["symbol"] = symbol
+    return chunk
+
+
+class TokenWindowChunker:
+    """
+    Windows of whole lines, each up to max_tokens, without overlap. Text is fed
+    in pieces (see ingest.read_chunks) and only the window being filled is held.
+    A single line longer than the budget is cut into budget-sized pieces.
+    """
+
+    def __init__(self, max_tokens=400, counter=None):
+        self.max_tokens = max_tokens
+        self.counter = counter or token_counter()
+        self._partial = ""
+        self._lines, self._tokens = [], 0
+        self._start = 1        # Line number of the first line in the window
+        self._next_line = 1    # Line number of the next complete line
+        self._has_text = False
+
+    def feed(self, text):
+        self._has_text = self._has_text or (bool(text) and not text.isspace())
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        chunks = []
+        for line in lines:
+            chunks += self._add(line + "\n")
+        return chunks
+
+    def finish(self):
+        chunks = self._add(self._partial) if self._partial else []
+        self._partial = ""
+        if self._lines:
+            chunks.append(make_chunk(self._lines, self._start))
+            self._lines, self._tokens = [], 0
+        return chunks if self._has_text else []
+
+    def _add(self, line):
+        chunks = []
+        number = self._next_line
+        self._next_line += 1
+        tokens = self.counter.count(line)
+        if self._lines and self._tokens + tokens > self.max_tokens:
+            chunks.append(make_chunk(self._lines, self._start))
+            self._lines, self._tokens = [], 0
+        if not self._lines:
+            self._start = number
+        if tokens > self.max_tokens:
+            width = max(1, len(line) * self.max_tokens // tokens)
+            for i in range(0, len(line), width):
+                chunks.append(make_chunk([line[i:i + width]], number))
+            return chunks
+        self._lines.append(line)
+        self._tokens += tokens
+        return chunks
+
+
+class StructuredChunker(ABC):
+    """
+    Base for chunkers that need the whole text: feed() collects it and
+    finish() cuts it into segments (start line, lines, symbol). Consecutive
+    small segments are packed together up to max_tokens; a segment over the
+    budget is split into line windows that keep its symbol.
+    """
+
+    def __init__(self, max_tokens=400, counter=None):
+        self.max_tokens = max_tokens
+        self.counter = counter or token_counter()
+        self._parts = []
+
+    def feed(self, text):
+        self._parts.append(text)
+        return []
+
+    def finish(self):
+        text = "".join(self._parts)
+        self._parts = []
+        if not text.strip(): return []
+        lines = text.splitlines(keepends=True)
+        try:
+            segments = self.segments(text, lines)
+        except (SyntaxError, ValueError) as e:
+            logger.debug(f"{type(self).__name__} fell back to line windows: {e}")
+            segments = [(1, lines, None)]
+        return self._pack(segments)
+
+    @abstractmethod
+    def segments(self, text, lines):
+        """[(start line, lines, symbol or None)] covering every line in order; may raise SyntaxError/ValueError."""
+
+    def _split(self, start, lines, symbol):
+        """Line windows of one oversized segment."""
+        window = TokenWindowChunker(self.max_tokens, self.counter)
+        chunks = window.feed("".join(lines)) + window.finish()
+        for chunk in chunks:
+            chunk["start_line"] += start - 1
+            chunk["end_line"] += start - 1
+            if symbol:
+                chunk["symbol"] = symbol
+        return chunks
+
+    def _pack(self, segments):
+        chunks = []
+        group, group_start, group_tokens, symbols = [], None, 0, []
+
+        def close():
+            if group and "".join(group).strip():
+                chunks.append(make_chunk(group, group_start, ", ".join(dict.fromkeys(symbols))))
+
+        for start, lines, symbol in segments:
+            if not lines: continue
+            tokens = self.counter.count("".join(lines))
+            if tokens > self.max_tokens:
+                close()
+                group, group_tokens, symbols = [], 0, []
+                chunks += self._split(start, lines, symbol)
+                continue
+            if group and group_tokens + tokens > self.max_tokens:
+                close()
+                group, group_tokens, symbols = [], 0, []
+            if not group:
+                group_start = start
+            group += lines
+            group_tokens += tokens
+            if symbol:
+                symbols.append(symbol)
+        close()
+        return chunks
+
+
+class PythonChunker(StructuredChunker):
+    """
+    Cuts at top-level def/class boundaries (the ast walk CodingTools.file_outline
+    uses); a class over the budget is cut again at its methods. Comments
+    directly above a definition go with it.
+    """
+
+    def segments(self, text, lines):
+        tree = ast.parse(text)
+        return self._cut(tree.body, 1, len(lines), lines, prefix="")
+
+    def _cut(self, body, first, last, lines, prefix):
+        """Segments covering lines first..last (1-based), cut before each statement in body."""
+        starts = []
+        for node in body:
+            start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+            floor = starts[-1][0] + 1 if starts else first
+            while start > floor and lines[start - 2].lstrip().startswith("#"):
+                start -= 1  # Comments directly above belong to the definition
+            if start >= first:
+                starts.append((start, node))
+        segments = []
+        if not starts or starts[0][0] > first:
+            segments.append((first, lines[first - 1:(starts[0][0] - 1 if starts else last)], None))
+        for i, (start, node) in enumerate(starts):
+            end = starts[i + 1][0] - 1 if i + 1 < len(starts) else last
+            symbol = prefix + node.name if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) else None
+            piece = lines[start - 1:end]
+            if (isinstance(node, ast.ClassDef) and node.body
+                    and self.counter.count("".join(piece)) > self.max_tokens):
+                # Class header (docstring, attributes) and each method on their own
+                segments += [(s, l, sym or symbol) for s, l, sym in
+                             self._cut(node.body, start, end, lines, prefix=f"{symbol}.")]
+            else:
+                segments.append((start, piece, symbol))
+        return segments
+
+
+class MarkdownChunker(StructuredChunker):
+    """Cuts before every heading outside fenced code; a section's symbol is its heading path ("Setup > Linux")."""
+
+    def segments(self, text, lines):
+        segments, path = [], []
+        start, symbol, fenced = 1, None, False
+        for number, line in enumerate(lines, start=1):
+            if _FENCE_RE.match(line):
+                fenced = not fenced
+                continue
+            match = None if fenced else _HEADING_RE.match(line)
+            if not match: continue
+            if number > start:
+                segments.append((start, lines[start - 1:number - 1], symbol))
+            level = len(match.group(1))
+            path = path[:level - 1] + [""] * (level - 1 - len(path)) + [match.group(2)]
+            start, symbol = number, " > ".join(p for p in path if p)
+        segments.append((start, lines[start - 1:], symbol))
+        return segments
+
+
+# Chunker factory by file extension; anything else gets TokenWindowChunker
+CHUNKERS = {}
+
+
+def register_chunker(factory, *extensions):
+    """factory(max_tokens=..., counter=...) -> an object with feed(text) -> chunks and finish() -> chunks."""
+    for ext in extensions:
+        CHUNKERS[ext.lower()] = factory
+
+
+# Bump when a chunker's output changes, so learn_directory re-chunks files indexed before
+CHUNKING_VERSION = 1
+
+
+def chunk_tokens():
+    return Config._data.get("memory", {}).get("chunk_tokens", 400)
+
+
+def chunking_signature():
+    """Identifies the chunking settings; recorded per file in the learn manifest."""
+    return f"v{CHUNKING_VERSION}:{chunk_tokens()}"
+
+
+def chunker_for(file_path, max_tokens=None):
+    if max_tokens is None:
+        max_tokens = chunk_tokens()
+    factory = CHUNKERS.get(os.path.splitext(file_path)[1].lower(), TokenWindowChunker)
+    return factory(max_tokens=max_tokens, counter=token_counter())
+
+
+register_chunker(PythonChunker, ".py")
+register_chunker(MarkdownChunker, ".md")
@@ -5,6 +5,7 @@ coding tasks using tools, with a permission model for dangerous operations.
 """
 
 import os
+import re
 import json
 import time
 from .coding_tools import CodingTools
@@ -28,47 +29,61 @@ DANGEROUS_TOOLS = {"write_file", "edit_file", "run_command", "git_commit"}
 MAX_AGENT_STEPS = 25
 
 # ─── Tool Schema (injected into the system prompt) ───────────────────────────
-TOOL_SCHEMA_DOC = """
-AVAILABLE TOOLS (respond with exactly one tool call per message):
-
-1. read_file(path, start_line?, end_line?)
-   Read a file's contents. Supports optional line range (1-indexed).
-
-2. write_file(path, content)
-   Create or overwrite a file. REQUIRES PERMISSION.
-
-3. edit_file(path, search, replace)
-   Surgical find-and-replace. The 'search' text must match exactly.
-   Only replaces the FIRST occurrence. REQUIRES PERMISSION.
-
-4. list_dir(path?)
-   List directory contents as a tree. Defaults to workspace root.
-
-5. grep_search(pattern, path?, extensions?)
-   Regex search across files. 'extensions' is a list like [".py", ".js"].
-
-6. file_outline(path)
-   Get structural outline (classes/functions for .py, headers for .md).
+# Listed in this order, numbered at render time so the prompt text stays stable.
+TOOL_DOCS = [
+    ("read_file", "read_file(path, start_line?, end_line?)\n"
+                  "   Read a file's contents. Supports optional line range (1-indexed)."),
+    ("write_file", "write_file(path, content)\n"
+                   "   Create or overwrite a file. REQUIRES PERMISSION."),
+    ("edit_file", "edit_file(path, search, replace)\n"
+                  "   Surgical find-and-replace. The 'search' text must match exactly.\n"
+                  "   Only replaces the FIRST occurrence. REQUIRES PERMISSION."),
+    ("list_dir", "list_dir(path?)\n"
+                 "   List directory contents as a tree. Defaults to workspace root."),
+    ("grep_search", "grep_search(pattern, path?, extensions?)\n"
+                    "   Regex search across files. 'extensions' is a list like [\".py\", \".js\"]."),
+    ("file_outline", "file_outline(path)\n"
+                     "   Get structural outline (classes/functions for .py, headers for .md)."),
+    ("run_command", "run_command(command, cwd?)\n"
+                    "   Execute a shell command (PowerShell on Windows). REQUIRES PERMISSION."),
+    ("git_status", "git_status(path?)\n"
+                   "   Show git status of the workspace."),
+    ("git_diff", "git_diff(path?)\n"
+                 "   Show uncommitted changes."),
+    ("git_commit", "git_commit(message, path?)\n"
+                   "    Stage all and commit. REQUIRES PERMISSION."),
+    ("write_analysis", "write_analysis(filename, content)\n"
+                       "    Create a structured Markdown analysis/report file in the workspace.\n"
+                       "    Use this for analyse/review/audit/summarize tasks. Safe — no permission needed."),
+    ("done", "done(message)\n"
+             "    Finish the task and show your final response to the user."),
+]
+
+# Tools that are only described when the request (or the session so far) calls for them
+OPTIONAL_TOOL_KEYWORDS = {
+    "run_command": ("run", "test", "tests", "pytest", "install", "build", "compile", "execute", "command",
+                    "script", "npm", "pip", "lint", "verify", "start", "server"),
+    "git_status": ("git", "status", "changes", "changed", "commit", "uncommitted"),
+    "git_diff": ("git", "diff", "changes", "changed", "commit", "uncommitted", "review"),
+    "git_commit": ("git", "commit"),
+}
 
-7. run_command(command, cwd?)
-   Execute a shell command (PowerShell on Windows). REQUIRES PERMISSION.
 
-8. git_status(path?)
-   Show git status of the workspace.
+def render_tools(names, start=1):
+    """Tool list for the given names, in TOOL_DOCS order, numbered from start."""
+    docs = [doc for name, doc in TOOL_DOCS if name in names]
+    return "\n\n".join(f"{i}. {doc}" for i, doc in enumerate(docs, start))
 
-9. git_diff(path?)
-   Show uncommitted changes.
 
-10. git_commit(message, path?)
-    Stage all and commit. REQUIRES PERMISSION.
+def optional_tools_for(text):
+    """Optional tools whose keywords appear in the text."""
+    words = set(re.findall(r"[a-z]+", str(text).lower()))
+    return {name for name, keywords in OPTIONAL_TOOL_KEYWORDS.items() if words & set(keywords)}
 
-11. write_analysis(filename, content)
-    Create a structured Markdown analysis/report file in the workspace.
-    Use this for analyse/review/audit/summarize tasks. Safe — no permission needed.
 
-12. done(message)
-    Finish the task and show your final response to the user.
+CORE_TOOLS = [name for name, _ in TOOL_DOCS if name not in OPTIONAL_TOOL_KEYWORDS]
 
+_TOOL_RULES = """
 RESPONSE FORMAT (strict JSON, no markdown wrapping):
 {
     "thought": "Brief reasoning about what to do next",
@@ -85,6 +100,22 @@ RULES:
 - If a tool returns an error, adapt your approach.
 """
 
+# What the system prompt carries: core tools only, the rest arrive with the request
+CORE_TOOL_DOC = (
+    "\nAVAILABLE TOOLS (respond with exactly one tool call per message):\n\n"
+    + render_tools(CORE_TOOLS) + "\n\n"
+    "Shell and git tools (run_command, git_status, git_diff, git_commit) are listed with a request when it needs them.\n"
+    + _TOOL_RULES
+)
+
+
+def additional_tools_doc(names, described=()):
+    """
+    The optional tools a request needs, numbered on from the core tools in the
+    system prompt and the optional tools already described earlier in the turn.
+    """
+    return "ADDITIONAL TOOLS:\n\n" + render_tools(names, start=len(CORE_TOOLS) + len(described) + 1)
+
 
 class CodingAgent:
     """
@@ -169,7 +200,7 @@ class CodingAgent:
                 f"{tess_md_content}\n\n"
             )
 
-        prompt += TOOL_SCHEMA_DOC
+        prompt += CORE_TOOL_DOC
 
         prompt += (
             "\n\nBEHAVIOR:\n"
@@ -204,6 +235,11 @@ class CodingAgent:
 
         messages.append({"role": "user", "content": user_query})
 
+        # Describe the optional tools this request (or the session so far) needs
+        history_text = " ".join(str(m.get("content", "")) for m in self.session_history[-10:])
+        described = set()
+        self._describe_tools(messages, described, user_query, history_text)
+
         step = 0
         while step < MAX_AGENT_STEPS:
             step += 1
@@ -291,12 +327,22 @@ class CodingAgent:
             # Feed result back to the LLM
             messages.append({"role": "assistant", "content": response_text})
             messages.append({"role": "user", "content": f"Tool result for {tool}:\n{result}"})
+            # What the agent just learned may call for tools the request didn't mention
+            self._describe_tools(messages, described, thought, result)
 
             time.sleep(0.3)  # Brief pause for readability
 
         else:
             print_error(f"Agent loop reached maximum steps ({MAX_AGENT_STEPS}).")
 
+    @staticmethod
+    def _describe_tools(messages, described, *texts):
+        """Appends the docs of optional tools the texts call for that this turn hasn't described yet."""
+        needed = set().union(*(optional_tools_for(text) for text in texts)) - described
+        if needed:
+            messages.append({"role": "system", "content": additional_tools_doc(needed, described)})
+            described |= needed
+
     def _execute_tool(self, tool, args):
         """Dispatch a tool call to the CodingTools methods."""
         try:
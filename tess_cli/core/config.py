@@ -40,7 +40,44 @@ class Config:
                 "openai": [],
                 "deepseek": [],
                 "gemini": []
-            }
+            },
+            "cache": {
+                "enabled": True,
+                "max_entries": 2000,
+                "ttl_hours": 168
+            },
+            "routing": {
+                "mode": "failover",  # single, failover, hedged
+                "hedge_after_ms": 2500,
+                "cooldown_seconds": 60,
+                "failure_threshold": 3,
+                # Model used when a request is routed to a provider other than the main one
+                "models": {
+                    "groq": "llama-3.3-70b-versatile",
+                    "openai": "gpt-4o-mini",
+                    "deepseek": "deepseek-chat",
+                    "gemini": "gemini-2.0-flash"
+                }
+            },
+            # Conversation history budget (tokens): verbatim recent turns, running summary, hard cap
+            "context": {
+                "max_request_tokens": 12000,
+                "recent_tokens": 4000,
+                "summary_tokens": 600,
+                "reserve_completion_tokens": 1024
+            },
+            # Profile / knowledge / vault lookups run concurrently; slower sources are skipped
+            "enrichment": {
+                "timeout_ms": 400
+            },
+            # Attach only the actions relevant to each request instead of the full list
+            "action_catalog": {
+                "enabled": True,
+                "top_k": 6
+            },
+            # Per-key budgets for the shared rate limiter, e.g. {"groq": {"rpm": 30, "tpm": 12000}}.
+            # Providers without one are not throttled up front; 429s still cool their keys down.
+            "limits": {}
         },
         "security": {
             "level": "MEDIUM",  # LOW, MEDIUM, HIGH
@@ -61,7 +98,8 @@ class Config:
             "privacy_aura": False,
             "digital_twin": False,
             "screencast": True,
-            "coding": True
+            "coding": True,
+            "intent_router": True  # Answer simple commands locally, without an LLM call
         },
         "advanced": {
             "notifications": True,
@@ -88,6 +126,43 @@ class Config:
                 "watch_path": "."
             }
         },
+        # Local memory storage. backend: "json" (journal + BM25 index) or "sqlite" (FTS5, WAL).
+        # JSON journal: fsync at most this often, fold into the snapshot after N records,
+        # re-save the BM25 index after index_save_every new memories.
+        "memory": {
+            "backend": "json",
+            # Knowledge-base vectors: "auto" (ChromaDB if importable, else built-in), "chroma" or "local"
+            "vector_backend": "auto",
+            "fsync_interval_ms": 1000,
+            "compact_after": 5000,
+            "index_save_every": 500,
+            # Lifecycle: past the cap, the coldest unpinned memories go to {user}_archive.jsonl.gz
+            "max_entries_per_user": 10000,
+            "evict_to": 0.9,
+            "half_life_days": 30,
+            # Writes within dedup_max_distance SimHash bits of a stored memory refresh it instead
+            "dedup": True,
+            "dedup_max_distance": 3,
+            # learn_directory: reader/chunker threads, and chunks per vector-store upsert
+            "ingest_workers": 8,
+            "ingest_batch_chunks": 512,
+            # Files over ingest_max_file_mb are skipped; a run stops reading after ingest_max_run_mb
+            "ingest_max_file_mb": 8,
+            "ingest_max_run_mb": 1024,
+            # Knowledge chunks: at most chunk_tokens each (.py by def/class, .md by heading, else line windows)
+            "chunk_tokens": 400,
+            # Vectors cached on disk by content hash (~/.tess/embedding_cache.db); texts per model call
+            "embedding_cache": True,
+            "embedding_cache_entries": 200000,
+            "embedding_batch": 64,
+            # Knowledge search: vector + lexical candidates per side, fused with RRF (k = rrf_k);
+            # reranker "cross-encoder" re-scores them (needs sentence-transformers)
+            "search_candidates": 20,
+            "rrf_k": 60,
+            "reranker": None,
+            # Repeated knowledge searches are answered from an LRU cache until the next write (0 disables)
+            "query_cache_entries": 256
+        },
         "paths": {
             "workspace": os.path.join(TESS_DIR, "workspace"),
             "memory_db": os.path.join(TESS_DIR, "vector_db")
@@ -223,8 +298,20 @@ class Config:
     }
 
     @classmethod
-    def get_system_prompt(cls, personality="casual"):
+    def get_system_prompt(cls, personality="casual", include_actions=None):
+        """
+        The main chat system prompt. With the action catalog enabled (the default),
+        the action list is left out and the relevant actions are attached to each
+        request instead, which keeps this prefix short and identical across turns.
+        """
         personality_text = cls.PERSONALITY_PROMPTS.get(personality.lower(), cls.PERSONALITY_PROMPTS["casual"])
+        if include_actions is None:
+            include_actions = not cls._data["llm"].get("action_catalog", {}).get("enabled", True)
+        if include_actions:
+            from .action_catalog import ActionCatalog
+            actions = ActionCatalog.shared().render()
+        else:
+            actions = "- Each request comes with an [ACTIONS] block listing the actions relevant to it. Use those (or reply_op).\n"
         
         return (
             "You are TESS, a Terminal-based Executive Support System. "
@@ -267,49 +354,7 @@ class Config:
             "- Every action MUST have a data parameter (usually 'content', 'command', or 'query').\n"
             "- **KEEP YOUR 'THOUGHT' FIELD EXTREMELY BRIEF (1 sentence max).**\n"
             "\nAVAILABLE ACTIONS:\n"
-            "- final_reply: Use 'content' for the final message.\n"
-            "- reply_op: Use 'content' for the chat message.\n"
-            "- launch_app: Use 'app_name' or 'content'.\n"
-            "- system_control: sub_action ('screenshot', 'lock', etc.).\n"
-            "- execute_command: Use 'command' or 'content'. REQUIRED.\n"
-            "- file_op: sub_action ('read', 'list', 'write'). Use 'path' and 'content'.\n"
-            "- web_search_op: Use 'query' or 'content'. finds info, not for playing music.\n"
-            "- web_op: Use 'url' or 'content'. Extracts text. DO NOT use for YouTube.\n"
-            "- youtube_op: sub_action ('play', 'pause', 'next', 'stop'). Use 'query' for 'play'. STRICTLY for playing music. Example: play='him and i', stop=sub_action 'stop'.\n"
-            "  * CRITICAL: TESS manages its own headless browser. DO NOT check if Chrome is open or try to launch 'youtube' first.\n"
-            "  * CRITICAL: If YouTube fails, DO NOT fallback to web_search. Report the error.\n"
-            "- gmail_op: Use 'to', 'subject', 'body'.\n"
-            "- calendar_op: Use 'summary', 'start'.\n"
-            "- pdf_op: sub_action ('merge', 'split', 'extract_text', 'replace_text', 'create'). Use 'source', 'output_name', 'pages', 'search', 'replace', 'content'.\n"
-            "  * merge (source: 'file1,file2'), split (pages: '1-5'), extract_text, replace_text\n"
-            "- code_op(sub_action, filename, content, pattern, search, replace): \n"
-            "  * scaffold, write, execute, test, fix\n"
-            "  * analyze, outline, replace_block, ls\n"
-            "  * ralph_build: Launch the autonomous GSD builder loop for an entire directory. Use path='path/to/project'.\n"
-            "- git_op(sub_action, message): status, commit, push, log, diff.\n"
-            "- whatsapp_op: Use 'contact' and 'message'.\n"
-            "  * sub_action='send'. Use this to literally SEND a message to someone on WhatsApp.\n"
-            "  * sub_action='monitor' or 'chat'. Use this to just OPEN the chat window.\n"
-            "  * CRITICAL: If user asks you to 'tell X something', 'talk to X', or 'message X', USE THIS TOOL. DO NOT say you cannot send messages.\n"
-            "- instagram_op: Use 'username' and 'message' (if sending).\n"
-            "  * sub_action='authenticate'. Run this ONCE if the user asks you to log into Instagram.\n"
-            "  * sub_action='send'. Use this to autonomously send a DM to an Instagram username without opening the UI.\n"
-            "  * sub_action='read'. Use this to read the recent chat history with a username BEFORE replying to them.\n"
-            "  * sub_action='monitor' or 'chat'. Use this to visibly open the DM conversation with a username.\n"
-            "- experimental_op: sub_action ('toggle_privacy', 'simulate'). Use 'target' for simulation.\n"
-            "- presentation_op: topic, count, style ('modern', 'classic', 'tech', 'minimal', 'gaia', 'uncover'), format ('pptx', 'md'), output_name.\n"
-            "- broadcast_op: sub_action ('start', 'stop'). Streams screen to phone/other devices.\n"
-            "- vault_op: sub_action ('store', 'get', 'list', 'delete'). Use 'key' and 'value' (for store).\n"
-            "  * Secure storage for sensitive API keys, passwords, or personal secrets.\n"
-            "  * Use 'get' to retrieve a secret. NEVER reveal secrets unless explicitly asked.\n"
-            "- memory_op: sub_action ('remember', 'recall', 'forget'). Use 'content' (fact) or 'query'.\n"
-            "  * Explicitly store user facts/details. E.g. 'Remember that my favorite color is blue'.\n"
-            "- pentest_op: sub_action ('scan'). Use 'target'. Example: target='127.0.0.1'.\n"
-            "  * Launch network vulnerability mapping via Nmap. Only use on permitted local targets.\n"
-            "- rag_op: sub_action ('index', 'query'). Use 'path' for index, 'query' for query.\n"
-            "  * Indexes local documents (PDF, TXT, MD, DOCX) into a vector database for semantic search.\n"
-            "- coding_mode_op: sub_action ('enter'). Optional 'path' to specify workspace directory.\n"
-            "  * Enters an interactive coding agent mode (like Claude Code). Use when the user wants to do complex multi-step coding work.\n"
+            f"{actions}"
             "\n"
             "STRICT OPERATIONAL RULES (OVERRIDES ALL ABOVE):\n"
             "1. JSON ONLY. No preamble.\n"
@@ -346,6 +391,12 @@ class Config:
         # Return key at index (modulo to wrap around)
         return keys[index % len(keys)]
 
+    @classmethod
+    def get_key_count(cls, provider=None):
+        """Number of API keys configured for the provider."""
+        if not provider: provider = cls._data["llm"]["provider"]
+        return len(cls._data["llm"]["keys"].get(provider, []))
+
     @classmethod
     def is_module_enabled(cls, module_name):
         # Check both modules and advanced sections
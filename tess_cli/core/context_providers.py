@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from .config import Config
+from .logger import setup_logger
+from .shared_state import file_signature
+
+logger = setup_logger("ContextProviders")
+
+# Shared by every Brain; sources are small I/O-bound lookups
+_EXECUTOR = ThreadPoolExecutor(max_workers=6, thread_name_prefix="tess-context")
+
+
+class ContextProvider:
+    """One source of [CTX] text. fetch() returns a string (empty when there is nothing to add)."""
+    name = "provider"
+
+    def enabled(self):
+        return True
+
+    def fetch(self, query):
+        raise NotImplementedError
+
+
+class FileCachedProvider(ContextProvider):
+    """
+    Caches _load() until one of paths() changes on disk, so the common case is a
+    couple of stat() calls instead of parsing (or decrypting) the file.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._value = ""
+
+    def paths(self):
+        raise NotImplementedError
+
+    def _load(self):
+        raise NotImplementedError
+
+    def fetch(self, query):
+        signature = file_signature(*self.paths())
+        with self._lock:
+            if signature == self._signature:
+                return self._value
+        value = self._load() or ""
+        with self._lock:
+            self._signature, self._value = signature, value
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+
+
+class ProfileProvider(FileCachedProvider):
+    name = "profile"
+
+    def paths(self):
+        from .user_profile import UserProfile
+        return [UserProfile.PROFILE_PATH]
+
+    def _load(self):
+        from .user_profile import UserProfile
+        # Read-only: don't count a new session for every request
+        return UserProfile(track_session=False).get_facts_context()
+
+
+class VaultProvider(FileCachedProvider):
+    name = "vault"
+
+    def enabled(self):
+        return Config.is_module_enabled("vault")
+
+    def paths(self):
+        from .vault_manager import VaultManager
+        return [VaultManager.VAULT_FILE, VaultManager.KEY_FILE]
+
+    def _load(self):
+        from .vault_manager import VaultManager
+        keys = VaultManager().list_secrets()
+        return f"[VAULT] Available Keys: {', '.join(keys)}" if keys else ""
+
+
+class KnowledgeProvider(ContextProvider):
+    name = "knowledge"
+
+    def __init__(self, brain):
+        self.brain = brain  # Read per call: knowledge_db may be attached after the Brain is built
+
+    def enabled(self):
+        return self.brain.knowledge_db is not None
+
+    def fetch(self, query):
+        mem = self.brain.knowledge_db.search_memory(query, n_results=1)
+        return f"[KEY_MEMORY] {mem}" if mem and "No match" not in mem else ""
+
+
+class ContextGatherer:
+    """
+    Runs the context providers concurrently and joins their output in provider order.
+
+    Each source gets llm.enrichment.timeout_ms; a slow source is left out of this
+    request rather than delaying it (its thread finishes in the background, which
+    also warms the file caches for the next request).
+    """
+    def __init__(self, providers):
+        self.providers = list(providers)
+
+    @classmethod
+    def for_brain(cls, brain):
+        return cls([ProfileProvider(), KnowledgeProvider(brain), VaultProvider()])
+
+    @property
+    def timeout(self):
+        settings = Config._data["llm"].get("enrichment", {})
+        return settings.get("timeout_ms", 400) / 1000
+
+    def _run(self, provider, query):
+        start = time.perf_counter()
+        try:
+            return provider.fetch(query)
+        except Exception as e:
+            logger.warning(f"Context source '{provider.name}' failed: {e}")
+            return ""
+        finally:
+            logger.debug(f"Context source '{provider.name}' took {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def gather(self, query):
+        active = [p for p in self.providers if p.enabled()]
+        if not active: return ""
+
+        futures = [_EXECUTOR.submit(self._run, p, query) for p in active]
+        done, _ = wait(futures, timeout=self.timeout)
+
+        parts = []
+        for provider, future in zip(active, futures):
+            if future in done:
+                parts.append(future.result())
+            else:
+                logger.warning(f"Context source '{provider.name}' timed out; skipping it for this request.")
+        return "\n".join(filter(None, parts))
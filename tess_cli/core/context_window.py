@@ -0,0 +1,251 @@
+import threading
+from .config import Config
+from .logger import setup_logger
+
+# Optional: exact BPE counts. Falls back to a ~4 chars/token estimate.
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = setup_logger("ContextWindow")
+
+# Context window (tokens) by model-name fragment; first match wins
+MODEL_CONTEXT_LIMITS = [
+    ("gpt-4o", 128000),
+    ("gpt-4.1", 1000000),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4", 8192),
+    ("gpt-3.5", 16385),
+    ("o1", 200000),
+    ("o3", 200000),
+    ("llama-3.1", 131072),
+    ("llama-3.2", 131072),
+    ("llama-3.3", 131072),
+    ("llama-4", 131072),
+    ("llama3", 8192),
+    ("mixtral", 32768),
+    ("gemma", 8192),
+    ("deepseek", 65536),
+    ("gemini", 1000000),
+]
+DEFAULT_CONTEXT_LIMIT = 8192
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and TESS, their desktop assistant. "
+    "Merge the new turns into the existing summary. Keep names, preferences, decisions, facts, file paths "
+    "and unfinished tasks; drop greetings and chit-chat. Stay under {words} words. "
+    "Reply with the updated summary only."
+)
+
+
+def context_limit(model):
+    model = (model or "").lower()
+    for fragment, limit in MODEL_CONTEXT_LIMITS:
+        if fragment in model:
+            return limit
+    return DEFAULT_CONTEXT_LIMIT
+
+
+class TokenCounter:
+    """Token counts for one model: tiktoken when installed, ~4 chars/token otherwise."""
+    PER_MESSAGE = 4  # Role and framing overhead per chat message
+
+    _encodings = {}  # encoding name -> tiktoken Encoding (or None if unavailable)
+
+    def __init__(self, model):
+        self.model = model or ""
+        self.limit = context_limit(self.model)
+        self._encoding = self._load_encoding(self.model)
+
+    @classmethod
+    def _load_encoding(cls, model):
+        if tiktoken is None: return None
+        # Other providers' tokenizers aren't public; cl100k is a close enough proxy
+        name = "o200k_base" if any(tag in model for tag in ("gpt-4o", "gpt-4.1", "o1", "o3")) else "cl100k_base"
+        if name not in cls._encodings:
+            try:
+                cls._encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                # Needs the BPE file on first use; offline installs fall back to estimates
+                logger.debug(f"tiktoken encoding {name} unavailable: {e}")
+                cls._encodings[name] = None
+        return cls._encodings[name]
+
+    def count(self, text):
+        text = str(text or "")
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def count_message(self, message):
+        return self.count(message.get("content")) + self.PER_MESSAGE
+
+    def count_messages(self, messages):
+        return sum(self.count_message(m) for m in messages)
+
+    def truncate(self, text, max_tokens):
+        """Cuts text to at most max_tokens, keeping its head and tail."""
+        text = str(text or "")
+        if max_tokens <= 0: return ""
+        tokens = self.count(text)
+        if tokens <= max_tokens: return text
+        keep = len(text) * max_tokens // tokens
+        while keep > 0:
+            half = keep // 2
+            clipped = f"{text[:half]}\n[...truncated...]\n{text[len(text) - half:]}"
+            if self.count(clipped) <= max_tokens: return clipped
+            keep = keep * 4 // 5
+        return ""
+
+
+class ConversationWindow:
+    """
+    Keeps a Brain's conversation inside a token budget (config llm.context).
+
+    - Leading system messages and the newest turns are sent verbatim.
+    - Once the verbatim turns outgrow recent_tokens, the oldest ones are folded
+      into a running summary by a background thread and dropped from history,
+      so the user never waits on summarisation.
+    - build() enforces a hard per-request budget: the system prompt and the
+      latest message always go, then the action list, then context, then as
+      many recent turns as fit.
+    """
+    def __init__(self, brain):
+        self.brain = brain
+        self.summary = ""
+        self._lock = threading.Lock()
+        self._worker = None
+        self._counter = None
+
+    @property
+    def settings(self):
+        return Config._data["llm"].get("context", {})
+
+    @property
+    def counter(self):
+        if self._counter is None or self._counter.model != self.brain.model:
+            self._counter = TokenCounter(self.brain.model)
+        return self._counter
+
+    def budget(self):
+        """Hard cap on prompt tokens for a single request."""
+        settings = self.settings
+        model_room = self.counter.limit - settings.get("reserve_completion_tokens", 1024)
+        return max(min(settings.get("max_request_tokens", 12000), model_room), 1024)
+
+    def reset(self):
+        with self._lock:
+            self.summary = ""
+
+    @staticmethod
+    def _split(history):
+        """(pinned leading system messages, conversation turns)."""
+        pinned = 0
+        while pinned < len(history) and history[pinned].get("role") == "system":
+            pinned += 1
+        return history[:pinned], history[pinned:]
+
+    def build(self, context=None, actions=None):
+        """
+        Messages for the next request, trimmed to budget(). Per-request blocks
+        (actions, context) go just before the latest message, after the stable prefix.
+        """
+        counter = self.counter
+        with self._lock:
+            pinned, turns = self._split(list(self.brain.history))
+            if self.summary:
+                pinned.append({"role": "system", "content": f"[SUMMARY]\n{self.summary}"})
+
+        remaining = self.budget() - counter.count_messages(pinned)
+        latest, older = turns[-1:], turns[:-1]
+        if latest:
+            cost = counter.count_message(latest[0])
+            if cost > remaining:
+                clipped = counter.truncate(latest[0]["content"], max(remaining - counter.PER_MESSAGE, 0))
+                latest = [{**latest[0], "content": clipped}]
+                cost = counter.count_message(latest[0])
+            remaining -= cost
+
+        tail = []
+        if actions:
+            tail = [{"role": "system", "content": actions}]
+            remaining -= counter.count_message(tail[0])
+
+        ctx = []
+        if context:
+            # Tags and framing take ~8 tokens
+            text = counter.truncate(context, remaining - counter.PER_MESSAGE - 8)
+            if text:
+                ctx = [{"role": "system", "content": f"[CTX]\n{text}\n[/CTX]"}]
+                remaining -= counter.count_message(ctx[0])
+
+        kept = []
+        for message in reversed(older):
+            cost = counter.count_message(message)
+            if cost > remaining: break
+            kept.append(message)
+            remaining -= cost
+        kept.reverse()
+
+        if len(kept) < len(older):
+            logger.debug(f"Context budget: dropped {len(older) - len(kept)} old turn(s) from this request.")
+        return pinned + kept + ctx + tail + latest
+
+    def maybe_fold(self):
+        """Starts a background fold if the verbatim turns outgrow recent_tokens."""
+        if self._worker is not None and self._worker.is_alive(): return
+
+        history = self.brain.history
+        pinned, turns = self._split(list(history))
+        recent = self.settings.get("recent_tokens", 4000)
+        total = self.counter.count_messages(turns)
+        # Fold in batches, not on every turn: wait until we're a quarter over
+        if total <= recent * 1.25: return
+
+        chunk = []
+        for message in turns[:-1]: # The newest message always stays verbatim
+            if total <= recent: break
+            chunk.append(message)
+            total -= self.counter.count_message(message)
+        if not chunk: return
+
+        self._worker = threading.Thread(
+            target=self._fold, args=(history, len(pinned), chunk), daemon=True, name="tess-history-fold"
+        )
+        self._worker.start()
+
+    def _fold(self, history, start, chunk):
+        words = max(self.settings.get("summary_tokens", 600) * 3 // 4, 50)
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in chunk)
+        messages = [
+            {"role": "system", "content": SUMMARY_PROMPT.format(words=words)},
+            {"role": "user", "content": f"[SUMMARY]\n{self.summary or '(empty)'}\n\n[NEW TURNS]\n{transcript}"}
+        ]
+        try:
+            summary = self.brain.request_completion(messages, temperature=0.3)
+        except Exception as e:
+            logger.warning(f"History fold failed: {e}")
+            return
+        if not summary: return
+
+        with self._lock:
+            # History may have been reset or swapped while we were summarising
+            current = history[start:start + len(chunk)]
+            if self.brain.history is not history or len(current) != len(chunk) or any(a is not b for a, b in zip(current, chunk)):
+                logger.debug("History changed during fold; discarding summary.")
+                return
+            del history[start:start + len(chunk)]
+            self.summary = summary.strip()
+
+        logger.info(f"Folded {len(chunk)} turn(s) into the running summary.")
+        if self.brain.memory:
+            try:
+                self.brain.memory.store_memory(f"Context: {self.summary}")
+            except Exception as e:
+                logger.warning(f"Failed to store summary: {e}")
+
+    def wait(self, timeout=None):
+        """Blocks until a running fold finishes (tests, shutdown)."""
+        worker = self._worker
+        if worker is not None: worker.join(timeout)
@@ -0,0 +1,229 @@
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+import numpy as np
+from .config import Config
+from .learn_manifest import content_hash
+from .logger import setup_logger
+
+logger = setup_logger("EmbeddingService")
+
+
+class ChromaDefaultEmbedder:
+    """Chroma's DefaultEmbeddingFunction (all-MiniLM-L6-v2 on ONNX) behind the embedder interface."""
+    name = "chroma-default"
+
+    def __init__(self):
+        from chromadb.utils import embedding_functions
+        self.fn = embedding_functions.DefaultEmbeddingFunction()
+        self._dim = None
+
+    @property
+    def dim(self):
+        if self._dim is None:
+            self._dim = len(self(["dimension probe"])[0])
+        return self._dim
+
+    def __call__(self, texts):
+        return np.asarray(self.fn(list(texts)), dtype=np.float32)
+
+
+class EmbeddingCache:
+    """
+    Vectors on disk keyed by (model, content hash of the text), in a SQLite file
+    shared by every process. Past max_entries the oldest writes are dropped.
+    """
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, max_entries=200000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._since_prune = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (model TEXT NOT NULL, key TEXT NOT NULL, "
+            "vector BLOB NOT NULL, PRIMARY KEY (model, key))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model, keys):
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                for key, blob in self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({marks})", [model] + batch):
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model, items):
+        """items: [(key, vector)]."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)",
+                [(model, key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+            self._since_prune += len(items)
+            if self._since_prune >= self.PRUNE_EVERY:
+                self._since_prune = 0
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class EmbeddingService:
+    """
+    One embedding model per process, shared by every KnowledgeBase caller
+    (learn_directory, Librarian, CommandIndexer, Researcher, memory search).
+
+    Texts already in the EmbeddingCache are answered from disk, so re-indexing
+    identical text never re-embeds. The rest are queued to a dedicated worker
+    thread that merges whatever requests are waiting into batches of up to
+    max_batch texts (identical texts embedded once) and runs the model on them.
+
+    Behaves like an embedder (name, dim, __call__(texts) -> float32 matrix), so
+    LocalVectorStore takes it directly; chroma_function() adapts it for Chroma.
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, embedder, cache=None, max_batch=64):
+        self.embedder = embedder
+        self.name = embedder.name
+        self.cache = cache
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"texts": 0, "cache_hits": 0, "embedded": 0, "batches": 0}
+
+    @classmethod
+    def shared(cls, kind="local"):
+        """
+        The process-wide service for kind: "chroma" (Chroma's default model) or
+        "local" (sentence-transformers if installed, else hashing).
+        """
+        settings = Config._data.get("memory", {})
+        cache_path = os.path.join(Config.TESS_DIR, "embedding_cache.db") if settings.get("embedding_cache", True) else None
+        key = (kind, cache_path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                if kind == "chroma":
+                    embedder = ChromaDefaultEmbedder()
+                else:
+                    from .vector_store import default_embedder
+                    embedder = default_embedder()
+                cache = None
+                if cache_path:
+                    try:
+                        cache = EmbeddingCache(cache_path, settings.get("embedding_cache_entries", 200000))
+                    except Exception as e:
+                        logger.warning(f"Embedding cache unavailable ({e}); embedding without it.")
+                cls._instances[key] = cls(embedder, cache, settings.get("embedding_batch", 64))
+            return cls._instances[key]
+
+    @property
+    def dim(self):
+        return self.embedder.dim
+
+    def __call__(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        keys = [content_hash(t.encode("utf-8")) for t in texts]
+        vectors = self.cache.get_many(self.name, set(keys)) if self.cache else {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing[key] = text
+        with self._stats_lock:
+            self.stats["texts"] += len(texts)
+            self.stats["cache_hits"] += len(texts) - sum(1 for k in keys if k in missing)
+        if missing:
+            future = Future()
+            self._ensure_worker()
+            self._queue.put((missing, future))
+            vectors.update(future.result())
+        return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+    embed = __call__
+
+    def chroma_function(self):
+        return ChromaEmbeddingFunction(self)
+
+    # ─── Worker ──────────────────────────────────────────────────────────
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="tess-embedder", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            requests = [self._queue.get()]
+            pending = dict(requests[0][0])
+            # Merge everything already waiting, up to one batch
+            while len(pending) < self.max_batch:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                requests.append(request)
+                pending.update(request[0])
+            try:
+                vectors = self._embed(pending)
+            except Exception as e:
+                logger.error(f"Embedding failed: {e}")
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            for texts, future in requests:
+                future.set_result({key: vectors[key] for key in texts})
+
+    def _embed(self, pending):
+        keys = list(pending)
+        vectors = {}
+        for start in range(0, len(keys), self.max_batch):
+            batch = keys[start:start + self.max_batch]
+            out = np.asarray(self.embedder([pending[k] for k in batch]), dtype=np.float32)
+            vectors.update(zip(batch, out))
+            with self._stats_lock:
+                self.stats["embedded"] += len(batch)
+                self.stats["batches"] += 1
+        if self.cache:
+            try:
+                self.cache.put_many(self.name, list(vectors.items()))
+            except Exception as e:
+                logger.warning(f"Could not cache embeddings: {e}")
+        return vectors
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['texts']} texts, {s['cache_hits']} from cache, "
+                f"{s['embedded']} embedded in {s['batches']} batches ({self.name})")
+
+
+class ChromaEmbeddingFunction:
+    """Chroma's embedding-function interface over an EmbeddingService."""
+
+    def __init__(self, service):
+        self.service = service
+
+    def __call__(self, input):
+        return [vector.tolist() for vector in self.service(input)]
@@ -0,0 +1,309 @@
+import codecs
+import hashlib
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("Ingest")
+
+TEXT_EXTENSIONS = {'.py', '.md', '.txt', '.json', '.js', '.html', '.css', '.c', '.cpp', '.h', '.java'}
+SKIP_DIRS = {"vector_db", ".git", "__pycache__"}
+
+WINDOW = 1024 * 1024          # Bytes read per step when streaming a file
+SNIFF_BYTES = 64 * 1024       # Head of the file checked for binary / minified content
+MINIFIED_LINE = 1000          # Average line length (bytes) above which text counts as minified
+
+
+def scan_files(root, extensions=TEXT_EXTENSIONS, skip_dirs=SKIP_DIRS):
+    """
+    Yields (path, stat) for every file under root with one of the extensions.
+    os.scandir hands back file types with the listing, so directories cost
+    one call each and only matching files are stat'ed.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            listing = os.scandir(directory)
+        except OSError as e:
+            logger.warning(f"Cannot list {directory}: {e}")
+            continue
+        with listing:
+            for entry in listing:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in skip_dirs:
+                            stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                        yield entry.path, entry.stat()
+                except OSError:
+                    continue
+
+
+def byte_budgets():
+    """(per-file, per-run) byte limits from memory.ingest_max_file_mb / ingest_max_run_mb; None means no limit."""
+    settings = Config._data.get("memory", {})
+    limits = []
+    for key, default in (("ingest_max_file_mb", 8), ("ingest_max_run_mb", 1024)):
+        mb = settings.get(key, default)
+        limits.append(int(mb * 1024 * 1024) if mb else None)
+    return tuple(limits)
+
+
+def chunk_ids(file_path, chunks):
+    return [f"{file_path}_{i}" for i in range(chunks)]
+
+
+def chunk_metadata(file_path, chunk, index, total):
+    meta = {"source": file_path, "chunk_index": index, "total_chunks": total,
+            "start_line": chunk["start_line"], "end_line": chunk["end_line"]}
+    if chunk.get("symbol"):
+        meta["symbol"] = chunk["symbol"]
+    return meta
+
+
+def sniff(head, file_path=""):
+    """Why a file that starts with head should not be indexed ("binary" / "minified"), or None."""
+    if b"\0" in head[:8192]:
+        return "binary"
+    sample = head[:8192]
+    control = sum(1 for b in sample if b < 9 or 13 < b < 32)
+    if sample and control / len(sample) > 0.1:
+        return "binary"
+    name = os.path.basename(file_path).lower()
+    if ".min." in name:
+        return "minified"
+    if len(head) >= 4096 and len(head) / (head.count(b"\n") + 1) > MINIFIED_LINE:
+        return "minified"
+    return None
+
+
+def file_digest(file_path, window=WINDOW):
+    """content_hash of a file, read in windows."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        while True:
+            data = f.read(window)
+            if not data: break
+            h.update(data)
+    return h.hexdigest()
+
+
+def read_chunks(file_path, chunker, max_bytes=None, window=WINDOW):
+    """
+    Streams a file through chunker (see chunkers.chunker_for) in fixed windows.
+    Returns (skip, digest, chunks): skip is None, "too_large", "binary" or
+    "minified" (then digest and chunks are None). Text is decoded as UTF-8 (errors ignored) with universal
+    newlines, as reading in text mode would.
+    """
+    if max_bytes is not None and os.path.getsize(file_path) > max_bytes:
+        return "too_large", None, None
+    h = hashlib.blake2b(digest_size=16)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    chunks, carry = [], ""
+    with open(file_path, 'rb') as f:
+        data = f.read(max(window, SNIFF_BYTES))
+        skip = sniff(data, file_path)
+        if skip:
+            return skip, None, None
+        while data:
+            h.update(data)
+            text = carry + decoder.decode(data)
+            # A \r at the end may be the first half of \r\n
+            carry = "\r" if text.endswith("\r") else ""
+            text = text[:-1] if carry else text
+            chunks += chunker.feed(text.replace("\r\n", "\n").replace("\r", "\n"))
+            data = f.read(window)
+    tail = (carry + decoder.decode(b"", final=True)).replace("\r", "\n")
+    chunks += chunker.feed(tail) + chunker.finish()
+    return None, h.hexdigest(), chunks
+
+
+class IngestPipeline:
+    """
+    Staged directory learning for KnowledgeBase.
+
+    The calling thread walks the tree and drops files the manifest says are
+    unchanged. A thread pool streams the rest through read_chunks (hash,
+    decode and chunk in fixed windows), with at most workers * 4 files and
+    IN_FLIGHT_BYTES in flight (backpressure: the walk waits for the oldest).
+    Results are batched into multi-file upserts of about batch_chunks chunks;
+    a file is recorded in the manifest only once its batch is stored, and the
+    manifest is saved every SAVE_EVERY seconds, so an interrupted run resumes
+    close to where it stopped.
+
+    Files over max_file_bytes, binary and minified files are skipped (and any
+    chunks they had are dropped); once max_run_bytes have been read, the rest
+    of the run is skipped, keeping what was indexed before. Skips are listed
+    in `skipped` as (path, reason).
+
+    progress(stats) is called after every batch and once at the end.
+    """
+    SAVE_EVERY = 10.0
+    IN_FLIGHT_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, collection, manifest, chunker, workers=8, batch_chunks=512, progress=None, legacy=None,
+                 max_file_bytes=None, max_run_bytes=None, chunking=None):
+        self.collection = collection
+        self.manifest = manifest
+        self.chunker = chunker  # file path -> a fresh chunker for that file
+        # Chunker settings recorded per file; files chunked under others are re-chunked
+        self.chunking = chunking
+        self.workers = max(1, workers)
+        self.batch_chunks = batch_chunks
+        self.progress = progress
+        # Chunk ids by source for files indexed before there was a manifest
+        self.legacy = legacy or {}
+        self.max_file_bytes = max_file_bytes
+        self.max_run_bytes = max_run_bytes
+        self.stats = {"scanned": 0, "indexed": 0, "unchanged": 0, "removed": 0, "chunks": 0, "failed": 0,
+                      "skipped": 0, "bytes_read": 0}
+        self.skipped = []
+        self._reset_batch()
+        self._saved_at = time.monotonic()
+
+    def _reset_batch(self):
+        self._ids, self._documents, self._metadatas = [], [], []
+        self._stale, self._records = [], []
+
+    # ─── Stages ──────────────────────────────────────────────────────────
+
+    def _prepare(self, file_path, st, old):
+        """Worker stage: stream, hash and chunk one file."""
+        try:
+            # A touched file is hashed first, so unchanged content is never chunked
+            if old and st.st_size == old["size"] and file_digest(file_path) == old["hash"]:
+                return "touched", file_path, st, old["hash"], None
+            skip, digest, chunks = read_chunks(file_path, self.chunker(file_path), self.max_file_bytes)
+            if skip:
+                return skip, file_path, st, None, None
+            return "changed", file_path, st, digest, chunks
+        except Exception as e:
+            logger.error(f"Failed to index {file_path}: {e}")
+            return "failed", file_path, st, None, None
+
+    def _skip(self, file_path, reason):
+        self.stats["skipped"] += 1
+        self.skipped.append((file_path, reason))
+        logger.info(f"Skipped {file_path}: {reason.replace('_', ' ')}")
+
+    def _collect(self, result):
+        """Batcher stage: queue a prepared file for the next upsert."""
+        kind, file_path, st, digest, chunks = result
+        if kind == "failed":
+            self.stats["failed"] += 1
+            return
+        old = self.manifest.get(file_path)
+        if kind == "touched":
+            self.manifest.record(file_path, st, digest, old["chunks"], self.chunking)
+            self.stats["unchanged"] += 1
+            return
+
+        previous = chunk_ids(file_path, old["chunks"]) if old else self.legacy.get(file_path, [])
+        if kind != "changed":
+            # No longer indexable: its old chunks go with the next batch
+            self._skip(file_path, kind)
+            self._stale += previous
+            if old:
+                self.manifest.forget(file_path)
+            return
+        ids = chunk_ids(file_path, len(chunks))
+        self._stale += sorted(set(previous) - set(ids))
+        self._ids += ids
+        self._documents += [c["text"] for c in chunks]
+        self._metadatas += [chunk_metadata(file_path, c, i, len(chunks)) for i, c in enumerate(chunks)]
+        self._records.append((file_path, st, digest, len(chunks)))
+        if len(self._ids) >= self.batch_chunks:
+            self._flush()
+
+    def _flush(self):
+        if not self._records and not self._stale: return
+        try:
+            if self._ids:
+                self.collection.upsert(documents=self._documents, ids=self._ids, metadatas=self._metadatas)
+            if self._stale:
+                self.collection.delete(ids=self._stale)
+        except Exception as e:
+            logger.error(f"Failed to store a batch of {len(self._records)} files: {e}")
+            self.stats["failed"] += len(self._records)
+        else:
+            for file_path, st, digest, chunks in self._records:
+                self.manifest.record(file_path, st, digest, chunks, self.chunking)
+                self.stats["indexed"] += 1 if chunks else 0
+            self.stats["chunks"] += len(self._ids)
+            if time.monotonic() - self._saved_at > self.SAVE_EVERY:
+                self.manifest.save()
+                self._saved_at = time.monotonic()
+        self._reset_batch()
+        self._report()
+
+    def _purge(self, root, seen):
+        """Drops the chunks of files that disappeared from under root."""
+        for file_path in set(self.manifest.paths_under(root)) - seen:
+            try:
+                ids = chunk_ids(file_path, self.manifest.get(file_path)["chunks"])
+                if ids:
+                    self.collection.delete(ids=ids)
+                self.manifest.forget(file_path)
+                self.stats["removed"] += 1
+            except Exception as e:
+                logger.error(f"Failed to purge {file_path}: {e}")
+        for file_path in set(self.legacy) - seen:
+            try:
+                self.collection.delete(ids=self.legacy[file_path])
+                self.stats["removed"] += 1
+            except Exception as e:
+                logger.error(f"Failed to purge {file_path}: {e}")
+
+    def _report(self):
+        if self.progress:
+            try:
+                self.progress(dict(self.stats))
+            except Exception as e:
+                logger.debug(f"Progress callback failed: {e}")
+
+    # ─── Driver ──────────────────────────────────────────────────────────
+
+    def skipped_summary(self):
+        """e.g. "2 binary, 1 too large"; empty when nothing was skipped."""
+        counts = Counter(reason for _, reason in self.skipped)
+        return ", ".join(f"{n} {reason.replace('_', ' ')}" for reason, n in sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def run(self, root):
+        seen = set()
+        pending = deque()
+        pending_bytes = 0
+        max_pending = self.workers * 4
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tess-ingest") as pool:
+            for file_path, st in scan_files(root):
+                seen.add(file_path)
+                self.stats["scanned"] += 1
+                if self.manifest.unchanged(file_path, st, self.chunking):
+                    self.stats["unchanged"] += 1
+                    continue
+                if self.max_file_bytes is not None and st.st_size > self.max_file_bytes:
+                    self._collect(("too_large", file_path, st, None, None))
+                    continue
+                if self.max_run_bytes is not None and self.stats["bytes_read"] + st.st_size > self.max_run_bytes:
+                    self._skip(file_path, "run_budget")
+                    continue
+                self.stats["bytes_read"] += st.st_size
+                old = self.manifest.get(file_path)
+                if old and old.get("chunking") != self.chunking:
+                    old = None  # Same content still needs re-chunking
+                pending.append((pool.submit(self._prepare, file_path, st, old), st.st_size))
+                pending_bytes += st.st_size
+                while pending and (len(pending) >= max_pending or pending_bytes > self.IN_FLIGHT_BYTES):
+                    future, size = pending.popleft()
+                    pending_bytes -= size
+                    self._collect(future.result())
+            while pending:
+                self._collect(pending.popleft()[0].result())
+        self._flush()
+        self._purge(root, seen)
+        self.manifest.save()
+        self._report()
+        return self.stats
@@ -0,0 +1,213 @@
+import os
+import re
+from pydantic import TypeAdapter, ValidationError
+from .schemas import TessAction
+from .logger import setup_logger
+
+logger = setup_logger("IntentRouter")
+
+# Politeness and wake words that don't change what the user wants
+_FILLER_RE = re.compile(
+    r"^(?:(?:hey|hi|ok|okay|yo)\s+)?(?:tess\s*[,:]?\s*)?(?:(?:can|could|would|will)\s+you\s+)?(?:please\s+)?|(?:\s+please|\s+now|\s+tess)+$",
+    re.IGNORECASE
+)
+
+# Folder names people say instead of paths
+KNOWN_FOLDERS = {
+    "downloads": "~/Downloads",
+    "desktop": "~/Desktop",
+    "documents": "~/Documents",
+    "docs": "~/Documents",
+    "pictures": "~/Pictures",
+    "photos": "~/Pictures",
+    "music": "~/Music",
+    "videos": "~/Videos",
+    "home": "~",
+}
+
+# Words that mean an "open X" request is about something other than an app
+_NOT_AN_APP = re.compile(r"[\\/]|\.\w{1,4}$|\b(?:file|folder|directory|tab|url|link|website|site|http|www|project|document|pdf)\b",
+                         re.IGNORECASE)
+
+# Whole "open X" objects that point back at something said earlier; only the LLM has that context
+_BACK_REFERENCES = r"(?:it|this|that|these|those|them|one|ones|again|both|all|everything|something|anything|another|same)"
+
+# "google maps" is the product, not a search for "maps"
+_GOOGLE_PRODUCTS = r"(?:maps|drive|docs|sheets|slides|chrome|calendar|photos|meet|earth|translate|mail|gmail|keep|play|assistant|home)"
+
+# Objects of "search ..." that mean the user's own things, not the web
+_LOCAL_SEARCH = r"(?: for)? (?:(?:my|our) |the (?:files?|folders?|computer|code|memor|project|repo|disk|drive)\b)"
+
+_YT_CONTROLS = {
+    "pause": "pause", "resume": "pause", "stop": "stop", "next": "next", "skip": "next",
+    "previous": "prev", "prev": "prev", "mute": "mute", "unmute": "mute", "fullscreen": "fullscreen",
+}
+
+
+def _folder(path):
+    path = path.strip().strip("'\"")
+    key = re.sub(r"^(?:my|the)\s+", "", path.lower()).rstrip("/\\")
+    if key in KNOWN_FOLDERS:
+        return os.path.expanduser(KNOWN_FOLDERS[key])
+    return path
+
+
+# (pattern, builder) pairs, tried in order. Patterns must match the whole normalised query; they ignore
+# case, and captured paths and queries keep the user's casing.
+RULES = [
+    (r"(?:turn (?:the )?volume up|volume up|louder|increase (?:the )?volume|raise (?:the )?volume)",
+     lambda m: {"action": "system_control", "sub_action": "volume_up"}),
+    (r"(?:turn (?:the )?volume down|volume down|quieter|decrease (?:the )?volume|lower (?:the )?volume)",
+     lambda m: {"action": "system_control", "sub_action": "volume_down"}),
+    (r"(?:un)?mute(?: (?:the )?(?:sound|audio|volume|speakers?|computer|pc))?",
+     lambda m: {"action": "system_control", "sub_action": "mute"}),
+    (r"(?P<word>pause|stop|mute|unmute|resume|next|skip|previous|prev|fullscreen)(?: the)? (?:youtube|video)(?: video)?|youtube (?P<word2>pause|stop|mute|unmute|resume|next|skip|previous|prev|fullscreen)",
+     lambda m: {"action": "youtube_op", "sub_action": _YT_CONTROLS[(m.group("word") or m.group("word2")).lower()]}),
+    (r"play (?P<query>.+?) on youtube|youtube play (?P<query2>.+)",
+     lambda m: {"action": "youtube_op", "sub_action": "play", "query": (m.group("query") or m.group("query2")).strip()}),
+    (r"(?:play|pause|resume)(?: the)?(?: music| media| song| track| playback)?|play ?pause",
+     lambda m: {"action": "system_control", "sub_action": "play_pause"}),
+    (r"(?:next|skip)(?: the)?(?: song| track)?|skip this(?: song| track)?",
+     lambda m: {"action": "system_control", "sub_action": "media_next"}),
+    (r"(?:previous|prev|last)(?: song| track)|go back a (?:song|track)",
+     lambda m: {"action": "system_control", "sub_action": "media_prev"}),
+    (r"(?:take (?:a )?)?screen ?shot|capture (?:the )?screen",
+     lambda m: {"action": "system_control", "sub_action": "screenshot"}),
+    (r"lock(?: (?:the|my))?(?: screen| computer| pc| laptop| workstation)?",
+     lambda m: {"action": "system_control", "sub_action": "lock"}),
+    (r"(?:list|show)(?: (?:me|all|the))*(?: running)? (?:processes|tasks)",
+     lambda m: {"action": "system_control", "sub_action": "list_processes"}),
+    (r"(?:list|show)(?: (?:me|all|the|my))*(?: files| contents| folders)(?: of| in| inside| under) (?P<path>.+)"
+     r"|what'?s in (?P<path2>(?:my |the )?(?:" + "|".join(KNOWN_FOLDERS) + r"))",
+     lambda m: {"action": "file_op", "sub_action": "list", "path": _folder(m.group("path") or m.group("path2"))}),
+    # The lookahead sits right after the verb, so skipping the optional "for" can't get around it
+    (r"(?:search|look up)(?!" + _LOCAL_SEARCH + r")(?: the web| online| google)?(?: for)? (?P<query>.+)"
+     r"|google(?: for (?P<query2>.+)| (?!" + _GOOGLE_PRODUCTS + r"\b)(?!(?:my|our) )(?P<query3>\S+(?: \S+)+))",
+     lambda m: {"action": "web_search_op", "query": (m.group("query") or m.group("query2") or m.group("query3")).strip()}),
+    # One-word app names, or longer ones said as "... app"; "open my email" / "open the pod bay doors" /
+    # "open it" go to the LLM
+    (r"(?:open|launch) (?:up )?(?!(?:my|your|our|the|a|an|this|that) |" + _BACK_REFERENCES + r"$)"
+     r"(?:(?P<app>[\w.+&-]{2,40})|(?P<named>[\w .+&-]{2,40}?) (?:app|application|program))",
+     lambda m: None if _NOT_AN_APP.search(m.group("app") or m.group("named")) or len((m.group("named") or "").split()) > 3
+     else {"action": "launch_app", "app_name": (m.group("app") or m.group("named")).strip()}),
+]
+RULES = [(re.compile(pattern, re.IGNORECASE), builder) for pattern, builder in RULES]
+
+# Sub-actions the classifier may emit: argument-free and harmless. Shutdown/restart/sleep
+# always go through the LLM (and the security layer's confirmation).
+CLASSIFIABLE = {
+    "system_control": {"volume_up", "volume_down", "mute", "play_pause", "media_next", "media_prev",
+                       "screenshot", "list_processes", "lock"},
+    "youtube_op": {"pause", "next", "prev", "stop", "mute", "vol_up", "vol_down", "fullscreen"},
+}
+
+# Vocabulary folding so "song"/"track" land on media_*, "vol" on volume, etc.
+_ALIASES = {
+    "vol": "volume", "louder": "volume", "quieter": "volume", "increase": "up", "raise": "up",
+    "decrease": "down", "lower": "down", "prev": "previous", "back": "previous", "skip": "next",
+    "song": "media", "track": "media", "music": "media", "playback": "media", "resume": "play",
+    "video": "youtube", "yt": "youtube", "processes": "process", "tasks": "process",
+    "screen": "screenshot", "capture": "screenshot", "unmute": "mute",
+}
+_ACTION_WORDS = {"system_control": {"system", "computer", "pc"}, "youtube_op": {"youtube"}}
+# Actions only chosen when the query names them ("mute" alone is the system mixer)
+_NAMED_ONLY = {"youtube_op"}
+_STOPWORDS = {"the", "a", "an", "my", "on", "this", "it", "to", "of", "and", "me", "turn", "go", "take", "show", "list", "running", "all"}
+
+
+def _tokens(text):
+    words = re.findall(r"[a-z]+", text.lower().replace("_", " "))
+    return {_ALIASES.get(w, w) for w in words if w not in _STOPWORDS}
+
+
+class SchemaIntentClassifier:
+    """
+    Tiny keyword classifier over the argument-free sub-actions in schemas.TessAction.
+
+    Each (action, sub_action) label is described by the words of its sub-action name
+    plus the action's own keywords. Confidence is how fully the label is covered by
+    the query times how fully the query is explained by the label, so extra words
+    ("pause the video about cats") push requests back to the LLM.
+    """
+    def __init__(self, labels=None):
+        self.labels = labels or self._labels_from_schemas()
+
+    @staticmethod
+    def _labels_from_schemas():
+        labels = []
+        for model in TessAction.__args__:
+            fields = model.model_fields
+            action = fields["action"].annotation.__args__[0]
+            if action not in CLASSIFIABLE or "sub_action" not in fields: continue
+            for sub in fields["sub_action"].annotation.__args__:
+                if sub in CLASSIFIABLE[action]:
+                    labels.append((action, sub, _tokens(sub), _ACTION_WORDS.get(action, set())))
+        return labels
+
+    def classify(self, text):
+        """Best (action, sub_action, confidence) and the runner-up's confidence."""
+        query = _tokens(text)
+        if not query: return (None, None, 0.0), 0.0
+        scored = []
+        for action, sub, sub_words, action_words in self.labels:
+            if action in _NAMED_ONLY and not query & action_words: continue
+            covered = len(sub_words & query) / len(sub_words)
+            explained = len(query & (sub_words | action_words)) / len(query)
+            scored.append((covered * explained, action, sub))
+        scored.sort(reverse=True)
+        if not scored: return (None, None, 0.0), 0.0
+        best = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        return (best[1], best[2], best[0]), runner_up
+
+
+class IntentRouter:
+    """
+    Answers frequent, unambiguous commands locally so they skip the LLM round trip.
+
+    Pattern rules go first (confidence 1.0), then the schema classifier for short
+    control phrases. Anything uncertain returns None and goes to the Brain as usual.
+    Routed actions are validated against schemas.TessAction and tagged "fast_path".
+    """
+    MAX_WORDS = 12  # Longer requests are rarely one-shot commands
+
+    def __init__(self, classifier=None, min_confidence=0.8, min_margin=0.25):
+        self.classifier = classifier or SchemaIntentClassifier()
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self._validator = TypeAdapter(TessAction)
+
+    @staticmethod
+    def normalise(text):
+        """Whitespace collapsed and fillers dropped. Case is kept: paths and queries are captured from this text."""
+        text = " ".join(str(text).split()).strip(" .!?")
+        previous = None
+        while previous != text:
+            previous, text = text, _FILLER_RE.sub("", text).strip(" ,.!?")
+        return text
+
+    def route(self, user_query):
+        text = self.normalise(user_query)
+        if not text or len(text.split()) > self.MAX_WORDS: return None
+
+        cmd, confidence = None, 0.0
+        for pattern, builder in RULES:
+            match = pattern.fullmatch(text)
+            if match:
+                cmd, confidence = builder(match), 1.0
+                break
+
+        if cmd is None and len(text.split()) <= 4:
+            (action, sub, score), runner_up = self.classifier.classify(text)
+            if score >= self.min_confidence and score - runner_up >= self.min_margin:
+                cmd, confidence = {"action": action, "sub_action": sub}, round(score, 2)
+
+        if not cmd: return None
+        try:
+            self._validator.validate_python(cmd)
+        except ValidationError as e:
+            logger.debug(f"Fast path produced an invalid action, deferring to LLM: {e}")
+            return None
+
+        logger.info(f"Fast path: '{text}' -> {cmd['action']} ({confidence})")
+        return {**cmd, "thought": "Handled locally (fast path).", "fast_path": True, "confidence": confidence}
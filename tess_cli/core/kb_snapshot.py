@@ -0,0 +1,204 @@
+import io
+import json
+import os
+import struct
+import tempfile
+import time
+import zipfile
+import numpy as np
+from .chunkers import chunking_signature
+from .learn_manifest import LearnManifest, content_hash
+from .logger import setup_logger
+
+logger = setup_logger("KBSnapshot")
+
+# A knowledge-base snapshot is one zip file:
+#   snapshot.json        format, version, embedder, dimension, chunk count, chunking signature
+#   chunks.jsonl         one {"id", "document", "metadata"} per line (deflated)
+#   embeddings.npy       float16 rows, row i for line i of chunks.jsonl. Stored, not deflated:
+#                        float vectors barely compress, and a stored member can be
+#                        memory-mapped straight out of the zip
+#   learn_manifest.json  size, mtime, content hash and chunk count per learned file
+FORMAT = "tess-kb-snapshot"
+SNAPSHOT_VERSION = 1
+PAGE = 1024
+
+HEADER = "snapshot.json"
+CHUNKS = "chunks.jsonl"
+EMBEDDINGS = "embeddings.npy"
+MANIFEST = "learn_manifest.json"
+
+
+def _manifest_path(kb):
+    return os.path.join(kb.db_path, "learn_manifest.json")
+
+
+def write_snapshot(kb, path, progress=None):
+    """
+    Writes every chunk in kb.collection, its embedding and the learn manifest
+    to path (replaced atomically). Pages of PAGE chunks are read at a time; the
+    vectors are staged in a memory-mapped temp file until the chunk text is
+    written. progress(stats) is called after every page. Returns the stats.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    total = kb.collection.count()
+    stats = {"chunks": 0, "total": total, "files": 0, "bytes": 0}
+    fd, staging = tempfile.mkstemp(suffix=".npy", dir=directory)
+    os.close(fd)
+    tmp = path + ".tmp"
+    vectors = None
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            with zf.open(CHUNKS, "w", force_zip64=True) as raw:
+                out = io.TextIOWrapper(raw, encoding="utf-8", newline="\n")
+                while stats["chunks"] < total:
+                    page = kb.collection.get(include=["documents", "metadatas", "embeddings"],
+                                             limit=PAGE, offset=stats["chunks"])
+                    if not page["ids"]: break
+                    embeddings = page.get("embeddings")
+                    if embeddings is None:
+                        embeddings = kb.embedder(page["documents"])
+                    embeddings = np.asarray(embeddings, dtype=np.float32)
+                    if vectors is None:
+                        vectors = np.lib.format.open_memmap(staging, mode="w+", dtype=np.float16,
+                                                            shape=(total, embeddings.shape[1]))
+                    n = min(len(page["ids"]), total - stats["chunks"])
+                    vectors[stats["chunks"]:stats["chunks"] + n] = embeddings[:n]
+                    for doc_id, doc, meta in list(zip(page["ids"], page["documents"], page["metadatas"]))[:n]:
+                        out.write(json.dumps({"id": doc_id, "document": doc, "metadata": meta or {}},
+                                             ensure_ascii=False) + "\n")
+                    stats["chunks"] += n
+                    if progress:
+                        progress(dict(stats))
+                out.flush()
+                out.detach()
+
+            count = stats["chunks"]
+            dim = vectors.shape[1] if vectors is not None else (kb.embedder.dim if kb.embedder else 0)
+            info = zipfile.ZipInfo(EMBEDDINGS, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            with zf.open(info, "w", force_zip64=True) as f:
+                rows = vectors[:count] if vectors is not None else np.zeros((0, dim), dtype=np.float16)
+                np.lib.format.write_array(f, np.ascontiguousarray(rows), version=(1, 0))
+
+            files = LearnManifest(_manifest_path(kb)).files
+            stats["files"] = len(files)
+            zf.writestr(MANIFEST, json.dumps(files))
+            zf.writestr(HEADER, json.dumps({
+                "format": FORMAT,
+                "version": SNAPSHOT_VERSION,
+                "embedder": kb.embedder.name if kb.embedder else None,
+                "dim": int(dim),
+                "count": count,
+                "chunking": chunking_signature(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }, indent=2))
+        del vectors
+        os.replace(tmp, path)
+    finally:
+        for leftover in (staging, tmp):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+    stats["bytes"] = os.path.getsize(path)
+    logger.info(f"Wrote knowledge-base snapshot {path}: {stats}")
+    return stats
+
+
+def read_header(zf):
+    try:
+        header = json.loads(zf.read(HEADER))
+    except KeyError:
+        raise ValueError("not a TESS knowledge-base snapshot")
+    if header.get("format") != FORMAT:
+        raise ValueError("not a TESS knowledge-base snapshot")
+    if header.get("version", 0) > SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot format v{header['version']} is newer than this TESS reads "
+                         f"(v{SNAPSHOT_VERSION}); upgrade TESS to import it")
+    return header
+
+
+def open_embeddings(path, zf):
+    """The embedding matrix, memory-mapped from the zip when the member is stored uncompressed."""
+    info = zf.getinfo(EMBEDDINGS)
+    if info.compress_type != zipfile.ZIP_STORED:
+        with zf.open(info) as f:
+            return np.load(io.BytesIO(f.read()))
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        local = f.read(30)
+        if local[:4] != b"PK\x03\x04":
+            raise ValueError("corrupt snapshot (bad embeddings header)")
+        name_len, extra_len = struct.unpack("<HH", local[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        if version != (1, 0):
+            raise ValueError(f"unsupported embeddings layout (npy v{version[0]}.{version[1]})")
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        offset = f.tell()
+    if not shape[0]:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran else "C")
+
+
+def load_snapshot(kb, path, progress=None):
+    """
+    Bulk-loads a snapshot into kb: chunks are upserted PAGE at a time with their
+    stored embeddings (through kb.collection, so the lexical index follows), the
+    learn manifest is merged so unchanged files aren't re-chunked by the next
+    learn_directory, and the vectors seed the embedding cache. Raises ValueError
+    for files that aren't snapshots, newer formats and embedder mismatches.
+    """
+    with zipfile.ZipFile(path) as zf:
+        header = read_header(zf)
+        name = kb.embedder.name if kb.embedder else None
+        if header.get("embedder") != name:
+            raise ValueError(f"snapshot embeddings come from '{header.get('embedder')}' but this knowledge base "
+                             f"uses '{name}'; they would have to be re-embedded")
+        vectors = open_embeddings(path, zf)
+        if len(vectors) != header["count"]:
+            raise ValueError(f"corrupt snapshot ({len(vectors)} embeddings for {header['count']} chunks)")
+        stats = {"chunks": 0, "total": header["count"], "files": 0}
+        cache = getattr(kb.embedder, "cache", None)
+
+        def flush(batch):
+            start = stats["chunks"]
+            embeddings = np.asarray(vectors[start:start + len(batch)], dtype=np.float32)
+            documents = [r["document"] for r in batch]
+            kb.collection.upsert(ids=[r["id"] for r in batch], documents=documents,
+                                 metadatas=[r["metadata"] for r in batch], embeddings=embeddings.tolist())
+            if cache is not None:
+                try:
+                    cache.put_many(name, [(content_hash((doc or "").encode("utf-8")), vector)
+                                          for doc, vector in zip(documents, embeddings)])
+                except Exception as e:
+                    logger.warning(f"Could not seed the embedding cache: {e}")
+            stats["chunks"] += len(batch)
+            if progress:
+                progress(dict(stats))
+
+        with zf.open(CHUNKS) as raw:
+            batch = []
+            for line in io.TextIOWrapper(raw, encoding="utf-8"):
+                if not line.strip(): continue
+                batch.append(json.loads(line))
+                if len(batch) == PAGE:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+        if stats["chunks"] != header["count"]:
+            logger.warning(f"Snapshot {path} listed {header['count']} chunks but held {stats['chunks']}.")
+
+        files = json.loads(zf.read(MANIFEST)) if MANIFEST in zf.namelist() else {}
+        if files:
+            manifest = LearnManifest(_manifest_path(kb))
+            manifest.merge(files)
+            manifest.save()
+        stats["files"] = len(files)
+        del vectors
+    logger.info(f"Loaded knowledge-base snapshot {path}: {stats}")
+    return stats
@@ -8,6 +8,14 @@ try:
 except Exception:
     CHROMADB_AVAILABLE = False
 
+from .config import Config
+from .embedding_service import EmbeddingService
+from .chunkers import chunker_for, chunking_signature
+from .ingest import IngestPipeline, byte_budgets
+from .kb_snapshot import load_snapshot, write_snapshot
+from .learn_manifest import LearnManifest
+from .retrieval import CrossEncoderReranker, HybridRetriever, IndexedCollection, LexicalIndex, QueryCache
+
 try:
     from .logger import setup_logger
     logger = setup_logger("KnowledgeBase")
@@ -16,129 +24,230 @@ except Exception:
     logger = logging.getLogger("KnowledgeBase")
 
 
+# Metadata marker on memories stored by store_memory (ids "mem_..."), whatever their "type"
+MEMORY_KIND = {"kind": "memory"}
+
+
 class KnowledgeBase:
     """
     Manages long-term memory using ChromaDB.
-    Gracefully degrades if ChromaDB is unavailable (e.g. Python 3.14).
+    Gracefully degrades to the built-in LocalVectorStore plus JSON memory if
+    ChromaDB is unavailable (e.g. Python 3.14).
     """
     
     def __init__(self, db_path="vector_db"):
         self.available = CHROMADB_AVAILABLE
         self.collection = None
+        self.embedder = None
         self.embedding_fn = None
         self.fallback_engine = None
-        
-        if not self.available:
-            logger.warning("ChromaDB unavailable — switching to JSON Fallback (MemoryEngine).")
-            # Fallback to simple JSON memory
+        self.retriever = None
+        self.query_cache = QueryCache(Config._data.get("memory", {}).get("query_cache_entries", 256))
+        self._generation = 0  # Writes that bypass the collection (fallback memory)
+        self._dedup = None
+        self.db_path = db_path
+        backend = Config._data.get("memory", {}).get("vector_backend", "auto")
+
+        if self.available and backend != "local":
             try:
-                from .memory_engine import MemoryEngine
-                self.fallback_engine = MemoryEngine()
+                self.client = chromadb.PersistentClient(path=db_path)
+                self.embedder = EmbeddingService.shared("chroma")
+                self.embedding_fn = self.embedder.chroma_function()
+                self.collection = self.client.get_or_create_collection(
+                    name="tess_knowledge",
+                    embedding_function=self.embedding_fn
+                )
+                self._attach_retriever()
+                return
             except Exception as e:
-                logger.error(f"Fallback MemoryEngine init failed: {e}")
-            return
-        
+                logger.error(f"ChromaDB init failed: {e}. Switching to the built-in vector store.")
+        elif backend != "local":
+            logger.warning("ChromaDB unavailable — switching to the built-in vector store and JSON memory (MemoryEngine).")
+
+        # Keyword memory alongside the local vectors
+        try:
+            from .memory_engine import MemoryEngine
+            self.fallback_engine = MemoryEngine(on_evict=self._forget_evicted)
+        except Exception as e:
+            logger.error(f"Fallback MemoryEngine init failed: {e}")
+
+        # Same collection surface as Chroma, backed by a memory-mapped NumPy matrix
         try:
-            self.client = chromadb.PersistentClient(path=db_path)
-            self.embedding_fn = embedding_functions.DefaultEmbeddingFunction()
-            self.collection = self.client.get_or_create_collection(
-                name="tess_knowledge",
-                embedding_function=self.embedding_fn
-            )
+            from .vector_store import LocalVectorStore
+            self.embedder = EmbeddingService.shared("local")
+            self.collection = LocalVectorStore(db_path, name="tess_knowledge", embedding_function=self.embedder)
+            self.available = True
+            self._attach_retriever()
         except Exception as e:
-            logger.error(f"ChromaDB init failed: {e}. Switching to Fallback.")
+            logger.error(f"Local vector store init failed: {e}")
             self.available = False
+
+    def _attach_retriever(self):
+        """Routes collection writes to a lexical index too, and searches both (HybridRetriever)."""
+        settings = Config._data.get("memory", {})
+        lexical = None
+        try:
+            lexical = LexicalIndex(os.path.join(self.db_path, "lexical.db"))
+        except Exception as e:
+            logger.error(f"Lexical index unavailable ({e}); search is vector-only.")
+        self.collection = IndexedCollection(self.collection, lexical)
+        reranker = None
+        if settings.get("reranker") == "cross-encoder":
             try:
-                from .memory_engine import MemoryEngine
-                self.fallback_engine = MemoryEngine()
-            except: pass
-        
-    def _chunk_text(self, text, max_chars=1000, overlap=100):
-        """Splits text into chunks of max_chars with overlap."""
-        chunks = []
-        start = 0
-        text_len = len(text)
-        
-        while start < text_len:
-            end = start + max_chars
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start += max_chars - overlap
-            
-        return chunks
+                reranker = CrossEncoderReranker()
+            except Exception as e:
+                logger.warning(f"Cross-encoder reranker unavailable ({e}); using fused ranking.")
+        self.retriever = HybridRetriever(self.collection, lexical, reranker,
+                                         candidates=settings.get("search_candidates", 20),
+                                         rrf_k=settings.get("rrf_k", 60))
+
+    def learn_directory(self, path=".", progress=None):
+        """
+        Recursively reads and indexes text files in the directory.
 
-    def learn_directory(self, path="."):
-        """Recursively reads and indexes text files in the directory."""
+        Incremental: a manifest of (size, mtime, content hash, chunk count) per
+        file means unchanged files are skipped, changed files replace exactly
+        their old chunks, and files deleted since the last run are purged.
+        Files are streamed and chunked in parallel and stored in batched upserts
+        (see IngestPipeline); progress(stats) is called after every batch.
+        Python is chunked at def/class boundaries, Markdown at headings, the
+        rest in token-budgeted line windows (see chunkers.py).
+        Binary, minified and oversized files are skipped and counted.
+        """
         if not self.available:
-             return "Deep learning disabled (ChromaDB missing). Only simple memory available."
+             return "Deep learning disabled (no vector store available). Only simple memory available."
             
         path = os.path.abspath(path)
         if not os.path.exists(path):
             return f"Error: Path {path} not found."
             
         logger.info(f"Indexing directory: {path}")
-        count = 0
-        
-        text_extensions = {'.py', '.md', '.txt', '.json', '.js', '.html', '.css', '.c', '.cpp', '.h', '.java'}
-        
-        for root, _, files in os.walk(path):
-            if "vector_db" in root or ".git" in root or "__pycache__" in root:
-                continue
-                
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext in text_extensions:
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            
-                        if not content.strip():
-                            continue
-                            
-                        chunks = self._chunk_text(content, max_chars=1500, overlap=150)
-                        
-                        ids = [f"{file_path}_{i}" for i in range(len(chunks))]
-                        metadatas = [{"source": file_path, "chunk_index": i, "total_chunks": len(chunks)} for i in range(len(chunks))]
-                        
-                        self.collection.upsert(
-                            documents=chunks,
-                            ids=ids,
-                            metadatas=metadatas
-                        )
-                        count += 1
-                        print(f"Indexed: {file_path}")
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to index {file_path}: {e}")
-                        
-        return f"Successfully indexed {count} files in '{path}'."
-
-    def search(self, query, n_results=3):
-        """Semantic search for the query."""
-        if self.available and self.collection:
+        settings = Config._data.get("memory", {})
+        max_file_bytes, max_run_bytes = byte_budgets()
+        manifest = LearnManifest(os.path.join(self.db_path, "learn_manifest.json"))
+        pipeline = IngestPipeline(
+            self.collection, manifest,
+            chunker=chunker_for,
+            chunking=chunking_signature(),
+            workers=settings.get("ingest_workers", 8),
+            batch_chunks=settings.get("ingest_batch_chunks", 512),
+            progress=progress,
+            # Chunks indexed before the manifest existed are found once, by source
+            legacy={} if manifest.paths_under(path) else self._chunk_ids_by_source(path),
+            max_file_bytes=max_file_bytes,
+            max_run_bytes=max_run_bytes
+        )
+        stats = pipeline.run(path)
+        logger.info(f"Indexed {path}: {stats}")
+        skipped = f", skipped {pipeline.skipped_summary()}" if pipeline.skipped else ""
+        return (f"Successfully indexed {stats['indexed']} files in '{path}' "
+                f"({stats['unchanged']} unchanged, {stats['removed']} removed{skipped}).")
+
+    def export_snapshot(self, path, progress=None):
+        """
+        Writes the whole vector knowledge base (chunks, metadata, embeddings and
+        the learn manifest) to one compressed, versioned file; see kb_snapshot.py.
+        """
+        if not self.available:
+            return "Nothing to export (no vector store available)."
+        try:
+            stats = write_snapshot(self, path, progress)
+        except Exception as e:
+            logger.error(f"Snapshot export failed: {e}")
+            return f"Error: Could not export the knowledge base: {e}"
+        return (f"Exported {stats['chunks']} chunks and {stats['files']} learned files to "
+                f"'{os.path.abspath(path)}' ({stats['bytes'] / (1024 * 1024):.1f} MB).")
+
+    def import_snapshot(self, path, progress=None):
+        """
+        Bulk-loads a snapshot written by export_snapshot, using its stored
+        embeddings instead of re-embedding. Chunks with the same id are replaced.
+        """
+        if not self.available:
+            return "Cannot import (no vector store available)."
+        if not os.path.isfile(path):
+            return f"Error: Snapshot {path} not found."
+        try:
+            stats = load_snapshot(self, path, progress)
+        except Exception as e:
+            logger.error(f"Snapshot import failed: {e}")
+            return f"Error: Could not import '{path}': {e}"
+        finally:
+            self._dedup = None  # Rebuilt over the imported memories on the next write
+            self.bump_generation()
+        return f"Imported {stats['chunks']} chunks and {stats['files']} learned files from '{os.path.abspath(path)}'."
+
+    def _chunk_ids_by_source(self, root):
+        """{source file: chunk ids} for file chunks under root already in the collection."""
+        prefix = root.rstrip(os.sep) + os.sep
+        by_source = {}
+        try:
+            stored = self.collection.get(include=["metadatas"])
+        except Exception as e:
+            logger.error(f"Could not list indexed chunks: {e}")
+            return by_source
+        for doc_id, meta in zip(stored["ids"], stored["metadatas"]):
+            source = (meta or {}).get("source")
+            if source and source.startswith(prefix) and "chunk_index" in meta:
+                by_source.setdefault(source, []).append(doc_id)
+        return by_source
+
+    @property
+    def generation(self):
+        """Changes on every write to the knowledge base; cached search results from older generations are stale."""
+        return (getattr(self.collection, "generation", 0), self._generation)
+
+    def bump_generation(self):
+        self._generation += 1
+
+    def retrieve(self, query, n_results=3):
+        """
+        Hybrid (vector + lexical) search. Returns hits best first, as dicts with
+        id, text, source, metadata, score, vector_rank and lexical_rank.
+        Repeated queries are answered from the query cache until the next write.
+        """
+        if not (self.available and self.retriever): return []
+        if isinstance(self.collection, IndexedCollection):
+            self.collection.sync()
+        key = ("retrieve", QueryCache.normalise(query), n_results)
+        hits = self.query_cache.get(key, self.generation)
+        if hits is None:
+            generation = self.generation
+            hits = self.retriever.retrieve(query, n_results)
+            self.query_cache.put(key, generation, hits)
+        return [dict(h) for h in hits]
+
+    def search(self, query, n_results=3, include_archive=False):
+        """Hybrid search for the query. include_archive also searches evicted JSON-fallback memories."""
+        key = ("search", QueryCache.normalise(query), n_results, include_archive)
+        generation = self.generation
+        cached = self.query_cache.get(key, generation)
+        if cached is not None:
+            return cached
+        result = self._search(query, n_results, include_archive)
+        self.query_cache.put(key, generation, result)
+        return result
+
+    def _search(self, query, n_results, include_archive):
+        if self.available and self.retriever:
             try:
-                results = self.collection.query(
-                    query_texts=[query],
-                    n_results=n_results
-                )
-                
-                output = ""
-                if not results['documents']:
+                hits = self.retrieve(query, n_results)
+                if hits:
+                    found = "".join(f"\n--- [Source: {h['source']} | score {h['score']:.3f}] ---\n{h['text']}\n" for h in hits)
+                    # Nearest neighbours always come back, so the archive is searched alongside, not as a fallback
+                    if include_archive and self.fallback_engine:
+                        texts = {h["text"] for h in hits}
+                        found += "".join(f"\n--- [Source: memory archive] ---\n{text}\n"
+                                         for text in self.fallback_engine.search_archive(query, n_results) if text not in texts)
+                    return found
+                if not self.fallback_engine:
                     return "No matching knowledge found."
-                    
-                for i, doc in enumerate(results['documents'][0]):
-                    meta = results['metadatas'][0][i]
-                    source = meta.get('source', 'unknown')
-                    output += f"\n--- [Source: {source}] ---\n{doc}\n"
-                    
-                return output
             except Exception as e:
                 logger.error(f"Search error: {e}")
         
         # Fallback
         if self.fallback_engine:
-             return "\n".join(self.fallback_engine.retrieve_context(query, limit=n_results))
+             return "\n".join(self.fallback_engine.retrieve_context(query, limit=n_results, include_archive=include_archive))
              
         return "Memory search unavailable."
 
@@ -151,36 +260,80 @@ class KnowledgeBase:
                 stats.append(f"Vector DB: {count} chunks")
             except: pass
         if self.fallback_engine:
-             stats.append(f"JSON Memory: {len(self.fallback_engine.memories)} entries")
+             stats.append(f"Local Memory ({self.fallback_engine.store.name}): {self.fallback_engine.count()} entries")
+             if self.fallback_engine.dedup_stats():
+                 stats.append(f"Memory dedup: {self.fallback_engine.dedup_stats()}")
+        if self._dedup is not None:
+            stats.append(f"Vector dedup: {self._dedup.summary()}")
+        if self.embedder is not None:
+            stats.append(f"Embeddings: {self.embedder.summary()}")
+        if stats:
+            stats.append(f"Query cache: {self.query_cache.summary()}")
              
         return "\n".join(stats) if stats else "Memory disabled."
 
     def store_memory(self, text, metadata=None):
         """Stores a conversation snippet or fact into the vector DB."""
         # Try JSON first for reliable simple memory
+        memory_id = None
         if self.fallback_engine:
-            self.fallback_engine.store_memory(text, metadata)
+            memory_id = self.fallback_engine.store_memory(text, metadata)
+            self.bump_generation()
             
         # Try Vector DB for semantic search
         if self.available:  
             try:
+                dedup = self._memory_dedup()
+                if dedup is not None and dedup.find(text):
+                    return True
+
                 if not metadata:
                     metadata = {"type": "conversation", "timestamp": "unknown"}
-                    
+                metadata = {**metadata, **MEMORY_KIND}
+
                 import time
-                doc_id = f"mem_{int(time.time()*1000)}"
+                # Same id as the JSON memory, so evicting it there drops it here too
+                doc_id = f"mem_{memory_id or int(time.time()*1000)}"
                 
                 self.collection.add(
                     documents=[text],
                     metadatas=[metadata],
                     ids=[doc_id]
                 )
+                if dedup is not None:
+                    dedup.add(doc_id, text)
             except Exception as e:
                 logger.error(f"Failed to store vector memory: {e}")
         return True
 
-    def search_memory(self, query, n_results=3):
+    def _forget_evicted(self, memory_ids):
+        """Drops memories the fallback engine archived from the collection; from then on only include_archive finds them."""
+        ids = [f"mem_{memory_id}" for memory_id in memory_ids]
+        if self._dedup is not None:
+            self._dedup.remove(ids)
+        if not self.collection: return
+        try:
+            self.collection.delete(ids=ids)
+        except Exception as e:
+            logger.error(f"Failed to drop evicted memories from the vector DB: {e}")
+
+    def _memory_dedup(self):
+        """Near-duplicate index over the memories (not file chunks) in the collection, built on first write."""
+        settings = Config._data.get("memory", {})
+        if not settings.get("dedup", True): return None
+        if self._dedup is None:
+            from .memory_dedup import NearDuplicateIndex
+            index = NearDuplicateIndex(max_distance=settings.get("dedup_max_distance", 3))
+            # Memories only: learned file chunks can run to hundreds of MB
+            stored = self.collection.get(where=MEMORY_KIND, include=["documents"])
+            for doc_id, doc in zip(stored["ids"], stored["documents"]):
+                if doc_id.startswith("mem_") and doc:
+                    index.add(doc_id, doc)
+            self._dedup = index
+        return self._dedup
+
+    def search_memory(self, query, n_results=3, include_archive=False):
         """Searches for conversation/memory items."""
-        return self.search(query, n_results)
+        return self.search(query, n_results, include_archive)
         
 
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import threading
+from .logger import setup_logger
+from .shared_state import atomic_write_json, lock_for, read_json
+
+logger = setup_logger("LearnManifest")
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class LearnManifest:
+    """
+    What KnowledgeBase.learn_directory has already indexed: for every file,
+    {size, mtime_ns, hash, chunks, chunking}.
+
+    A file whose size and mtime match is skipped without being read; one whose
+    content hash matches is skipped without being re-chunked. The chunk count
+    says exactly which chunk ids a file owns, so shrunk and deleted files can
+    be purged. A file chunked under different chunking settings counts as
+    changed. Stored as learn_manifest.json next to the vector database;
+    save() merges with other processes' runs under the file lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.files = read_json(path, default={}) or {}
+        self._changed = {}
+        self._removed = set()
+
+    def get(self, file_path):
+        return self.files.get(file_path)
+
+    def unchanged(self, file_path, st, chunking=None):
+        entry = self.files.get(file_path)
+        return (bool(entry) and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+                and entry.get("chunking") == chunking)
+
+    def record(self, file_path, st, digest, chunks, chunking=None):
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest, "chunks": chunks}
+        if chunking:
+            entry["chunking"] = chunking
+        with self._lock:
+            self.files[file_path] = entry
+            self._changed[file_path] = entry
+            self._removed.discard(file_path)
+
+    def merge(self, files):
+        """Adopts entries recorded elsewhere (a knowledge-base snapshot); saved by the next save()."""
+        with self._lock:
+            self.files.update(files)
+            self._changed.update(files)
+            self._removed.difference_update(files)
+
+    def forget(self, file_path):
+        with self._lock:
+            self.files.pop(file_path, None)
+            self._changed.pop(file_path, None)
+            self._removed.add(file_path)
+
+    def paths_under(self, root):
+        prefix = root.rstrip(os.sep) + os.sep
+        return [p for p in self.files if p.startswith(prefix)]
+
+    def save(self):
+        with self._lock:
+            changed, removed = dict(self._changed), set(self._removed)
+            self._changed, self._removed = {}, set()
+        if not changed and not removed: return
+        try:
+            with lock_for(self.path):
+                files = read_json(self.path, default={}) or {}
+                files.update(changed)
+                for file_path in removed:
+                    files.pop(file_path, None)
+                atomic_write_json(self.path, files, indent=None)
+            self.files = files
+        except Exception as e:
+            logger.error(f"Failed to save learn manifest: {e}")
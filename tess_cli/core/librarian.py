@@ -4,6 +4,8 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from .logger import setup_logger
 from .config import Config
+from .chunkers import chunker_for
+from .ingest import byte_budgets, chunk_metadata, read_chunks
 
 logger = setup_logger("Librarian")
 
@@ -36,24 +38,23 @@ class LibrarianHandler(FileSystemEventHandler):
         logger.info(f"Detected change in: {os.path.basename(event.src_path)}")
         
         try:
-            # Read content
-            with open(event.src_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-            if not content.strip(): return
+            # Stream and chunk the file; data dumps, binaries and minified bundles are skipped
+            skip, _, chunks = read_chunks(event.src_path, chunker_for(event.src_path), byte_budgets()[0])
+            if skip:
+                logger.info(f"Librarian skipped {os.path.basename(event.src_path)}: {skip.replace('_', ' ')}")
+                return
+            if not chunks: return
 
             # Update Knowledge Base (RAG)
             doc_id = f"file_{event.src_path}"
             
             # Upsert into ChromaDB
-            # Upsert into ChromaDB
-            chunks = self.kb._chunk_text(content, max_chars=1500, overlap=150)
-            
             ids = [f"{doc_id}_{i}" for i in range(len(chunks))]
-            metadatas = [{"source": event.src_path, "type": "code_file", "timestamp": str(now), "chunk_index": i} for i in range(len(chunks))]
+            metadatas = [dict(chunk_metadata(event.src_path, c, i, len(chunks)), type="code_file", timestamp=str(now))
+                         for i, c in enumerate(chunks)]
 
             self.kb.collection.upsert(
-                documents=chunks,
+                documents=[c["text"] for c in chunks],
                 metadatas=metadatas,
                 ids=ids
             )
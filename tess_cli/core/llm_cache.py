@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("LLMCache")
+
+
+class ResponseCache:
+    """
+    Persistent exact-match cache for LLM completions.
+
+    Entries live in a small SQLite file under ~/.tess, keyed by a hash of
+    (provider, model, temperature, normalised messages, json_mode).
+    Size is bounded LRU-style by last access, and entries expire after a TTL.
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    # How often (in writes) to run the eviction sweep
+    EVICT_EVERY = 50
+
+    def __init__(self, path=None, max_entries=2000, ttl_seconds=7 * 24 * 3600):
+        self.path = path or os.path.join(Config.TESS_DIR, "llm_cache.db")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.commit()
+
+    @classmethod
+    def shared(cls):
+        """Process-wide cache built from config, or None if caching is disabled."""
+        settings = Config._data["llm"].get("cache", {})
+        if not settings.get("enabled", True):
+            return None
+        with cls._shared_lock:
+            if cls._shared is None:
+                try:
+                    cls._shared = cls(
+                        max_entries=settings.get("max_entries", 2000),
+                        ttl_seconds=settings.get("ttl_hours", 168) * 3600
+                    )
+                except Exception as e:
+                    logger.error(f"Response cache unavailable: {e}")
+                    return None
+            return cls._shared
+
+    @staticmethod
+    def make_key(provider, model, temperature, messages, json_mode):
+        """Stable hash of everything that determines a completion."""
+        # Only line endings and the ends are normalised: indentation and newlines inside code change the answer
+        normalised = [
+            {"role": m.get("role"), "content": str(m.get("content", "")).replace("\r\n", "\n").replace("\r", "\n").strip()}
+            for m in messages
+        ]
+        payload = json.dumps({
+            "provider": provider,
+            "model": model,
+            "temperature": round(float(temperature), 3),
+            "json_mode": bool(json_mode),
+            "messages": normalised
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached response, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                    row = None
+                if not row:
+                    self.misses += 1
+                    return None
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+            except sqlite3.Error as e:
+                logger.warning(f"Cache read failed: {e}")
+                self.misses += 1
+                return None
+
+    def put(self, key, response):
+        if not response: return
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created, last_access) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._conn.commit()
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 1:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                logger.warning(f"Cache write failed: {e}")
+
+    def _evict(self, now):
+        """Drops expired entries, then the least recently used ones above max_entries."""
+        cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        removed = cur.rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            removed += cur.rowcount
+        self._conn.commit()
+        self.evictions += max(removed, 0)
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current entry count."""
+        with self._lock:
+            try:
+                entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            except sqlite3.Error:
+                entries = None
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
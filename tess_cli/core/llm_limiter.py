@@ -0,0 +1,194 @@
+import re
+import time
+import random
+import threading
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("LLMLimiter")
+
+_DURATION_RE = re.compile(r"([\d.]+)\s*(ms|h|m|s)")
+_RETRY_IN_RE = re.compile(r"(?:try again|retry) in ([\d.hms\s]+)", re.IGNORECASE)
+
+
+def parse_duration(text):
+    """'7.66s', '2m59.56s', '120ms' or a bare number of seconds -> seconds (None if unparseable)."""
+    text = str(text).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(text)
+    if not parts: return None
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(value) * units[unit] for value, unit in parts)
+
+
+def retry_after(error):
+    """Seconds the provider asked us to back off, from the 429's headers or message."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        value = headers.get(name)
+        if value:
+            seconds = parse_duration(value)
+            if seconds is not None: return seconds
+
+    # Groq: "Please try again in 7.66s", Gemini: "Please retry in 12.3s"
+    match = _RETRY_IN_RE.search(str(error))
+    return parse_duration(match.group(1)) if match else None
+
+
+def estimate_tokens(messages):
+    """Cheap prompt size estimate (~4 chars per token) used to reserve token budget."""
+    return sum(len(str(m.get("content", ""))) // 4 + 4 for m in messages)
+
+
+def usage_tokens(response):
+    """Total tokens a completion actually cost, if the provider reported it."""
+    usage = getattr(response, "usage", None) # OpenAI-compatible
+    if usage is not None:
+        return getattr(usage, "total_tokens", None)
+    meta = getattr(response, "usage_metadata", None) # Gemini
+    return getattr(meta, "total_token_count", None) if meta is not None else None
+
+
+class _KeyBudget:
+    """Token buckets (requests and tokens per minute) for one API key. A None limit is not metered."""
+    def __init__(self, rpm, tpm, now):
+        self.requests = float(rpm or 0)
+        self.tokens = float(tpm or 0)
+        self.updated = now
+        self.cooldown_until = 0.0
+        self.strikes = 0  # Consecutive 429s, drives the backoff when no retry-after was given
+        self.used = 0
+
+    def refill(self, rpm, tpm, now):
+        elapsed = max(now - self.updated, 0)
+        if rpm:
+            self.requests = min(float(rpm), self.requests + elapsed * rpm / 60.0)
+        if tpm:
+            self.tokens = min(float(tpm), self.tokens + elapsed * tpm / 60.0)
+        self.updated = now
+
+    def wait_for(self, rpm, tpm, tokens, now):
+        wait = max(self.cooldown_until - now, 0.0)
+        if rpm and self.requests < 1:
+            wait = max(wait, (1 - self.requests) * 60.0 / rpm)
+        # A request bigger than the whole bucket still goes once the bucket is full
+        need = min(tokens, tpm) if tpm else 0
+        if tpm and self.tokens < need:
+            wait = max(wait, (need - self.tokens) * 60.0 / tpm)
+        return wait
+
+    def headroom(self, rpm, tpm):
+        ratios = ([self.requests / rpm] if rpm else []) + ([self.tokens / tpm] if tpm else [])
+        return min(ratios, default=1.0)
+
+
+class KeyLimiter:
+    """
+    Process-wide rate limiter over every configured API key.
+
+    Each key has request and token buckets sized from config llm.limits; a
+    provider with no configured limit is not throttled up front, only after 429s.
+    acquire() hands out the key with the most headroom (then the least used) and
+    reserves budget on it, so concurrent Brains spread across keys instead of
+    piling onto one.
+    A 429 cools that key down for the provider's retry-after (or an exponential
+    backoff); callers only wait when every key of the provider is exhausted.
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}  # (provider, key index) -> _KeyBudget
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def limits(provider):
+        """(rpm, tpm) from config llm.limits; None where the provider sets no limit."""
+        configured = Config._data["llm"].get("limits", {}).get(provider) or {}
+        rpm, tpm = configured.get("rpm"), configured.get("tpm")
+        return (max(rpm, 1) if rpm else None), (max(tpm, 1) if tpm else None)
+
+    def _budget(self, provider, index, rpm, tpm, now):
+        budget = self._keys.get((provider, index))
+        if budget is None:
+            budget = self._keys[(provider, index)] = _KeyBudget(rpm, tpm, now)
+        budget.refill(rpm, tpm, now)
+        return budget
+
+    def acquire(self, provider, tokens=0, max_wait=None):
+        """
+        Picks the key for the next request: (key index, seconds to wait first).
+        Budget is reserved unless the wait exceeds max_wait, in which case the
+        caller is expected to go elsewhere.
+        """
+        rpm, tpm = self.limits(provider)
+        now = time.time()
+        with self._lock:
+            best = None
+            for index in range(max(Config.get_key_count(provider), 1)):
+                budget = self._budget(provider, index, rpm, tpm, now)
+                rank = (budget.wait_for(rpm, tpm, tokens, now), -budget.headroom(rpm, tpm), budget.used)
+                if best is None or rank < best[0]:
+                    best = (rank, index, budget)
+
+            (wait, *_), index, budget = best
+            if max_wait is not None and wait > max_wait:
+                return index, wait
+            # Reserve up front so concurrent callers see this key as busier
+            if rpm:
+                budget.requests -= 1
+            if tpm:
+                budget.tokens -= tokens
+            budget.used += 1
+            return index, wait
+
+    def record_usage(self, provider, index, actual=None, reserved=0):
+        """A request on this key succeeded: settle the token reservation against real usage."""
+        with self._lock:
+            budget = self._keys.get((provider, index))
+            if budget is None: return
+            budget.strikes = 0
+            if actual is not None:
+                budget.tokens -= actual - reserved
+
+    def penalize(self, provider, index, seconds=None):
+        """A 429 on this key: cool it down for the retry-after hint, or back off exponentially."""
+        now = time.time()
+        with self._lock:
+            budget = self._keys.get((provider, index))
+            if budget is None:
+                rpm, tpm = self.limits(provider)
+                budget = self._keys[(provider, index)] = _KeyBudget(rpm, tpm, now)
+            budget.strikes += 1
+            if seconds is None:
+                seconds = min(2 ** (budget.strikes - 1), 60) + random.uniform(0, 1) # 1s, 2s, 4s, 8s...
+            budget.cooldown_until = max(budget.cooldown_until, now + seconds)
+        logger.info(f"{provider} key #{index} rate limited. Cooling down {seconds:.2f}s.")
+
+    def stats(self):
+        """Snapshot of every key's budget for status displays."""
+        now = time.time()
+        with self._lock:
+            limits = {provider: self.limits(provider) for provider, _ in self._keys}
+            return [
+                {
+                    "provider": provider,
+                    "key_index": index,
+                    "requests_left": round(b.requests, 1) if limits[provider][0] else None,
+                    "tokens_left": int(b.tokens) if limits[provider][1] else None,
+                    "cooldown": round(max(b.cooldown_until - now, 0), 1),
+                    "used": b.used,
+                }
+                for (provider, index), b in sorted(self._keys.items())
+            ]
@@ -0,0 +1,281 @@
+import asyncio
+import threading
+import time
+import warnings
+
+# Suppress warnings
+warnings.filterwarnings("ignore", category=FutureWarning)
+import google.generativeai as genai
+from groq import Groq, AsyncGroq
+from openai import OpenAI, AsyncOpenAI
+
+from .logger import setup_logger
+
+logger = setup_logger("LLMPool")
+
+# OpenAI-compatible providers that live on a non-default endpoint
+PROVIDER_BASE_URLS = {
+    "deepseek": "https://api.deepseek.com",
+}
+
+
+def is_rate_limit_error(error):
+    """429 / quota errors say nothing about connection health."""
+    err_msg = str(error).lower()
+    return "429" in err_msg or "resource exhausted" in err_msg or "rate limit" in err_msg
+
+
+class LLMClientFactory:
+    """Factory to create LLM clients."""
+    @staticmethod
+    def get_client(provider, model, api_key):
+        if not api_key: return None, f"Missing API Key for {provider}"
+        try:
+            if provider == "groq": return Groq(api_key=api_key), None
+            elif provider == "openai": return OpenAI(api_key=api_key), None
+            elif provider == "deepseek": return OpenAI(api_key=api_key, base_url=PROVIDER_BASE_URLS["deepseek"]), None
+            elif provider == "gemini":
+                genai.configure(api_key=api_key)
+                return genai.GenerativeModel(model), None
+        except Exception as e:
+            return None, str(e)
+        return None, "Unknown Provider"
+
+    @staticmethod
+    def get_async_client(provider, model, api_key):
+        """Async counterparts. Gemini's GenerativeModel serves both via generate_content_async."""
+        if not api_key: return None, f"Missing API Key for {provider}"
+        try:
+            if provider == "groq": return AsyncGroq(api_key=api_key), None
+            elif provider == "openai": return AsyncOpenAI(api_key=api_key), None
+            elif provider == "deepseek": return AsyncOpenAI(api_key=api_key, base_url=PROVIDER_BASE_URLS["deepseek"]), None
+            elif provider == "gemini":
+                genai.configure(api_key=api_key)
+                return genai.GenerativeModel(model), None
+        except Exception as e:
+            return None, str(e)
+        return None, "Unknown Provider"
+
+
+class PooledClient:
+    """
+    Long-lived SDK clients for one provider key, plus the health stats the pool keeps for it.
+    The sync client is shared by all threads; async clients are bound to the
+    event loop that created them, so there is one per loop.
+    """
+    def __init__(self, api_key):
+        self.client = None
+        self.async_clients = {}  # id(event loop) -> async client
+        self.api_key = api_key
+        self.created = time.time()
+        self.last_used = 0.0
+        self.requests = 0
+        self.failures = 0        # Consecutive non-rate-limit failures
+        self.last_error = None
+
+    @property
+    def healthy(self):
+        return self.failures == 0
+
+    def close(self):
+        if self.client is not None:
+            self._close_sync(self.client)
+        for client in self.async_clients.values():
+            self._close_async(client)
+        self.client = None
+        self.async_clients = {}
+
+    async def aclose(self):
+        if self.client is not None:
+            self._close_sync(self.client)
+        for client in self.async_clients.values():
+            await self._aclose_async(client)
+        self.client = None
+        self.async_clients = {}
+
+    @staticmethod
+    async def _aclose_async(client):
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                result = close()
+                if asyncio.iscoroutine(result): await result
+            except Exception as e:
+                logger.debug(f"Async client close failed: {e}")
+
+    @staticmethod
+    def _close_sync(client):
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                logger.debug(f"Client close failed: {e}")
+
+    @staticmethod
+    def _close_async(client):
+        """Best effort from sync code: schedule the close on the running loop if there is one."""
+        close = getattr(client, "close", None)
+        if not callable(close): return
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                try:
+                    asyncio.get_running_loop().create_task(result)
+                except RuntimeError:
+                    result.close() # No loop here; the connections go with the client
+        except Exception as e:
+            logger.debug(f"Async client close failed: {e}")
+
+
+class LLMClientPool:
+    """
+    Process-wide cache of LLM SDK clients keyed by (provider, key index, base_url).
+
+    Groq/OpenAI clients wrap an httpx connection pool, so reusing them keeps
+    HTTP keep-alive and TLS sessions warm across calls and across users.
+    A client that keeps failing (connection errors, not rate limits) is closed
+    and rebuilt on next use.
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, factory=None, async_factory=None, max_failures=3):
+        self.factory = factory or LLMClientFactory.get_client
+        self.async_factory = async_factory or LLMClientFactory.get_async_client
+        self.max_failures = max_failures
+        self._entries = {}  # (provider, key_index, base_url) -> PooledClient
+        self._lock = threading.Lock()
+        self._gemini_key = None  # genai.configure() is process-global
+
+    @classmethod
+    def shared(cls):
+        """The pool every Brain uses unless it is given its own."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def _slot(provider, key_index, model=None):
+        # Gemini clients are GenerativeModel objects, so the model is part of their identity
+        base_url = PROVIDER_BASE_URLS.get(provider) or (f"model:{model}" if provider == "gemini" else None)
+        return (provider, key_index, base_url)
+
+    def _entry(self, slot, api_key):
+        """Entry for a slot (caller holds the lock). Rebuilt if the key at this index changed."""
+        entry = self._entries.get(slot)
+        if entry and entry.api_key != api_key:
+            # Key at this index was changed in config
+            entry.close()
+            entry = None
+        if not entry:
+            entry = PooledClient(api_key)
+            self._entries[slot] = entry
+        entry.last_used = time.time()
+        entry.requests += 1
+        return entry
+
+    def get(self, provider, model, api_key, key_index=0):
+        """Returns (client, error) for the given provider key, building it on first use."""
+        if not api_key: return None, f"Missing API Key for {provider}"
+        slot = self._slot(provider, key_index, model)
+
+        with self._lock:
+            entry = self._entry(slot, api_key)
+            if entry.client is None:
+                client, err = self.factory(provider, model, api_key)
+                if not client: return None, err
+                entry.client = client
+                if provider == "gemini": self._gemini_key = api_key
+                logger.debug(f"Pooled new {provider} client (key #{key_index})")
+            elif provider == "gemini" and self._gemini_key != api_key:
+                # Rotating between Gemini keys needs the global configuration switched back
+                genai.configure(api_key=api_key)
+                self._gemini_key = api_key
+            return entry.client, None
+
+    def get_async(self, provider, model, api_key, key_index=0):
+        """Like get(), but returns an async client bound to the running event loop."""
+        if provider == "gemini":
+            return self.get(provider, model, api_key, key_index)
+        if not api_key: return None, f"Missing API Key for {provider}"
+        slot = self._slot(provider, key_index, model)
+        loop_id = id(asyncio.get_running_loop())
+
+        with self._lock:
+            entry = self._entry(slot, api_key)
+            client = entry.async_clients.get(loop_id)
+            if client is None:
+                client, err = self.async_factory(provider, model, api_key)
+                if not client: return None, err
+                entry.async_clients[loop_id] = client
+                logger.debug(f"Pooled new async {provider} client (key #{key_index})")
+            return client, None
+
+    def report_success(self, provider, key_index=0, model=None):
+        entry = self._entries.get(self._slot(provider, key_index, model))
+        if entry:
+            entry.failures = 0
+
+    def report_failure(self, provider, key_index=0, error=None, model=None):
+        """Tracks connection health; evicts a client after repeated hard failures."""
+        if error is not None and is_rate_limit_error(error):
+            return
+        slot = self._slot(provider, key_index, model)
+        with self._lock:
+            entry = self._entries.get(slot)
+            if not entry: return
+            entry.failures += 1
+            entry.last_error = str(error) if error is not None else None
+            if entry.failures >= self.max_failures:
+                logger.warning(f"Evicting unhealthy {provider} client (key #{key_index}): {entry.last_error}")
+                entry.close()
+                del self._entries[slot]
+
+    def stats(self):
+        """Snapshot of pooled clients for status displays."""
+        with self._lock:
+            return [
+                {
+                    "provider": provider,
+                    "key_index": key_index,
+                    "requests": e.requests,
+                    "healthy": e.healthy,
+                    "last_error": e.last_error,
+                }
+                for (provider, key_index, _), e in self._entries.items()
+            ]
+
+    def close(self):
+        """Closes every pooled client. The pool stays usable and reconnects lazily."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._gemini_key = None
+        for entry in entries:
+            entry.close()
+        if entries: logger.info(f"Closed {len(entries)} pooled LLM client(s).")
+
+    async def aclose(self):
+        """close() for async front ends: awaits the async clients' shutdown properly."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._gemini_key = None
+        for entry in entries:
+            await entry.aclose()
+        if entries: logger.info(f"Closed {len(entries)} pooled LLM client(s).")
+
+    async def aclose_loop(self):
+        """
+        Closes the async clients bound to the running event loop, for a front
+        end whose loop is about to stop. Sync clients and other loops' clients
+        stay: the pool is shared by every Brain in the process.
+        """
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            clients = [e.async_clients.pop(loop_id) for e in self._entries.values() if loop_id in e.async_clients]
+        for client in clients:
+            await PooledClient._aclose_async(client)
+        if clients: logger.info(f"Closed {len(clients)} async LLM client(s) for a stopping event loop.")
@@ -0,0 +1,104 @@
+import threading
+import time
+from .config import Config
+from .logger import setup_logger
+from .llm_pool import is_rate_limit_error
+
+logger = setup_logger("LLMRouter")
+
+
+class ProviderRouter:
+    """
+    Decides which configured LLM providers a request may use, in order.
+
+    Modes (config llm.routing.mode):
+      - single:   only the configured provider (legacy behaviour)
+      - failover: on rate limits / repeated failures move on to the next provider
+      - hedged:   failover, plus a request still unanswered after hedge_after_ms
+                  is raced against the next provider; first answer wins
+
+    Providers that keep failing are benched for a cooldown and skipped until
+    it expires. State is process-wide, shared by every Brain.
+    """
+    PROVIDERS = ("groq", "openai", "deepseek", "gemini")
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._benched = {}   # provider -> benched-until timestamp
+        self._failures = {}  # provider -> consecutive hard failures
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    # Settings are read live so config edits apply without a restart
+    @property
+    def settings(self):
+        return Config._data["llm"].get("routing", {})
+
+    @property
+    def mode(self):
+        return self.settings.get("mode", "single")
+
+    @property
+    def hedge_after(self):
+        return self.settings.get("hedge_after_ms", 2500) / 1000.0
+
+    def model_for(self, provider):
+        return self.settings.get("models", {}).get(provider)
+
+    def is_available(self, provider):
+        with self._lock:
+            return self._benched.get(provider, 0) <= time.time()
+
+    def candidates(self, primary, primary_model):
+        """(provider, model) pairs to try, best first. Never empty."""
+        if self.mode not in ("failover", "hedged"):
+            return [(primary, primary_model)]
+
+        ordered = [(primary, primary_model)]
+        for provider in self.PROVIDERS:
+            model = self.model_for(provider)
+            if provider != primary and model and Config.get_key_count(provider):
+                ordered.append((provider, model))
+
+        live = [c for c in ordered if self.is_available(c[0])]
+        # Everything benched: fall back to the primary rather than refusing outright
+        return live or ordered[:1]
+
+    def bench(self, provider, seconds=None, reason=""):
+        seconds = seconds if seconds is not None else self.settings.get("cooldown_seconds", 60)
+        with self._lock:
+            self._benched[provider] = time.time() + seconds
+            self._failures[provider] = 0
+        logger.warning(f"Provider {provider} benched for {seconds:.0f}s. {reason}".strip())
+
+    def report_success(self, provider):
+        with self._lock:
+            self._failures[provider] = 0
+
+    def report_failure(self, provider, error):
+        """
+        Benches a provider after failure_threshold hard errors in a row.
+        Rate limits are per key and left to the KeyLimiter: a provider whose keys
+        are all cooling down is skipped by the caller without being benched.
+        """
+        if self.mode not in ("failover", "hedged") or is_rate_limit_error(error):
+            return
+        with self._lock:
+            self._failures[provider] = self._failures.get(provider, 0) + 1
+            count = self._failures[provider]
+        if count >= self.settings.get("failure_threshold", 3):
+            self.bench(provider, reason=f"{count} consecutive failures.")
+
+    def status(self):
+        """Seconds of cooldown left per benched provider."""
+        now = time.time()
+        with self._lock:
+            return {p: round(until - now, 1) for p, until in self._benched.items() if until > now}
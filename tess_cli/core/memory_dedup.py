@@ -0,0 +1,123 @@
+import hashlib
+import threading
+import numpy as np
+from .memory_index import tokenize
+
+SIMHASH_BITS = 64
+
+
+def _hash64(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(tokens):
+    """64-bit SimHash over word unigrams and bigrams."""
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features: return 0
+    hashes = np.array([_hash64(f) for f in features], dtype="<u8")
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0) * 2 > len(features)
+    return int(np.packbits(votes, bitorder="little").view("<u8")[0])
+
+
+class NearDuplicateIndex:
+    """
+    Write-time duplicate detection for stored memories.
+
+    Texts are compared after tokenize(), so case, punctuation and spacing never
+    make a fact "new". Identical token streams match through a content hash.
+    Texts of at least min_tokens words also get a SimHash signature, and any
+    stored text within max_distance differing bits counts as a near-duplicate.
+    Candidates come from an LSH index: the signature is cut into
+    max_distance + 1 bands, and by pigeonhole two signatures that close agree
+    exactly on at least one band, so only texts sharing a band bucket are compared.
+
+    Shorter texts are matched exactly only: in "likes tea" vs "likes coffee"
+    the one differing word is the whole fact.
+    """
+
+    def __init__(self, max_distance=3, min_tokens=6):
+        self.max_distance = max_distance
+        self.min_tokens = min_tokens
+        bands = max_distance + 1
+        width, extra = divmod(SIMHASH_BITS, bands)
+        self._bands, start = [], 0
+        for band in range(bands):
+            size = width + (1 if band < extra else 0)
+            self._bands.append((start, (1 << size) - 1))
+            start += size
+        self._buckets = [{} for _ in self._bands]
+        self._signatures = {}  # id -> (content key, simhash or None)
+        self._exact = {}       # content key -> id
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self.stats = {"checked": 0, "exact": 0, "near": 0, "bytes_saved": 0}
+
+    def signature(self, text):
+        tokens = tokenize(text)
+        key = hashlib.blake2b(" ".join(tokens).encode("utf-8"), digest_size=16).digest()
+        return key, simhash(tokens) if len(tokens) >= self.min_tokens else None
+
+    def _band_keys(self, sig):
+        return [(sig >> start) & mask for start, mask in self._bands]
+
+    def add(self, doc_id, text, pinned=False):
+        key, sig = self.signature(text)
+        with self._lock:
+            self._signatures[doc_id] = (key, sig)
+            self._exact[key] = doc_id
+            if pinned:
+                self._pinned.add(doc_id)
+            if sig is not None:
+                for bucket, band in zip(self._buckets, self._band_keys(sig)):
+                    bucket.setdefault(band, set()).add(doc_id)
+
+    def remove(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                key, sig = self._signatures.pop(doc_id, (None, None))
+                self._pinned.discard(doc_id)
+                if self._exact.get(key) == doc_id:
+                    del self._exact[key]
+                if sig is None: continue
+                for bucket, band in zip(self._buckets, self._band_keys(sig)):
+                    members = bucket.get(band)
+                    if members is not None:
+                        members.discard(doc_id)
+                        if not members:
+                            del bucket[band]
+
+    def is_pinned(self, doc_id):
+        return doc_id in self._pinned
+
+    def find(self, text):
+        """(id, "exact" | "near") of a stored duplicate of text, or None. Counted in stats."""
+        key, sig = self.signature(text)
+        with self._lock:
+            self.stats["checked"] += 1
+            match = self._match(key, sig)
+            if match:
+                self.stats[match[1]] += 1
+                self.stats["bytes_saved"] += len(text.encode("utf-8"))
+            return match
+
+    def _match(self, key, sig):
+        if key in self._exact:
+            return self._exact[key], "exact"
+        if sig is None: return None
+        best = None
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            for doc_id in bucket.get(band, ()):
+                distance = bin(sig ^ self._signatures[doc_id][1]).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, doc_id)
+        return (best[1], "near") if best else None
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def summary(self):
+        s = self.stats
+        skipped = s["exact"] + s["near"]
+        return (f"{skipped} of {s['checked']} writes deduplicated "
+                f"({s['exact']} exact, {s['near']} near, {s['bytes_saved'] / 1024:.1f} KB saved)")
@@ -1,91 +1,611 @@
+import atexit
 import json
 import os
+import threading
 import time
 from datetime import datetime
 from .logger import setup_logger
 from .config import Config
+from .memory_dedup import NearDuplicateIndex
+from .memory_index import BM25Index
+from .memory_lifecycle import MemoryArchive, MemoryLifecycle
+from .shared_state import lock_for
 
 logger = setup_logger("MemoryEngine")
 
-class MemoryEngine:
+
+class MemoryJournal:
     """
-    A lightweight, persistent memory system for TESS.
-    Stores memories in a JSON file and supports basic semantic retrieval (keyword/context).
+    Crash-safe storage behind MemoryEngine: a JSON snapshot plus an append-only
+    JSONL journal of the records written since.
+
+    Appends cost one short write; fsync is batched by a background flusher
+    (memory.fsync_interval_ms), which also closes the journal handle, so no
+    process keeps the file open past the next flush (Windows refuses to
+    replace a file another process holds open). Once the journal holds memory.compact_after
+    records, it is folded into a new snapshot (written to a temp file, then
+    renamed over the old one) and the journal is cut back to what arrived
+    during the fold. The snapshot, the generation and the cut are installed
+    together: if any step fails, the ones already done are undone.
+
+    Several processes may share the files. Every journal access holds the
+    {journal}.lock file lock (only briefly: snapshot writing happens outside
+    it). Readers follow the journal with a (generation, offset) cursor; each
+    compaction bumps the generation in {journal}.gen, telling readers in other
+    processes to reload from the snapshot. Ids are made unique across
+    processes at append.
+
+    One journal per file per process, shared by every engine that opens it,
+    so compaction never orphans another engine's file handle.
     """
-    
-    def __init__(self, user_id="default"):
-        self.user_id = user_id
-        
-        # Use centralized directory instead of os.getcwd() to guarantee persistence
-        self.memory_dir = os.path.join(Config.TESS_DIR, "tess_memory")
-        self.memory_file = os.path.join(self.memory_dir, f"{user_id}_memory.json")
-        self._ensure_memory_file()
-        self.memories = self._load_memory()
-
-    def _ensure_memory_file(self):
-        if not os.path.exists(self.memory_dir):
-            os.makedirs(self.memory_dir)
-        if not os.path.exists(self.memory_file):
-            with open(self.memory_file, 'w') as f:
-                json.dump([], f)
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = snapshot_path
+        self.path = os.path.splitext(snapshot_path)[0] + ".jsonl"
+        self.generation_path = self.path + ".gen"
+        self._lock = threading.RLock()
+        self._file_lock = lock_for(self.path)
+        self._compact_lock = threading.Lock()
+        self._fh = None
+        self._fh_generation = None
+        self._records = 0
+        self._last_id = 0
+        self._scan = None  # Cursor up to which ids and record counts are known
+        self._cuts = {}    # Generation compacted here -> (next generation, bytes cut)
+        self._dirty = False
+        self._wake = threading.Event()
+        self._flusher = None
+        self._compactor = None
+        atexit.register(self.close)
+
+    @classmethod
+    def for_path(cls, snapshot_path):
+        path = os.path.abspath(snapshot_path)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
 
-    def _load_memory(self):
+    @property
+    def settings(self):
+        return Config._data.get("memory", {})
+
+    # ─── Loading ─────────────────────────────────────────────────────────
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path): return []
         try:
-            with open(self.memory_file, 'r') as f:
+            with open(self.snapshot_path, 'r') as f:
                 return json.load(f)
         except Exception as e:
-            logger.error(f"Failed to load memory: {e}")
+            logger.error(f"Failed to load memory snapshot: {e}")
             return []
 
-    def _save_memory(self):
+    def _read_journal(self, end=None, start=0):
+        """Records in the journal from byte start (up to end) and the offset after the last complete line."""
+        records, good = [], start
+        if not os.path.exists(self.path): return records, good
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read() if end is None else f.read(end - start)
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"): break  # Torn final write (or one still in progress)
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            good += len(line)
+        return records, good
+
+    def _generation(self):
+        """Bumped by every compaction, in any process. Read under the file lock."""
         try:
-            with open(self.memory_file, 'w') as f:
-                json.dump(self.memories, f, indent=2)
+            with open(self.generation_path, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def _replay(entries, records):
+        """Applies journal records (add / delete / access) over the snapshot entries."""
+        by_id = {e.get("id"): e for e in entries}
+        for record in records:
+            op = record.get("op")
+            if op == "add":
+                entry = record["entry"]
+                # Already in the snapshot if we crashed between the snapshot rename and the journal cut
+                if entry.get("id") in by_id: continue
+                by_id[entry.get("id")] = entry
+            elif op == "delete":
+                for mem_id in record["ids"]:
+                    by_id.pop(mem_id, None)
+            elif op == "access":
+                for mem_id in record["ids"]:
+                    entry = by_id.get(mem_id)
+                    if entry is not None:
+                        entry["access_count"] = entry.get("access_count", 0) + 1
+                        entry["last_access"] = record["at"]
+            else:
+                logger.warning(f"Skipping unknown memory journal op: {op}")
+        return list(by_id.values())
+
+    def snapshot(self):
+        """
+        (entries, cursor): snapshot plus replayed journal, and the position to
+        follow the journal from. A torn tail from a crash is cut off the journal.
+        """
+        with self._file_lock, self._lock:
+            if not os.path.exists(self.path):
+                open(self.path, 'ab').close()
+            entries = self._read_snapshot()
+            records, good = self._read_journal()
+            if os.path.getsize(self.path) > good:
+                logger.warning(f"Memory journal had an incomplete tail; recovered {len(records)} record(s).")
+                self._close_handle()
+                with open(self.path, 'r+b') as f:
+                    f.truncate(good)
+            entries = self._replay(entries, records)
+            cursor = (self._generation(), good)
+            self._records = len(records)
+            self._scan = cursor
+            ids = [int(e["id"]) for e in entries if str(e.get("id", "")).isdigit()]
+            self._last_id = max(ids + [self._last_id])
+            return entries, cursor
+
+    def load(self):
+        return self.snapshot()[0]
+
+    def read_since(self, cursor):
+        """
+        (records, cursor) appended since cursor, by any process, or None when the
+        journal was compacted past it and the caller must reload from snapshot().
+        """
+        with self._file_lock, self._lock:
+            generation, offset = cursor
+            while generation in self._cuts:
+                generation, cut = self._cuts[generation]
+                if offset < cut: return None
+                offset -= cut
+            if generation != self._generation(): return None
+            if os.path.getsize(self.path) == offset: return [], (generation, offset)
+            records, good = self._read_journal(start=offset)
+            return records, (generation, good)
+
+    # ─── Writing ─────────────────────────────────────────────────────────
+
+    def _handle(self):
+        # Reopen if another process compacted (replaced) the journal under us
+        generation = self._generation()
+        if self._fh is not None and self._fh_generation != generation:
+            self._close_handle()
+        if self._fh is None:
+            self._fh = open(self.path, 'ab')
+            self._fh_generation = generation
+        return self._fh
+
+    def _close_handle(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def next_id(self):
+        """Millisecond timestamp, bumped when two memories land in the same millisecond."""
+        with self._lock:
+            self._last_id = max(int(time.time() * 1000), self._last_id + 1)
+            return str(self._last_id)
+
+    def _catch_up(self):
+        """Learns the ids and record count other processes added since we last looked."""
+        found = self.read_since(self._scan) if self._scan else None
+        if found is None:
+            self.snapshot()
+            return
+        records, self._scan = found
+        self._records += len(records)
+        for record in records:
+            mem_id = str((record.get("entry") or {}).get("id", ""))
+            if mem_id.isdigit():
+                self._last_id = max(self._last_id, int(mem_id))
+
+    def append(self, record):
+        """Appends a record. An add whose id another process already used is given a fresh one, in place."""
+        with self._file_lock, self._lock:
+            self._catch_up()
+            entry = record.get("entry")
+            if record.get("op") == "add" and str(entry["id"]).isdigit():
+                if int(entry["id"]) <= self._last_id:
+                    entry["id"] = str(self._last_id + 1)
+                self._last_id = max(self._last_id, int(entry["id"]))
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            fh = self._handle()
+            fh.write(line)
+            fh.flush()
+            # Not fh.tell(): the buffered position doesn't see other processes' appends
+            self._scan = (self._fh_generation, os.fstat(fh.fileno()).st_size)
+            self._records += 1
+            self._dirty = True
+            compact = self._records >= self.settings.get("compact_after", 5000)
+        self._start_flusher()
+        if compact:
+            self.compact_async()
+
+    def flush(self):
+        """fsyncs pending appends and closes the handle until the next append."""
+        with self._lock:
+            if self._fh is None: return
+            if self._dirty:
+                try:
+                    os.fsync(self._fh.fileno())
+                except OSError as e:
+                    logger.error(f"Failed to sync memory journal: {e}")
+                self._dirty = False
+            self._close_handle()
+
+    def _start_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive(): return
+        self._flusher = threading.Thread(target=self._flush_loop, name="tess-memory-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._wake.wait(self.settings.get("fsync_interval_ms", 1000) / 1000):
+            self.flush()
+
+    # ─── Compaction ──────────────────────────────────────────────────────
+
+    def compact_async(self):
+        if self._compactor is not None and self._compactor.is_alive(): return
+        self._compactor = threading.Thread(target=self._compact_logged, name="tess-memory-compact", daemon=True)
+        self._compactor.start()
+
+    def _compact_logged(self):
+        try:
+            self.compact()
         except Exception as e:
-            logger.error(f"Failed to save memory: {e}")
+            logger.error(f"Memory compaction failed: {e}", exc_info=True)
+
+    def compact(self):
+        """Folds the journal into a fresh snapshot. Appends keep flowing while the snapshot is written."""
+        with self._compact_lock:
+            with self._file_lock, self._lock:
+                self.flush()
+                generation = self._generation()
+                end = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if not end: return
+
+            # Rebuilt from disk rather than any engine's list, so every writer's records survive
+            records, good = self._read_journal(end)
+            entries = self._replay(self._read_snapshot(), records)
+            tmp = self.snapshot_path + f".{os.getpid()}.tmp"
+            try:
+                with open(tmp, 'w') as f:
+                    json.dump(entries, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception as e:
+                logger.error(f"Memory compaction failed: {e}")
+                return
+
+            with self._file_lock, self._lock:
+                if self._generation() != generation:
+                    # Another process compacted first; its snapshot already has these records
+                    os.remove(tmp)
+                    return
+                self._catch_up()  # Learn the ids in the part about to be cut
+                self.flush()
+                try:
+                    with open(self.path, 'rb') as f:
+                        f.seek(good)
+                        tail = f.read()
+                    with open(self.path + ".tmp", 'wb') as f:
+                        f.write(tail)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._install(tmp, generation)
+                except OSError as e:
+                    # e.g. another process still has the journal open on Windows; retried at the next threshold
+                    logger.error(f"Memory compaction failed, journal left as it was: {e}")
+                    for leftover in (tmp, self.path + ".tmp"):
+                        if os.path.exists(leftover):
+                            os.remove(leftover)
+                    return
+                self._cuts[generation] = (generation + 1, good)
+                self._records = tail.count(b"\n")
+                self._scan = (generation + 1, len(tail))
+            logger.info(f"Memory compacted: {len(entries)} entries in snapshot, {self._records} pending.")
+
+    def _write_generation(self, generation):
+        with open(self.generation_path + ".tmp", 'w') as f:
+            f.write(str(generation))
+        os.replace(self.generation_path + ".tmp", self.generation_path)
+
+    def _install(self, snapshot_tmp, generation):
+        """
+        Swaps in the new snapshot, the next generation and the cut journal
+        ({journal}.tmp). A failing step undoes the earlier ones and re-raises,
+        so readers never see the new snapshot with the uncut journal. The
+        generation is bumped before the cut: a crash in between only costs
+        readers a reload.
+        """
+        backup = self.snapshot_path + ".bak"
+        undo = []
+        try:
+            if os.path.exists(self.snapshot_path):
+                os.replace(self.snapshot_path, backup)
+                undo.append(lambda: os.replace(backup, self.snapshot_path))
+            else:
+                undo.append(lambda: os.path.exists(self.snapshot_path) and os.remove(self.snapshot_path))
+            os.replace(snapshot_tmp, self.snapshot_path)
+            undo.append(lambda: self._write_generation(generation))
+            self._write_generation(generation + 1)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            for step in reversed(undo):
+                step()
+            raise
+        if os.path.exists(backup):
+            os.remove(backup)
+
+    def close(self):
+        self._wake.set()
+        with self._lock:
+            self.flush()
+            self._close_handle()
+
+
+class JsonMemoryStore:
+    """
+    Default backend: entries in RAM, persisted through a MemoryJournal and
+    searched through a persistent BM25Index.
+
+    Every change goes through the journal and comes back in through _sync(),
+    which follows the journal from this store's cursor, so writes made by
+    other engines and other processes appear here before each read.
+    """
+    name = "json"
+
+    def __init__(self, memory_dir, user_id):
+        self.memory_file = os.path.join(memory_dir, f"{user_id}_memory.json")
+        try:
+            with open(self.memory_file, 'x') as f:
+                json.dump([], f)
+        except FileExistsError:
+            pass
+        self.journal = MemoryJournal.for_path(self.memory_file)
+        self.index = BM25Index(os.path.join(memory_dir, f"{user_id}_memory.index.json"))
+        self._lock = threading.RLock()
+        self._reload()
+        self._index_saver = None
+        atexit.register(self._save_index)
+
+    def _reload(self):
+        try:
+            self.memories, self._cursor = self.journal.snapshot()
+        except Exception as e:
+            logger.error(f"Failed to load memory: {e}")
+            self.memories, self._cursor = [], None
+        self._by_id = {m.get("id"): m for m in self.memories}
+        self.index = BM25Index(self.index.path)
+        self.index.sync(self.memories)
+
+    def _sync(self):
+        """Applies journal records written since our cursor, by anyone."""
+        with self._lock:
+            if self._cursor is None: return
+            found = self.journal.read_since(self._cursor)
+            if found is None:
+                self._reload()
+                return
+            records, self._cursor = found
+            if records:
+                self._apply(records)
+
+    def _apply(self, records):
+        removed = False
+        for record in records:
+            op = record.get("op")
+            if op == "add":
+                entry = record["entry"]
+                if entry["id"] in self._by_id: continue
+                self.memories.append(entry)
+                self._by_id[entry["id"]] = entry
+                self.index.add(entry["id"], entry["text"])
+            elif op == "delete":
+                ids = set(record["ids"])
+                self.memories = [m for m in self.memories if m.get("id") not in ids]
+                for mem_id in ids:
+                    removed |= self._by_id.pop(mem_id, None) is not None
+            elif op == "access":
+                for mem_id in record["ids"]:
+                    entry = self._by_id.get(mem_id)
+                    if entry is not None:
+                        entry["access_count"] = entry.get("access_count", 0) + 1
+                        entry["last_access"] = record["at"]
+        if removed:
+            # Removals come in rare batches, so the index is simply rebuilt
+            self.index = BM25Index(self.index.path)
+            self.index.sync(self.memories)
+            self.index.save()
+        elif self.index.unsaved >= Config._data.get("memory", {}).get("index_save_every", 500):
+            self._save_index_async()
+
+    def _write(self, record, failure):
+        try:
+            self.journal.append(record)
+        except Exception as e:
+            logger.error(f"{failure}: {e}")
+            with self._lock:
+                self._apply([record])  # Keep it for this session at least
+            return
+        self._sync()
+
+    def next_id(self):
+        return self.journal.next_id()
+
+    def add(self, entry):
+        self._write({"op": "add", "entry": entry}, "Failed to save memory")
+
+    def search(self, query, limit):
+        self._sync()
+        return self.index.search(query, limit)
+
+    def touch(self, ids, at):
+        """Records that these memories were recalled."""
+        self._write({"op": "access", "ids": list(ids), "at": at}, "Failed to record memory access")
+
+    def remove(self, ids):
+        self._write({"op": "delete", "ids": sorted(set(ids))}, "Failed to record memory removal")
+
+    def entries(self):
+        self._sync()
+        return self.memories
+
+    def count(self):
+        self._sync()
+        return len(self.memories)
+
+    def _save_index(self):
+        if self.index.unsaved:
+            self.index.save()
+
+    def _save_index_async(self):
+        if self._index_saver is not None and self._index_saver.is_alive(): return
+        self._index_saver = threading.Thread(target=self._save_index, name="tess-memory-index", daemon=True)
+        self._index_saver.start()
+
+
+class MemoryEngine:
+    """
+    A lightweight, persistent memory system for TESS.
+
+    Storage and search are delegated to a backend chosen by memory.backend:
+    "json" (JsonMemoryStore, the default) or "sqlite" (SqliteMemoryStore, FTS5).
+    Recalls are tracked, and past the per-user cap the coldest memories move to a
+    compressed archive (see MemoryLifecycle) that retrieve_context can still search.
+    Writes that repeat a stored memory refresh it instead (memory.dedup).
+    """
+
+    def __init__(self, user_id="default", on_evict=None):
+        self.user_id = user_id
+        self.on_evict = on_evict  # Called with the ids of memories moved to the archive
+
+        # Use centralized directory instead of os.getcwd() to guarantee persistence
+        self.memory_dir = os.path.join(Config.TESS_DIR, "tess_memory")
+        os.makedirs(self.memory_dir, exist_ok=True)
+        self.store = self._open_store()
+        self.lifecycle = MemoryLifecycle()
+        self.archive = MemoryArchive(os.path.join(self.memory_dir, f"{user_id}_archive.jsonl.gz"))
+        self._dedup = None
+        self._dedup_lock = threading.Lock()
+
+    def _open_store(self):
+        backend = Config._data.get("memory", {}).get("backend", "json")
+        if backend == "sqlite":
+            try:
+                from .memory_sqlite import SqliteMemoryStore
+                return SqliteMemoryStore(self.memory_dir, self.user_id)
+            except Exception as e:
+                logger.error(f"SQLite memory backend unavailable ({e}). Using JSON storage.")
+        elif backend != "json":
+            logger.warning(f"Unknown memory backend '{backend}'. Using JSON storage.")
+        return JsonMemoryStore(self.memory_dir, self.user_id)
+
+    @property
+    def memories(self):
+        return self.store.entries()
+
+    def count(self):
+        return self.store.count()
 
     def store_memory(self, text, metadata=None):
         """
-        Saves a new memory fragment.
+        Saves a new memory fragment and returns its id.
+        A near-duplicate of a stored memory is not added: the stored one is
+        refreshed (counted as recalled) and its id returned instead.
         """
+        metadata = metadata or {}
+        dedup = self.dedup_index()
+        replaced = None
+        if dedup is not None:
+            match = dedup.find(text)
+            if match:
+                existing = match[0]
+                if not self.lifecycle.is_pinned({"metadata": metadata}) or dedup.is_pinned(existing):
+                    self.store.touch([existing], time.time())
+                    logger.info(f"Memory refreshed ({match[1]} duplicate of {existing}): {text[:50]}...")
+                    return existing
+                # An explicit "remember" of an automatic memory: keep the pinned copy only
+                replaced = existing
+
         entry = {
-            "id": str(int(time.time() * 1000)),
+            "id": self.store.next_id(),
             "timestamp": datetime.now().isoformat(),
             "text": text,
-            "metadata": metadata or {}
+            "metadata": metadata
         }
-        self.memories.append(entry)
-        self._save_memory()
+        self.store.add(entry)
+        if dedup is not None:
+            dedup.add(entry["id"], text, pinned=self.lifecycle.is_pinned(entry))
+            if replaced is not None:
+                self.store.remove([replaced])
+                dedup.remove([replaced])
         logger.info(f"Memory stored: {text[:50]}...")
+        if self.lifecycle.over_cap(self.store.count()):
+            self._evict()
         return entry["id"]
 
+    def dedup_index(self):
+        """The near-duplicate index over this user's memories, built on first write; None when disabled."""
+        settings = Config._data.get("memory", {})
+        if not settings.get("dedup", True): return None
+        with self._dedup_lock:
+            if self._dedup is None:
+                index = NearDuplicateIndex(max_distance=settings.get("dedup_max_distance", 3))
+                for entry in self.store.entries():
+                    index.add(entry["id"], entry["text"], pinned=self.lifecycle.is_pinned(entry))
+                self._dedup = index
+            return self._dedup
+
+    def dedup_stats(self):
+        return self._dedup.summary() if self._dedup is not None else None
+
+    def pin(self, text):
+        """Stores a memory that is never evicted."""
+        return self.store_memory(text, metadata={"type": "explicit_fact", "pinned": True})
+
+    def _evict(self):
+        cold = self.lifecycle.select_evictions(self.store.entries())
+        if not cold: return
+        # Archive first: a crash in between leaves a duplicate, never a loss
+        self.archive.append(cold)
+        self.store.remove([e["id"] for e in cold])
+        if self._dedup is not None:
+            self._dedup.remove([e["id"] for e in cold])
+        if self.on_evict:
+            self.on_evict([e["id"] for e in cold])
+        logger.info(f"Archived {len(cold)} cold memories for '{self.user_id}' ({self.store.count()} remain).")
+
     def add_thought(self, text):
         """Robustness alias for context distillation."""
         return self.store_memory(text)
 
-    def retrieve_context(self, query, limit=3):
+    def retrieve_context(self, query, limit=3, include_archive=False):
         """
-        Retrieves relevant memories based on keyword overlap (TF-IDF style simplified).
-        TODO: Upgrade to Vector Embeddings (ChromaDB/FAISS) for true semantic search.
+        Retrieves the memories most relevant to the query (BM25 ranking on either backend).
+        With include_archive, evicted memories fill any remaining slots.
         """
-        query_words = set(query.lower().split())
-        scored_memories = []
-
-        for mem in self.memories:
-            mem_words = set(mem["text"].lower().split())
-            # Jaccard similarity (intersection over union)
-            intersection = query_words.intersection(mem_words)
-            if not intersection:
-                continue
-            
-            score = len(intersection) / len(query_words.union(mem_words))
-            scored_memories.append((score, mem))
-
-        # Sort by score descending
-        scored_memories.sort(key=lambda x: x[0], reverse=True)
-        
-        # Return top N text chunks
-        return [m[1]["text"] for m in scored_memories[:limit]]
+        hits = self.store.search(query, limit)
+        if hits:
+            self.store.touch([mem_id for _, mem_id, _ in hits], time.time())
+        texts = [text for _, _, text in hits]
+        if include_archive and len(texts) < limit:
+            texts += self.search_archive(query, limit - len(texts))
+        return texts
+
+    def search_archive(self, query, limit=3):
+        """Evicted memories most relevant to the query (BM25 over the archive)."""
+        return [text for _, _, text in self.archive.search(query, limit)]
 
     def memorize(self, text):
         """
@@ -0,0 +1,126 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from .logger import setup_logger
+
+logger = setup_logger("MemoryIndex")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class BM25Index:
+    """
+    Inverted index (token -> {doc: term frequency}) with Okapi BM25 ranking.
+
+    Documents are added incrementally, so a query only touches the posting
+    lists of its own terms. The index is saved next to the memory snapshot and
+    reloaded on start; entries it has not seen yet are indexed on load.
+    """
+    VERSION = 1
+
+    def __init__(self, path=None, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.ids = []         # doc number -> memory id
+        self.texts = []       # doc number -> text returned by search()
+        self.doc_len = []
+        self.total_len = 0
+        self.postings = {}    # token -> {doc number: tf}
+        self._unsaved = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, doc_id, text):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            doc = len(self.ids)
+            self.ids.append(doc_id)
+            self.texts.append(text)
+            self.doc_len.append(sum(counts.values()))
+            self.total_len += self.doc_len[-1]
+            for token, tf in counts.items():
+                self.postings.setdefault(token, {})[doc] = tf
+            self._unsaved += 1
+
+    def search(self, query, limit=3):
+        """Top `limit` (score, id, text), best first. Ties go to the newer memory."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.ids)
+            if not n or not terms: return []
+            avg_len = self.total_len / n or 1
+            scores = {}
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting: continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc, tf in posting.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc] / avg_len)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / norm
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+            return [(score, self.ids[doc], self.texts[doc]) for doc, score in best]
+
+    # ─── Persistence ─────────────────────────────────────────────────────
+
+    def sync(self, entries):
+        """
+        Brings the index in line with the memory entries: loads the saved index if it
+        covers a prefix of them, then indexes the rest. Anything else is a rebuild.
+        """
+        saved = self._read()
+        ids = [e.get("id") for e in entries]
+        if saved and saved["ids"] == ids[:len(saved["ids"])]:
+            with self._lock:
+                self.ids = saved["ids"]
+                self.texts = [e["text"] for e in entries[:len(self.ids)]]
+                self.doc_len = saved["doc_len"]
+                self.total_len = sum(self.doc_len)
+                self.postings = {t: {int(d): tf for d, tf in p.items()} for t, p in saved["postings"].items()}
+            start = len(self.ids)
+        else:
+            start = 0
+        for entry in entries[start:]:
+            self.add(entry.get("id"), entry["text"])
+        if len(entries) - start:
+            logger.info(f"Indexed {len(entries) - start} memories ({len(self.ids)} total).")
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path): return None
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION and len(data["ids"]) == len(data["doc_len"]):
+                return data
+        except Exception as e:
+            logger.warning(f"Memory index unreadable, rebuilding: {e}")
+        return None
+
+    def save(self):
+        if not self.path: return
+        with self._lock:
+            data = {"version": self.VERSION, "ids": list(self.ids), "doc_len": list(self.doc_len),
+                    "postings": {t: dict(p) for t, p in self.postings.items()}}
+            self._unsaved = 0
+        # Unique per writer: engines in other threads and processes save the same index
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save memory index: {e}")
+
+    @property
+    def unsaved(self):
+        return self._unsaved
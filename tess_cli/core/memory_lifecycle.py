@@ -0,0 +1,109 @@
+import gzip
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from .config import Config
+from .memory_index import BM25Index
+from .logger import setup_logger
+
+logger = setup_logger("MemoryLifecycle")
+
+# Memories the user asked for explicitly (memory_op remember, "memorize") are never evicted
+PINNED_TYPES = {"explicit_fact", "explicit_instruction"}
+
+
+def _epoch(timestamp):
+    try:
+        return datetime.fromisoformat(str(timestamp)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class MemoryLifecycle:
+    """
+    Decides which memories stay hot.
+
+    A memory's heat decays with time since it was stored or last recalled
+    (half-life memory.half_life_days) and grows with how often it was recalled.
+    Pinned memories are never evicted. Once a user holds more than
+    memory.max_entries_per_user, the coldest are moved out until the store is
+    back to memory.evict_to of the cap, so eviction runs in batches.
+    """
+
+    @property
+    def settings(self):
+        return Config._data.get("memory", {})
+
+    @property
+    def cap(self):
+        return self.settings.get("max_entries_per_user", 10000)
+
+    @staticmethod
+    def is_pinned(entry):
+        metadata = entry.get("metadata") or {}
+        return bool(metadata.get("pinned")) or metadata.get("type") in PINNED_TYPES
+
+    def heat(self, entry, now=None):
+        if self.is_pinned(entry): return math.inf
+        now = now or time.time()
+        half_life = self.settings.get("half_life_days", 30) * 86400
+        last_used = max(_epoch(entry.get("timestamp")), entry.get("last_access") or 0.0)
+        recency = 0.5 ** (max(now - last_used, 0) / half_life)
+        return recency * (1 + math.log1p(entry.get("access_count", 0)))
+
+    def over_cap(self, count):
+        return count > self.cap
+
+    def select_evictions(self, entries, now=None):
+        """The coldest unpinned entries to move out, or [] when under the cap."""
+        if not self.over_cap(len(entries)): return []
+        target = int(self.cap * self.settings.get("evict_to", 0.9))
+        now = now or time.time()
+        candidates = [e for e in entries if not self.is_pinned(e)]
+        candidates.sort(key=lambda e: self.heat(e, now))
+        return candidates[:max(len(entries) - target, 0)]
+
+
+class MemoryArchive:
+    """
+    Cold storage for evicted memories: gzip-compressed JSONL, appended one gzip
+    member per eviction batch. Searched on demand by building a BM25 index over
+    a single streaming pass, so it costs nothing until someone asks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, entries):
+        if not entries: return
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8")
+        with self._lock:
+            with gzip.open(self.path, "ab") as f:
+                f.write(data)
+
+    def entries(self):
+        if not os.path.exists(self.path): return []
+        out = []
+        with self._lock:
+            try:
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            out.append(json.loads(line))
+            except (OSError, EOFError, ValueError) as e:
+                # A torn final member only loses that batch's tail
+                logger.warning(f"Memory archive partly unreadable ({e}); returning {len(out)} entries.")
+        return out
+
+    def search(self, query, limit=3):
+        index = BM25Index()
+        for entry in self.entries():
+            index.add(entry.get("id"), entry["text"])
+        return index.search(query, limit)
+
+    def count(self):
+        return len(self.entries())
@@ -0,0 +1,215 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from .memory_index import tokenize
+from .logger import setup_logger
+
+logger = setup_logger("MemorySQLite")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS memories ("
+    "seq INTEGER PRIMARY KEY, id TEXT NOT NULL, user TEXT NOT NULL, type TEXT, "
+    "timestamp TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}', "
+    "access_count INTEGER NOT NULL DEFAULT 0, last_access REAL, "
+    "UNIQUE (user, id))",
+    "CREATE INDEX IF NOT EXISTS idx_memories_user_type ON memories(user, type)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(text, content='memories', content_rowid='seq')",
+    # Keep the external-content FTS table in step with the base table
+    "CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN "
+    "INSERT INTO memories_fts(rowid, text) VALUES (new.seq, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN "
+    "INSERT INTO memories_fts(memories_fts, rowid, text) VALUES ('delete', old.seq, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE OF text ON memories BEGIN "
+    "INSERT INTO memories_fts(memories_fts, rowid, text) VALUES ('delete', old.seq, old.text); "
+    "INSERT INTO memories_fts(rowid, text) VALUES (new.seq, new.text); END",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+
+def fts_query(text):
+    """Any-term FTS5 query; tokens are quoted so user text can't inject query syntax."""
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(tokenize(text)))
+
+
+class MemoryDatabase:
+    """
+    The SQLite file behind SqliteMemoryStore: one per memory directory per process,
+    shared by every user's store. WAL mode lets other processes read while we write.
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._upgrade()
+        self._conn.commit()
+
+    def _upgrade(self):
+        """Adds columns introduced after a database was created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(memories)")}
+        if "access_count" not in columns:
+            self._conn.execute("ALTER TABLE memories ADD COLUMN access_count INTEGER NOT NULL DEFAULT 0")
+        if "last_access" not in columns:
+            self._conn.execute("ALTER TABLE memories ADD COLUMN last_access REAL")
+
+    @classmethod
+    def for_path(cls, path):
+        path = os.path.abspath(path)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def execute(self, sql, params=(), commit=False):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            if commit:
+                self._conn.commit()
+            return rows
+
+    INSERT = ("INSERT OR IGNORE INTO memories (id, user, type, timestamp, text, metadata, access_count, last_access) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+    @staticmethod
+    def _row(user_id, e):
+        return (str(e["id"]), user_id, (e.get("metadata") or {}).get("type"), e.get("timestamp") or "",
+                e["text"], json.dumps(e.get("metadata") or {}, ensure_ascii=False),
+                e.get("access_count", 0), e.get("last_access"))
+
+    def insert(self, user_id, entries):
+        with self._lock:
+            self._conn.executemany(self.INSERT, [self._row(user_id, e) for e in entries])
+            self._conn.commit()
+
+    def insert_new(self, user_id, entry):
+        """
+        Inserts a fresh memory. If another process already took its id, the entry
+        (updated in place) gets the next free one; BEGIN IMMEDIATE makes the
+        check and the insert one step across processes.
+        """
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                taken = self._conn.execute(
+                    "SELECT MAX(CAST(id AS INTEGER)) FROM memories WHERE user = ? AND CAST(id AS INTEGER) >= ?",
+                    (user_id, int(entry["id"]))
+                ).fetchone()[0]
+                if taken is not None:
+                    entry["id"] = str(taken + 1)
+                self._conn.execute(self.INSERT, self._row(user_id, entry))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def migrate_json(self, memory_dir):
+        """
+        One-shot import of every {user}_memory.json (and its journal) in memory_dir.
+        Each file is recorded in meta once imported; the JSON files are left in place.
+        """
+        from .memory_engine import MemoryJournal
+        for snapshot in sorted(glob.glob(os.path.join(memory_dir, "*_memory.json"))):
+            user_id = os.path.basename(snapshot)[:-len("_memory.json")]
+            marker = f"migrated:{user_id}"
+            if self.execute("SELECT 1 FROM meta WHERE key = ?", (marker,)): continue
+            try:
+                entries = MemoryJournal.for_path(snapshot).load()
+                self.insert(user_id, entries)
+                self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             (marker, str(time.time())), commit=True)
+                logger.info(f"Migrated {len(entries)} memories for '{user_id}' from {os.path.basename(snapshot)}.")
+            except Exception as e:
+                logger.error(f"Failed to migrate {snapshot}: {e}")
+
+
+class SqliteMemoryStore:
+    """
+    Memory backend on SQLite: rows with type/timestamp/user columns plus an FTS5
+    index ranked by bm25(). Nothing is held in RAM beyond the connection.
+    """
+    name = "sqlite"
+
+    def __init__(self, memory_dir, user_id):
+        self.user_id = user_id
+        self.db = MemoryDatabase.for_path(os.path.join(memory_dir, "memory.db"))
+        self.db.migrate_json(memory_dir)
+        self._id_lock = threading.Lock()
+        row = self.db.execute("SELECT MAX(CAST(id AS INTEGER)) FROM memories WHERE user = ?", (user_id,))
+        self._last_id = row[0][0] or 0
+
+    def next_id(self):
+        # Same scheme as MemoryJournal.next_id; add() resolves clashes with other processes
+        with self._id_lock:
+            self._last_id = max(int(time.time() * 1000), self._last_id + 1)
+            return str(self._last_id)
+
+    def add(self, entry):
+        try:
+            self.db.insert_new(self.user_id, entry)
+            with self._id_lock:
+                self._last_id = max(self._last_id, int(entry["id"]))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save memory: {e}")
+
+    def search(self, query, limit):
+        """Top `limit` (score, id, text), best first. bm25() is lower-is-better, so it is negated."""
+        match = fts_query(query)
+        if not match: return []
+        try:
+            rows = self.db.execute(
+                "SELECT bm25(memories_fts), m.id, m.text FROM memories_fts "
+                "JOIN memories m ON m.seq = memories_fts.rowid "
+                "WHERE memories_fts MATCH ? AND m.user = ? "
+                "ORDER BY bm25(memories_fts), m.seq DESC LIMIT ?",
+                (match, self.user_id, limit)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Memory search failed: {e}")
+            return []
+        return [(-score, mem_id, text) for score, mem_id, text in rows]
+
+    def touch(self, ids, at):
+        """Records that these memories were recalled."""
+        marks = ",".join("?" * len(ids))
+        try:
+            self.db.execute(
+                f"UPDATE memories SET access_count = access_count + 1, last_access = ? WHERE user = ? AND id IN ({marks})",
+                (at, self.user_id, *ids), commit=True
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record memory access: {e}")
+
+    def remove(self, ids):
+        ids = list(ids)
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            self.db.execute(
+                f"DELETE FROM memories WHERE user = ? AND id IN ({','.join('?' * len(chunk))})",
+                (self.user_id, *chunk), commit=True
+            )
+
+    def entries(self):
+        rows = self.db.execute(
+            "SELECT id, timestamp, text, metadata, access_count, last_access FROM memories WHERE user = ? ORDER BY seq",
+            (self.user_id,)
+        )
+        entries = []
+        for mem_id, ts, text, meta, count, last in rows:
+            entry = {"id": mem_id, "timestamp": ts, "text": text, "metadata": json.loads(meta)}
+            if count:
+                entry["access_count"], entry["last_access"] = count, last
+            entries.append(entry)
+        return entries
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM memories WHERE user = ?", (self.user_id,))[0][0]
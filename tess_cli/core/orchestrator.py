@@ -77,6 +77,9 @@ class ActionDispatcher:
 
     def _handle_reply_op(self, data):
         content = data.get("content", "")
+        if data.get("streamed"):
+            # Already rendered token-by-token by the front end that requested the stream
+            return f"Replied: {content[:50]}..."
         if self.output_handler:
             try: self.output_handler(content)
             except Exception as e: logger.debug(f"Reply output handler error: {e}")
@@ -85,6 +88,8 @@ class ActionDispatcher:
 
     def _handle_final_reply(self, data):
         content = data.get("content", "")
+        if data.get("streamed"):
+            return "Task Completed."
         if self.output_handler:
             try: self.output_handler(content)
             except Exception as e: logger.debug(f"Final reply output handler error: {e}")
@@ -372,7 +377,8 @@ class ActionDispatcher:
             
         elif sub == "recall":
             if not content: return out("Provide 'query' to recall.", self.output_handler)
-            results = kb.search_memory(content, n_results=3)
+            # Explicit recall may dig into archived memories too
+            results = kb.search_memory(content, n_results=3, include_archive=True)
             return out(f"Memory Recall:\n{results}", self.output_handler)
             
         elif sub == "forget":
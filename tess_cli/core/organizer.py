@@ -65,7 +65,7 @@ class Organizer:
             system_prompt = "You are an intelligent file organizer. Output purely JSON."
             
             try:
-                response_text = self.brain.think(prompt, system_prompt)
+                response_text = self.brain.think(prompt, system_prompt, use_cache=True, temperature=0)
                 if response_text:
                     # Parse JSON
                     batch_moves = json.loads(response_text)
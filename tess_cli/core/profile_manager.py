@@ -1,4 +1,5 @@
 from .brain import Brain
+from .llm_pool import LLMClientPool
 from .logger import setup_logger
 from .skill_manager import SkillManager
 
@@ -8,9 +9,11 @@ class ProfileManager:
     """
     Manages multiple user profiles, each with its own Brain and Memory.
     """
-    def __init__(self, knowledge_db=None):
+    def __init__(self, knowledge_db=None, client_pool=None):
         self.knowledge_db = knowledge_db
         self.profiles = {} # {user_id: BrainInstance}
+        # One pool for every profile so all users share warm provider connections
+        self.client_pool = client_pool or LLMClientPool.shared()
 
     def get_brain(self, user_id):
         """
@@ -20,7 +23,7 @@ class ProfileManager:
         uid = str(user_id)
         if uid not in self.profiles:
             logger.debug(f"Creating new profile for user: {uid}")
-            brain = Brain(user_id=uid, knowledge_db=self.knowledge_db)
+            brain = Brain(user_id=uid, knowledge_db=self.knowledge_db, client_pool=self.client_pool)
             
             # Initialize Skill Manager for this user
             brain.skill_manager = SkillManager(user_id=uid)
@@ -36,6 +39,21 @@ class ProfileManager:
         uid = str(user_id)
         if uid in self.profiles:
             self.profiles[uid].history = []
+            self.profiles[uid].window.reset()
             logger.info(f"Reset history for user: {uid}")
             return True
         return False
+
+    def close(self):
+        """
+        Releases shared resources (pooled LLM connections). Call on shutdown.
+        """
+        self.client_pool.close()
+
+    async def aclose(self):
+        """
+        For async front ends (API server, Telegram) on shutdown: closes the async
+        LLM clients bound to their event loop. The shared pool and its sync
+        clients stay in use by other Brains until the process exits.
+        """
+        await self.client_pool.aclose_loop()
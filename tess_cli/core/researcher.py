@@ -33,8 +33,8 @@ class Researcher:
             f"[SEARCH RESULTS]\n{search_results}"
         )
         
-        # Use Brain to summarize accurately
-        summary = self.brain.think(prompt)
+        # Use Brain to summarize accurately; the same results always get the same summary
+        summary = self.brain.think(prompt, temperature=0, use_cache=True)
         
         # 3. Index it for future use
         if summary and "thinking failed" not in summary.lower():
@@ -0,0 +1,310 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from .memory_index import tokenize
+from .logger import setup_logger
+
+logger = setup_logger("Retrieval")
+
+# Identifiers, file names and paths: words joined by _ . - / \ or :
+_COMPOUND_RE = re.compile(r"[A-Za-z0-9]+(?:[_.\-/\\:][A-Za-z0-9]+)+")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS chunks ("
+    "seq INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, text TEXT NOT NULL, "
+    "terms TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text, terms, content='chunks', content_rowid='seq')",
+    "CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN "
+    "INSERT INTO chunks_fts(rowid, text, terms) VALUES (new.seq, new.text, new.terms); END",
+    "CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN "
+    "INSERT INTO chunks_fts(chunks_fts, rowid, text, terms) VALUES ('delete', old.seq, old.text, old.terms); END",
+]
+
+
+def compound_terms(text):
+    """
+    Identifier-like strings squashed into one token each ("load_config" ->
+    "loadconfig", "kb/utils.py" -> "kbutilspy"), so an exact identifier or file
+    name outranks chunks that merely contain its parts.
+    """
+    return [re.sub(r"[^a-z0-9]", "", m.lower()) for m in _COMPOUND_RE.findall(str(text))]
+
+
+def lexical_query(text):
+    """Any-term FTS5 query over words and compounds; tokens are quoted so user text can't inject query syntax."""
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(tokenize(text) + compound_terms(text)))
+
+
+class LexicalIndex:
+    """
+    FTS5 (bm25) index over the knowledge-base chunks, next to the vector store
+    in lexical.db. The terms column holds compound identifiers plus the source
+    file's name and the chunk's symbol, weighted above the body so identifier and file-name queries
+    find their chunk first.
+    """
+    TERMS_WEIGHT = 2.0
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    @staticmethod
+    def _terms(text, metadata):
+        source = (metadata or {}).get("source") or ""
+        name = os.path.basename(str(source))
+        symbol = (metadata or {}).get("symbol") or ""
+        return " ".join(compound_terms(text) + compound_terms(name) + tokenize(name) + tokenize(symbol))
+
+    def upsert(self, ids, documents, metadatas=None):
+        metadatas = metadatas or [{}] * len(ids)
+        rows = [(i, doc or "", self._terms(doc or "", meta), json.dumps(meta or {}))
+                for i, doc, meta in zip(ids, documents, metadatas)]
+        with self._lock:
+            self._delete(list(ids))
+            self._conn.executemany("INSERT INTO chunks (id, text, terms, metadata) VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def delete(self, ids):
+        with self._lock:
+            self._delete(list(ids))
+            self._conn.commit()
+
+    def _delete(self, ids):
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            self._conn.execute(f"DELETE FROM chunks WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def search(self, query, limit):
+        """Top `limit` (score, id, text, metadata), best first. bm25() is lower-is-better, so it is negated."""
+        match = lexical_query(query)
+        if not match: return []
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT bm25(chunks_fts, 1.0, {self.TERMS_WEIGHT}), c.id, c.text, c.metadata FROM chunks_fts "
+                    "JOIN chunks c ON c.seq = chunks_fts.rowid "
+                    f"WHERE chunks_fts MATCH ? ORDER BY bm25(chunks_fts, 1.0, {self.TERMS_WEIGHT}) LIMIT ?",
+                    (match, limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Lexical search failed: {e}")
+            return []
+        return [(-score, doc_id, text, json.loads(meta)) for score, doc_id, text, meta in rows]
+
+
+class IndexedCollection:
+    """
+    A vector collection (Chroma or LocalVectorStore) whose writes also go to a
+    LexicalIndex (when there is one) and bump `generation`. Everything else is
+    passed through, so callers that write to kb.collection directly (Librarian,
+    CommandIndexer, Researcher) keep both indexes and the query cache in step.
+    """
+
+    def __init__(self, collection, lexical=None):
+        self.collection = collection
+        self.lexical = lexical
+        self.generation = 0
+        self._synced = lexical is None
+
+    def upsert(self, ids, documents, metadatas=None, **kwargs):
+        try:
+            self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, **kwargs)
+        finally:
+            self.generation += 1
+        self._index(ids, documents, metadatas)
+
+    def add(self, ids, documents, metadatas=None, **kwargs):
+        try:
+            self.collection.add(ids=ids, documents=documents, metadatas=metadatas, **kwargs)
+        finally:
+            self.generation += 1
+        self._index(ids, documents, metadatas)
+
+    def delete(self, ids=None, **kwargs):
+        try:
+            self.collection.delete(ids=ids, **kwargs)
+        finally:
+            self.generation += 1
+        if ids and self.lexical:
+            try:
+                self.lexical.delete(ids)
+            except Exception as e:
+                logger.error(f"Lexical delete failed: {e}")
+                self._synced = False
+
+    def _index(self, ids, documents, metadatas):
+        if not self.lexical: return
+        try:
+            self.lexical.upsert(ids, documents, metadatas)
+        except Exception as e:
+            logger.error(f"Lexical indexing failed: {e}")
+            self._synced = False
+
+    def sync(self):
+        """
+        Rebuilds the lexical index from the collection when their sizes differ:
+        chunks indexed before it existed, or written by another process.
+        """
+        if self._synced: return
+        try:
+            count = self.collection.count()
+            if self.lexical.count() != count:
+                logger.info(f"Rebuilding the lexical index over {count} chunks.")
+                stored = self.collection.get(include=["documents", "metadatas"])
+                self.lexical.clear()
+                for start in range(0, len(stored["ids"]), 1000):
+                    end = start + 1000
+                    self.lexical.upsert(stored["ids"][start:end], stored["documents"][start:end],
+                                        stored["metadatas"][start:end])
+                self.generation += 1
+            self._synced = True
+        except Exception as e:
+            logger.error(f"Lexical index sync failed: {e}")
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+class QueryCache:
+    """
+    LRU cache of knowledge-base search results, keyed by the normalised query
+    and the search arguments. Each entry remembers the write generation it was
+    computed at; once the knowledge base has been written to, it is a miss.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalise(query):
+        """Case, spacing and trailing punctuation don't make a different question."""
+        return " ".join(str(query).lower().split()).strip(" .,;:!?")
+
+    def get(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, generation, value):
+        if self.max_entries <= 0: return
+        with self._lock:
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summary(self):
+        return f"{self.hits} hits, {self.misses} misses ({len(self)} cached)"
+
+
+class CrossEncoderReranker:
+    """Re-scores (query, chunk) pairs with a small cross-encoder, when sentence-transformers is installed."""
+
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2"):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name)
+
+    def __call__(self, query, texts):
+        return [float(s) for s in self.model.predict([(query, t) for t in texts])]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """{id: sum over rankings of 1 / (k + rank)}, rank starting at 1."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+class HybridRetriever:
+    """
+    Knowledge-base search combining vector similarity with bm25 over the same
+    chunks. Each side returns `candidates` hits; reciprocal-rank fusion merges
+    the two rankings (a chunk found by both rises), and an optional reranker
+    re-scores the fused top candidates. Either side may fail or be missing;
+    the other still answers.
+
+    retrieve() returns dicts with id, text, source, metadata, score and the
+    rank each side gave the chunk (None when it did not find it).
+    """
+
+    def __init__(self, collection, lexical, reranker=None, candidates=20, rrf_k=60):
+        self.collection = collection
+        self.lexical = lexical
+        self.reranker = reranker
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+    def _vector(self, query, limit):
+        try:
+            results = self.collection.query(query_texts=[query], n_results=limit)
+        except Exception as e:
+            logger.error(f"Vector search failed, using lexical results only: {e}")
+            return []
+        if not results.get("ids") or not results["ids"][0]: return []
+        distances = (results.get("distances") or [[None] * len(results["ids"][0])])[0]
+        return [{"id": i, "text": d, "metadata": m or {}, "distance": dist}
+                for i, d, m, dist in zip(results["ids"][0], results["documents"][0], results["metadatas"][0], distances)]
+
+    def retrieve(self, query, n_results=3):
+        limit = max(n_results, self.candidates)
+        vector = self._vector(query, limit)
+        lexical = [{"id": i, "text": t, "metadata": m, "bm25": s}
+                   for s, i, t, m in (self.lexical.search(query, limit) if self.lexical else [])]
+
+        hits = {}
+        for side, found in (("vector_rank", vector), ("lexical_rank", lexical)):
+            for rank, hit in enumerate(found, start=1):
+                merged = hits.setdefault(hit["id"], {"id": hit["id"], "text": hit["text"], "metadata": hit["metadata"],
+                                                     "vector_rank": None, "lexical_rank": None})
+                merged[side] = rank
+        fused = reciprocal_rank_fusion([[h["id"] for h in vector], [h["id"] for h in lexical]], self.rrf_k)
+        ranked = sorted(hits.values(), key=lambda h: fused[h["id"]], reverse=True)
+        for hit in ranked:
+            hit["score"] = fused[hit["id"]]
+            hit["source"] = hit["metadata"].get("source", "unknown")
+
+        if self.reranker and len(ranked) > 1:
+            top = ranked[:limit]
+            try:
+                for hit, score in zip(top, self.reranker(query, [h["text"] for h in top])):
+                    hit["score"] = score
+                ranked = sorted(top, key=lambda h: h["score"], reverse=True)
+            except Exception as e:
+                logger.error(f"Reranking failed, keeping fused order: {e}")
+        return ranked[:n_results]
@@ -3,7 +3,10 @@ import threading
 import time
 import json
 import os
+from datetime import datetime
+from .config import Config
 from .logger import setup_logger
+from .shared_state import file_signature, locked_update, read_json
 
 logger = setup_logger("Scheduler")
 
@@ -11,35 +14,68 @@ class TessScheduler:
     """
     Cron-like scheduler for TESS.
     Allows scheduling recurring tasks that TESS executes automatically.
+
+    Schedules live in ~/.tess/schedules.json, shared by every TESS process:
+    each add/remove updates only its own entry under a file lock, running
+    schedulers pick up each other's changes, and each run is claimed in
+    schedule_runs.json so a job fires once even when several processes hold it.
     """
     def __init__(self, brain=None):
         self.brain = brain
         self.jobs = {}  # name -> {time, task, job_ref}
         self.running = False
         self.thread = None
-        self.config_path = os.path.join(os.getcwd(), "config", "schedules.json")
+        self.config_path = os.path.join(Config.TESS_DIR, "schedules.json")
+        self.runs_path = os.path.join(Config.TESS_DIR, "schedule_runs.json")
+        self._signature = None
+        self._migrate_legacy(os.path.join(os.getcwd(), "config", "schedules.json"))
         self._load_schedules()
 
+    def _migrate_legacy(self, legacy_path):
+        """Schedules used to live in ./config/schedules.json, relative to wherever TESS was started."""
+        if os.path.exists(self.config_path) or not os.path.exists(legacy_path): return
+        try:
+            with open(legacy_path, 'r') as f:
+                legacy = json.load(f)
+            locked_update(self.config_path, lambda saved: {**legacy, **saved}, default={})
+            logger.info(f"Imported {len(legacy)} schedules from {legacy_path}.")
+        except Exception as e:
+            logger.error(f"Failed to migrate schedules: {e}")
+
     def _load_schedules(self):
         """Load saved schedules from disk."""
         if os.path.exists(self.config_path):
             try:
-                with open(self.config_path, 'r') as f:
-                    saved = json.load(f)
-                for name, info in saved.items():
-                    self.add_job(name, info['time'], info['task'], save=False)
+                saved = self._sync()
                 logger.info(f"Loaded {len(saved)} saved schedules.")
             except Exception as e:
                 logger.error(f"Failed to load schedules: {e}")
 
-    def _save_schedules(self):
-        """Persist schedules to disk."""
-        os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
-        data = {}
-        for name, info in self.jobs.items():
-            data[name] = {"time": info["time"], "task": info["task"]}
-        with open(self.config_path, 'w') as f:
-            json.dump(data, f, indent=2)
+    def _sync(self):
+        """Brings this process's jobs in line with the shared file (other processes add and remove too)."""
+        self._signature = file_signature(self.config_path)
+        saved = read_json(self.config_path, default={})
+        for name in list(self.jobs):
+            if name not in saved:
+                schedule.cancel_job(self.jobs.pop(name)["job_ref"])
+        for name, info in saved.items():
+            current = self.jobs.get(name)
+            if current is None or (current["time"], current["task"]) != (info["time"], info["task"]):
+                self.add_job(name, info['time'], info['task'], save=False)
+        return saved
+
+    def _claim_run(self, name, time_str):
+        """True for exactly one process per job per day."""
+        slot = f"{datetime.now():%Y-%m-%d} {time_str}"
+        claimed = []
+
+        def claim(runs):
+            if runs.get(name) != slot:
+                runs[name] = slot
+                claimed.append(True)
+
+        locked_update(self.runs_path, claim, default={})
+        return bool(claimed)
 
     def add_job(self, name, time_str, task_description, save=True):
         """
@@ -60,9 +96,12 @@ class TessScheduler:
 
         # Cancel existing job with same name
         if name in self.jobs:
-            self.remove_job(name)
+            schedule.cancel_job(self.jobs.pop(name)["job_ref"])
 
         def job_callback():
+            if not self._claim_run(name, time_str):
+                logger.info(f"Scheduled task '{name}' already running in another TESS process.")
+                return
             logger.info(f"⏰ Executing scheduled task: {name}")
             print(f"\n\n⏰ [SCHEDULER] Running: '{task_description}'")
             if self.brain:
@@ -81,23 +120,28 @@ class TessScheduler:
         }
         
         if save:
-            self._save_schedules()
+            entry = {"time": time_str, "task": task_description}
+            locked_update(self.config_path, lambda saved: saved.update({name: entry}), default={})
+            self._sync()
         
         logger.info(f"Scheduled '{name}' at {time_str}: {task_description}")
         return f"✅ Scheduled '{name}' daily at {time_str}: \"{task_description}\""
 
     def remove_job(self, name):
         """Cancel a scheduled job."""
+        self._sync_if_changed()
         if name not in self.jobs:
             return f"No schedule named '{name}' found."
         
         schedule.cancel_job(self.jobs[name]["job_ref"])
         del self.jobs[name]
-        self._save_schedules()
+        locked_update(self.config_path, lambda saved: {k: v for k, v in saved.items() if k != name}, default={})
+        self._sync()
         return f"🗑️ Cancelled schedule: {name}"
 
     def list_jobs(self):
         """List all active schedules."""
+        self._sync_if_changed()
         if not self.jobs:
             return "No active schedules."
         
@@ -106,6 +150,13 @@ class TessScheduler:
             lines.append(f"  • {name} → {info['time']} → \"{info['task']}\"")
         return "\n".join(lines)
 
+    def _sync_if_changed(self):
+        if file_signature(self.config_path) == self._signature: return
+        try:
+            self._sync()
+        except Exception as e:
+            logger.error(f"Failed to reload schedules: {e}")
+
     def start(self):
         """Start the scheduler background thread."""
         if self.running:
@@ -115,6 +166,7 @@ class TessScheduler:
         
         def run_loop():
             while self.running:
+                self._sync_if_changed()
                 schedule.run_pending()
                 time.sleep(30) # Check every 30 seconds
         
@@ -0,0 +1,179 @@
+"""
+Cross-process coordination for TESS state files.
+
+The CLI, the Telegram and scheduler threads, and the supervisor/API process all
+share ~/.tess. Readers never lock: every file is replaced atomically, so they
+see either the old version or the new one. Writers serialise on a sidecar
+{path}.lock and re-read the file before changing it, so no update is lost.
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+from .logger import setup_logger
+
+logger = setup_logger("SharedState")
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def file_signature(*paths):
+    """(mtime_ns, size, inode) per path, so edits by other processes invalidate caches too."""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+class FileLock:
+    """
+    Exclusive lock shared by threads and processes, re-entrant within a thread.
+
+    One instance per lock file per process (for_path): OS file locks belong to the
+    process, so two handles in the same process would not exclude each other.
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    @classmethod
+    def for_path(cls, path):
+        path = os.path.abspath(path)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._fh = open(self.path, "a+b")
+                if fcntl:
+                    fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+                else:
+                    self._fh.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            # LK_LOCK gives up after ~10s; keep waiting for the holder
+                            time.sleep(0.05)
+            except BaseException:
+                if self._fh is not None:
+                    self._fh.close()
+                    self._fh = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl:
+                    fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._fh.seek(0)
+                    msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                self._fh.close()
+                self._fh = None
+        self._thread_lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def lock_for(path):
+    return FileLock.for_path(path + ".lock")
+
+
+def read_json(path, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return copy.deepcopy(default)
+
+
+def atomic_write_json(path, data, indent=2):
+    """Writes to a temp file and renames it over path, so readers never see half a file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, default=str)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def locked_update(path, mutate, default=None):
+    """
+    Read-modify-write of a JSON file under its lock. mutate(data) changes data in
+    place (or returns a replacement); the written value is returned.
+    """
+    with lock_for(path):
+        data = read_json(path, default)
+        result = mutate(data)
+        if result is not None:
+            data = result
+        atomic_write_json(path, data)
+        return data
+
+
+def merge_changes(current, base, ours):
+    """
+    Three-way merge: applies the edits that turned base into ours onto current
+    (the latest version on disk), keeping everyone else's edits.
+
+    Dicts merge per key, lists keep other writers' additions, numbers apply our
+    delta (so counters from two processes add up), anything else takes ours.
+    """
+    if ours == base:
+        return current
+    if isinstance(ours, dict) and isinstance(base, dict) and isinstance(current, dict):
+        merged = dict(current)
+        for key in ours:
+            if key not in base:
+                merged[key] = ours[key] if key not in current else merge_changes(current[key], None, ours[key])
+            elif key in current:
+                merged[key] = merge_changes(current[key], base[key], ours[key])
+            elif ours[key] != base[key]:
+                merged[key] = ours[key]
+        for key in base:
+            if key not in ours:
+                merged.pop(key, None)
+        return merged
+    if isinstance(ours, list) and isinstance(base, list) and isinstance(current, list):
+        removed = [x for x in base if x not in ours]
+        merged = [x for x in current if x not in removed]
+        return merged + [x for x in ours if x not in base and x not in merged]
+    numbers = (int, float)
+    if (isinstance(ours, numbers) and isinstance(base, numbers) and isinstance(current, numbers)
+            and not any(isinstance(v, bool) for v in (ours, base, current))):
+        return current + (ours - base)
+    return ours
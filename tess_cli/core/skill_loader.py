@@ -5,6 +5,7 @@ import importlib
 import inspect
 import logging
 from ..skills.base_skill import BaseSkill
+from .action_catalog import ActionCatalog
 
 logger = logging.getLogger("SkillLoader")
 
@@ -84,8 +85,9 @@ class SkillLoader:
         return loaded_count
 
     def _register_skill(self, skill: BaseSkill):
-        """Maps intents to the skill instance."""
+        """Maps intents to the skill instance and makes them visible to the Brain's action catalog."""
         self.skills[skill.name] = skill
+        ActionCatalog.shared().add_skill(skill)
         
         for intent in skill.intents:
             if intent in self.registry:
@@ -3,6 +3,7 @@ import json
 import logging
 from .logger import setup_logger
 from .config import Config
+from .shared_state import atomic_write_json, file_signature
 
 logger = setup_logger("SkillManager")
 
@@ -10,16 +11,21 @@ class SkillManager:
     """
     Manages user-taught skills (macros).
     Skills are stored as JSON plans in `data/skills/{user_id}/`.
+    Files are replaced atomically and the cache reloads when the directory
+    changes, so skills taught in another TESS process show up here too.
     """
     def __init__(self, user_id="default"):
         self.user_id = str(user_id)
         self.skills_dir = os.path.join("data", "skills", self.user_id)
         os.makedirs(self.skills_dir, exist_ok=True)
         self.skills_cache = {}
+        self._signature = None
         self._load_skills()
 
     def _load_skills(self):
         """Loads all skills into memory for quick lookup."""
+        self._signature = file_signature(self.skills_dir)
+        self.skills_cache = {}
         try:
             for filename in os.listdir(self.skills_dir):
                 if filename.endswith(".json"):
@@ -31,6 +37,11 @@ class SkillManager:
         except Exception as e:
             logger.error(f"Failed to load skills: {e}")
 
+    def _refresh(self):
+        """Reloads when another process added or removed a skill file."""
+        if file_signature(self.skills_dir) != self._signature:
+            self._load_skills()
+
     def learn_skill(self, name, goal, planner):
         """
         Creates a plan for the goal and saves it as a skill.
@@ -56,8 +67,7 @@ class SkillManager:
         filepath = os.path.join(self.skills_dir, f"{safe_name}.json")
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(skill_data, f, indent=2)
+            atomic_write_json(filepath, skill_data)
             
             # Update cache
             self.skills_cache[safe_name] = skill_data
@@ -68,6 +78,7 @@ class SkillManager:
 
     def get_skill(self, name):
         """Exact or fuzzy match for a skill."""
+        self._refresh()
         # Direct match
         if name in self.skills_cache:
             return self.skills_cache[name]
@@ -81,10 +92,12 @@ class SkillManager:
 
     def list_skills(self):
         """Returns a list of all available skill names."""
+        self._refresh()
         return list(self.skills_cache.keys())
 
     def delete_skill(self, name):
         """Deletes a skill."""
+        self._refresh()
         if name in self.skills_cache:
             safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '_', '-')).strip()
             filepath = os.path.join(self.skills_dir, f"{safe_name}.json")
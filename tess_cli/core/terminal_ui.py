@@ -192,12 +192,9 @@ def print_thought(msg):
     """
     console.print(f"  [dim italic magenta]💭 {msg}[/dim italic magenta]")
 
-def print_tess_message(msg):
-    """
-    Render TESS response in a softer, more conversational style.
-    """
+def _tess_panel(msg):
     # Use a simpler, non-heavy box for a 'softer' feel
-    panel = Panel(
+    return Panel(
         Text(msg),
         title="[bold magenta]◆ TESS[/bold magenta]",
         title_align="left",
@@ -205,7 +202,51 @@ def print_tess_message(msg):
         box=box.SIMPLE,
         padding=(1, 1)
     )
-    console.print(panel)
+
+def print_tess_message(msg):
+    """
+    Render TESS response in a softer, more conversational style.
+    Accepts a full string, or any iterable of text chunks which is rendered live as it arrives.
+    Returns the full rendered text.
+    """
+    if isinstance(msg, str):
+        console.print(_tess_panel(msg))
+        return msg
+
+    stream = TessMessageStream()
+    try:
+        for chunk in msg:
+            stream.write(chunk)
+    finally:
+        stream.close()
+    return stream.text
+
+class TessMessageStream:
+    """
+    Live-updating TESS panel for replies that arrive token by token.
+    The panel (and the Live display) only appears on the first write, so an
+    unused stream leaves the terminal untouched.
+    """
+    def __init__(self):
+        self.text = ""
+        self._live = None
+
+    @property
+    def started(self):
+        return self._live is not None
+
+    def write(self, delta):
+        if not self._live:
+            clear_thinking()
+            self._live = Live(_tess_panel(""), console=console, refresh_per_second=15)
+            self._live.start()
+        self.text += delta
+        self._live.update(_tess_panel(self.text))
+
+    def close(self):
+        if self._live:
+            self._live.stop()
+            self._live = None
 
 def print_tess_action(msg):
     if Config.get_ui_mode() == "minimal":
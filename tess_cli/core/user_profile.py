@@ -3,11 +3,14 @@ TESS User Profile - Persistent Personalization
 Stores user facts, preferences, and stats across sessions.
 """
 
+import copy
 import json
 import os
 import re
+from contextlib import contextmanager
 from datetime import datetime
 from .logger import setup_logger
+from .shared_state import atomic_write_json, file_signature, lock_for, merge_changes
 
 logger = setup_logger("UserProfile")
 
@@ -15,6 +18,10 @@ class UserProfile:
     """
     Persistent user profile that remembers facts, preferences, and usage stats.
     Stored in ~/.tess/user_profile.json
+
+    Several TESS processes may hold a profile at once. save() merges this
+    instance's changes into the file's latest contents under a file lock, and
+    reads pick up other processes' saves, so nobody's updates are lost.
     """
 
     PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".tess")
@@ -39,10 +46,13 @@ class UserProfile:
         }
     }
 
-    def __init__(self):
+    def __init__(self, track_session=True):
         os.makedirs(self.PROFILE_DIR, exist_ok=True)
         self.data = self._load()
-        self._update_session()
+        self._base = copy.deepcopy(self.data)  # Profile as last read from disk
+        self._signature = file_signature(self.PROFILE_PATH)
+        if track_session:
+            self._update_session()
 
     def _load(self):
         """Load profile from disk."""
@@ -51,7 +61,7 @@ class UserProfile:
                 with open(self.PROFILE_PATH, 'r') as f:
                     loaded = json.load(f)
                     # Merge with defaults for new fields
-                    merged = self.DEFAULT_PROFILE.copy()
+                    merged = copy.deepcopy(self.DEFAULT_PROFILE)
                     for k, v in loaded.items():
                         if isinstance(v, dict) and isinstance(merged.get(k), dict):
                             merged[k].update(v)
@@ -60,18 +70,43 @@ class UserProfile:
                     return merged
             except Exception as e:
                 logger.error(f"Failed to load profile: {e}")
-        return self.DEFAULT_PROFILE.copy()
+        return copy.deepcopy(self.DEFAULT_PROFILE)
+
+    def _refresh(self, force=False):
+        """Picks up saves from other processes, keeping this instance's unsaved changes."""
+        signature = file_signature(self.PROFILE_PATH)
+        if signature == self._signature and not force: return
+        current = self._load()
+        self.data = merge_changes(current, self._base, self.data)
+        self._base = copy.deepcopy(current)
+        self._signature = signature
 
     def save(self):
-        """Save profile to disk."""
+        """Save profile to disk, merged with whatever other processes saved meanwhile."""
         try:
-            with open(self.PROFILE_PATH, 'w') as f:
-                json.dump(self.data, f, indent=2, default=str)
+            with lock_for(self.PROFILE_PATH):
+                # Signatures can miss a same-size save within the clock tick, so re-read under the lock
+                self._refresh(force=True)
+                atomic_write_json(self.PROFILE_PATH, self.data)
+                self._base = copy.deepcopy(self.data)
+                self._signature = file_signature(self.PROFILE_PATH)
         except Exception as e:
             logger.error(f"Failed to save profile: {e}")
 
+    @contextmanager
+    def _transaction(self):
+        """Read-check-write as one step across processes (e.g. duplicate checks, streaks)."""
+        with lock_for(self.PROFILE_PATH):
+            self._refresh(force=True)
+            yield
+            self.save()
+
     def _update_session(self):
         """Update session stats on startup."""
+        with self._transaction():
+            self._count_session()
+
+    def _count_session(self):
         now = datetime.now()
         today = now.strftime("%Y-%m-%d")
 
@@ -98,7 +133,6 @@ class UserProfile:
             self.data["stats"]["best_streak"] = self.data["stats"]["current_streak"]
 
         self.data["stats"]["last_session"] = today
-        self.save()
 
     # ─── Fact Learning ────────────────────────────────────────────────────
 
@@ -107,17 +141,17 @@ class UserProfile:
         # 🛡️ SANITIZE: Remove control characters and weirdness
         fact_text = "".join(ch for ch in fact_text if ch.isprintable())
 
-        # Avoid duplicates
-        for existing in self.data["facts"]:
-            if existing["text"].lower() == fact_text.lower():
-                return False
-
-        self.data["facts"].append({
-            "text": fact_text,
-            "learned": datetime.now().strftime("%Y-%m-%d %H:%M"),
-            "source": source
-        })
-        self.save()
+        with self._transaction():
+            # Avoid duplicates
+            for existing in self.data["facts"]:
+                if existing["text"].lower() == fact_text.lower():
+                    return False
+
+            self.data["facts"].append({
+                "text": fact_text,
+                "learned": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                "source": source
+            })
         logger.info(f"Learned fact: {fact_text}")
         return True
 
@@ -184,6 +218,7 @@ class UserProfile:
 
     def get_facts_context(self):
         """Returns a formatted string of known facts for injecting into LLM context."""
+        self._refresh()
         parts = []
         if self.data["name"]:
             parts.append(f"User's name is {self.data['name']}.")
@@ -197,6 +232,7 @@ class UserProfile:
 
     def get_greeting(self):
         """Generate a personalized, time-aware greeting."""
+        self._refresh()
         now = datetime.now()
         hour = now.hour
         name = self.data.get("name") or "there"
@@ -240,6 +276,7 @@ class UserProfile:
 
     def track_command(self, action_type=None):
         """Track a command execution."""
+        self._refresh()
         self.data["stats"]["total_commands"] += 1
         if action_type:
             usage = self.data["stats"].get("feature_usage", {})
@@ -249,6 +286,7 @@ class UserProfile:
 
     def get_stats_summary(self):
         """Returns a concise summary of user stats."""
+        self._refresh()
         stats = self.data["stats"]
         return {
             "sessions": stats["total_sessions"],
@@ -259,11 +297,12 @@ class UserProfile:
 
     @property
     def name(self):
-
+        self._refresh()
         return self.data.get("name")
 
     @property
     def personality(self):
+        self._refresh()
         return self.data.get("preferences", {}).get("personality", "casual")
 
     @personality.setter
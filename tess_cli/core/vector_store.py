@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from .memory_index import tokenize
+from .logger import setup_logger
+
+logger = setup_logger("VectorStore")
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedding: word unigrams, bigrams and character trigrams hashed
+    into a fixed number of signed buckets (sublinear tf, L2-normalised).
+
+    It captures lexical and spelling overlap, not meaning; it is what the local
+    store falls back to when no neural embedding model is installed.
+    """
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _bucket(self, feature):
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return h % self.dim, 1.0 if (h >> 63) & 1 else -1.0
+
+    def _features(self, text):
+        words = tokenize(text)
+        feats = list(words)
+        feats += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"#{w}#"
+            feats += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return feats
+
+    def __call__(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, tf in counts.items():
+                bucket, sign = self._bucket(feature)
+                out[row, bucket] += sign * (1.0 + np.log(tf))
+        return out
+
+
+class SentenceTransformerEmbedder:
+    """all-MiniLM-L6-v2 (the model behind Chroma's default embedding function), when installed."""
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def __call__(self, texts):
+        return np.asarray(self.model.encode(list(texts), batch_size=32), dtype=np.float32)
+
+
+def default_embedder():
+    try:
+        return SentenceTransformerEmbedder()
+    except Exception:
+        logger.info("sentence-transformers unavailable; local vector store uses hashing embeddings.")
+        return HashingEmbedder()
+
+
+def _normalise(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalVectorStore:
+    """
+    Built-in replacement for a Chroma collection.
+
+    Embeddings are unit-normalised float16 rows in a memory-mapped {name}.npy
+    matrix; ids, documents and metadata live in a {name}.db SQLite sidecar keyed
+    by row number. Queries compute cosine similarity in batches of BATCH rows and
+    take the top k with argpartition. Deleted rows are zeroed and reused by later
+    inserts, so no compaction is needed. The matrix doubles when full.
+
+    Converting float16 to float32 costs more than the dot products, so up to
+    CACHE_BYTES of the matrix is also kept as float32 in RAM and updated in place
+    on writes; larger stores stream from the memory map.
+
+    Exposes the subset of the Chroma collection API KnowledgeBase uses
+    (add/upsert/query/get/delete/count), so both backends share one code path.
+    """
+    BATCH = 16384
+    INITIAL_CAPACITY = 1024
+    CACHE_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, path, name="tess_knowledge", embedding_function=None):
+        os.makedirs(path, exist_ok=True)
+        self.matrix_path = os.path.join(path, f"{name}.npy")
+        self.embed = embedding_function or default_embedder()
+        self._lock = threading.RLock()
+
+        self._db = sqlite3.connect(os.path.join(path, f"{name}.db"), check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "document TEXT, metadata TEXT NOT NULL DEFAULT '{}')"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+        self._rows = dict(self._db.execute("SELECT id, row FROM vectors"))
+        self._size = max(self._rows.values(), default=-1) + 1
+        taken = set(self._rows.values())
+        self._free = sorted((r for r in range(self._size) if r not in taken), reverse=True)
+        self.matrix = None
+        self._cache = None  # float32 copy of matrix[:len(cache)]
+        self._open_matrix()
+
+        stored = dict(self._db.execute("SELECT key, value FROM meta"))
+        if stored.get("embedder") != self.embed.name and self._rows:
+            self._reembed(stored.get("embedder"))
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('embedder', ?)", (self.embed.name,))
+        self._db.commit()
+
+    # ─── Matrix file ─────────────────────────────────────────────────────
+
+    def _open_matrix(self, capacity=None):
+        dim = self.embed.dim
+        if capacity is None and os.path.exists(self.matrix_path):
+            matrix = np.load(self.matrix_path, mmap_mode="r+")
+            if matrix.ndim == 2 and matrix.shape[1] == dim and matrix.shape[0] >= self._size:
+                self.matrix = matrix
+                return
+            del matrix
+        capacity = max(capacity or 0, self.INITIAL_CAPACITY, self._size)
+        self.matrix = np.lib.format.open_memmap(self.matrix_path, mode="w+", dtype=np.float16, shape=(capacity, dim))
+
+    def _grow(self, needed):
+        capacity = self.matrix.shape[0]
+        if needed <= capacity: return
+        while capacity < needed:
+            capacity *= 2
+        tmp = self.matrix_path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float16, shape=(capacity, self.matrix.shape[1]))
+        used = min(self._size, self.matrix.shape[0])
+        grown[:used] = self.matrix[:used]
+        grown.flush()
+        del grown
+        self.matrix = None  # Release the mapping before replacing the file (required on Windows)
+        os.replace(tmp, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+
+    def _reembed(self, previous):
+        """The embedding model changed: rebuild every vector from the stored documents."""
+        logger.info(f"Embedding model changed ({previous} -> {self.embed.name}); re-embedding {len(self._rows)} documents.")
+        rows = self._db.execute("SELECT row, document FROM vectors ORDER BY row").fetchall()
+        self._open_matrix(capacity=self._size)
+        self._cache = None
+        for start in range(0, len(rows), 256):
+            batch = rows[start:start + 256]
+            vectors = _normalise(self.embed([doc or "" for _, doc in batch]))
+            for (row, _), vector in zip(batch, vectors):
+                self.matrix[row] = vector
+        self.matrix.flush()
+
+    # ─── Chroma-compatible surface ───────────────────────────────────────
+
+    def upsert(self, ids, documents, metadatas=None, embeddings=None):
+        metadatas = metadatas or [{}] * len(ids)
+        vectors = _normalise(embeddings if embeddings is not None else self.embed(list(documents)))
+        with self._lock:
+            records = []
+            for mem_id, doc, meta, vector in zip(ids, documents, metadatas, vectors):
+                row = self._rows.get(mem_id)
+                if row is None:
+                    row = self._free.pop() if self._free else self._size
+                    self._size = max(self._size, row + 1)
+                    self._grow(self._size)
+                    self._rows[mem_id] = row
+                self.matrix[row] = vector
+                self._cache_set(row, vector)
+                records.append((row, mem_id, doc, json.dumps(meta or {}, ensure_ascii=False)))
+            self.matrix.flush()
+            self._db.executemany("INSERT OR REPLACE INTO vectors (row, id, document, metadata) VALUES (?, ?, ?, ?)", records)
+            self._db.commit()
+
+    def add(self, ids, documents, metadatas=None, embeddings=None):
+        self.upsert(ids, documents, metadatas, embeddings)
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            targets = set(ids or [])
+            if where:
+                targets |= set(self.get(where=where)["ids"])
+            rows = [self._rows.pop(t) for t in targets if t in self._rows]
+            for row in rows:
+                self.matrix[row] = 0
+                self._cache_set(row, 0)
+            self._free = sorted(set(self._free) | set(rows), reverse=True)
+            self.matrix.flush()
+            self._db.executemany("DELETE FROM vectors WHERE row = ?", [(r,) for r in rows])
+            self._db.commit()
+
+    def count(self):
+        return len(self._rows)
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=None):
+        # Documents and metadatas always come back; include=["embeddings"] adds the (unit-normalised) vectors
+        with self._lock:
+            if ids is not None:
+                marks = ",".join("?" * len(ids))
+                rows = self._db.execute(f"SELECT row, id, document, metadata FROM vectors WHERE id IN ({marks})", list(ids)).fetchall()
+            elif where is None:
+                rows = self._db.execute("SELECT row, id, document, metadata FROM vectors ORDER BY row LIMIT ? OFFSET ?",
+                                        (-1 if limit is None else limit, offset or 0)).fetchall()
+                limit = offset = None  # Paged in SQL
+            else:
+                # Narrowed in SQL so only matching documents are read; checked exactly below
+                conditions = " AND ".join("json_extract(metadata, ?) = ?" for _ in where)
+                params = [p for k, v in where.items() for p in (f'$."{k}"', v)]
+                rows = self._db.execute(f"SELECT row, id, document, metadata FROM vectors WHERE {conditions} ORDER BY row",
+                                        params).fetchall()
+            out = {"ids": [], "documents": [], "metadatas": []}
+            kept = []
+            for row, mem_id, doc, meta in rows:
+                meta = json.loads(meta)
+                if where and any(meta.get(k) != v for k, v in where.items()): continue
+                kept.append(row)
+                out["ids"].append(mem_id)
+                out["documents"].append(doc)
+                out["metadatas"].append(meta)
+            if limit is not None or offset:
+                page = slice(offset or 0, None if limit is None else (offset or 0) + limit)
+                kept = kept[page]
+                out = {key: values[page] for key, values in out.items()}
+            if include and "embeddings" in include:
+                out["embeddings"] = np.asarray(self.matrix[kept], dtype=np.float32).reshape(len(kept), self.matrix.shape[1])
+        return out
+
+    def query(self, query_texts, n_results=3, **_):
+        """Chroma-style result: per query, ids/documents/metadatas/distances (cosine distance)."""
+        queries = _normalise(self.embed(list(query_texts)))
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for q in queries:
+            hits = self._top_k(q, n_results)
+            rows = {}
+            if hits:
+                marks = ",".join("?" * len(hits))
+                with self._lock:
+                    rows = {r: (i, d, m) for r, i, d, m in self._db.execute(
+                        f"SELECT row, id, document, metadata FROM vectors WHERE row IN ({marks})", [r for r, _ in hits])}
+            hits = [(r, s) for r, s in hits if r in rows]
+            result["ids"].append([rows[r][0] for r, _ in hits])
+            result["documents"].append([rows[r][1] for r, _ in hits])
+            result["metadatas"].append([json.loads(rows[r][2]) for r, _ in hits])
+            result["distances"].append([float(1 - s) for _, s in hits])
+        return result
+
+    def _cache_set(self, row, vector):
+        if self._cache is None: return
+        if row < len(self._cache):
+            self._cache[row] = vector
+        else:
+            self._cache = None  # Rebuilt at the new size on the next query
+
+    def _vectors(self, n):
+        """float32 rows [0, n) from the RAM cache, or None when the store is too big to cache."""
+        if n * self.matrix.shape[1] * 4 > self.CACHE_BYTES: return None
+        if self._cache is None or len(self._cache) < n:
+            self._cache = np.asarray(self.matrix[:n], dtype=np.float32)
+        return self._cache[:n]
+
+    def _top_k(self, query, k):
+        with self._lock:
+            n = self._size
+            if not self._rows or k <= 0: return []
+            cached = self._vectors(n)
+            if cached is not None:
+                scores = cached @ query
+            else:
+                scores = np.empty(n, dtype=np.float32)
+                for start in range(0, n, self.BATCH):
+                    block = np.asarray(self.matrix[start:min(start + self.BATCH, n)], dtype=np.float32)
+                    scores[start:start + len(block)] = block @ query
+            if self._free:
+                scores[[r for r in self._free if r < n]] = -np.inf
+        k = min(k, len(self._rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(r), float(scores[r])) for r in top]
@@ -1,5 +1,6 @@
 import logging
 import asyncio
+import time
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters
 from ..core.config import Config
@@ -9,6 +10,9 @@ from ..core.orchestrator import process_action
 
 logger = setup_logger("TelegramBot")
 
+# Telegram throttles message edits, so streamed replies are flushed at most this often
+STREAM_EDIT_INTERVAL = 1.0
+
 class TessBot:
     def __init__(self, profile_manager, launcher, sys_ctrl, file_mgr, knowledge_db, planner, web_browser, task_registry, whatsapp, youtube_client, executor, screencast=None):
         self.token = Config.TELEGRAM_BOT_TOKEN
@@ -32,6 +36,8 @@ class TessBot:
             'executor': executor,
             'screencast': screencast
         }
+        # One lock per user: their turns share a Brain (history, key reservations), so they run in order
+        self._turn_locks = {}
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         await context.bot.send_message(
@@ -55,6 +61,11 @@ Just talk to me naturally. I can:
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = str(update.effective_user.id)
+        lock = self._turn_locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            await self._handle_turn(user_id, update, context)
+
+    async def _handle_turn(self, user_id, update, context):
         user_text = update.message.text
         logger.debug(f"Telegram User {user_id}: {user_text}")
         
@@ -72,20 +83,49 @@ Just talk to me naturally. I can:
                     loop
                 )
 
-            # 3. Generate Action
-            response = await loop.run_in_executor(None, brain.generate_command, user_text)
+            # Streamed reply text is rendered by editing the "Thinking..." message in place
+            streamed = {"text": "", "last_edit": 0.0}
+            async def edit_status(text):
+                try:
+                    await status_msg.edit_text(text)
+                except Exception as e:
+                    logger.debug(f"Stream edit skipped: {e}") # e.g. unchanged text
+
+            def on_token(delta):
+                streamed["text"] += delta
+                now = time.monotonic()
+                if now - streamed["last_edit"] >= STREAM_EDIT_INTERVAL:
+                    streamed["last_edit"] = now
+                    asyncio.ensure_future(edit_status(streamed["text"]))
+
+            # 3. Generate Action (native async, other chats keep flowing meanwhile)
+            response = await brain.agenerate_command(user_text, on_token=on_token)
             
             # 4. Execute Action
             await loop.run_in_executor(None, process_action, response, self.components, brain, tele_out)
             
-            await status_msg.edit_text("✅ Done.")
+            if response.get("streamed"):
+                await edit_status(streamed["text"])
+            else:
+                await status_msg.edit_text("✅ Done.")
             
         except Exception as e:
             logger.error(f"Telegram Handler Error: {e}")
             await context.bot.send_message(chat_id=update.effective_chat.id, text=f"❌ Error: {str(e)}")
 
+    async def _post_shutdown(self, app):
+        # Async clients are bound to this bot's event loop, which is about to close
+        await self.profile_manager.aclose()
+
     def run(self):
-        app = ApplicationBuilder().token(self.token).build()
+        # Turns are awaited natively, so chats from different users can overlap (one user's turns queue up)
+        app = (
+            ApplicationBuilder()
+            .token(self.token)
+            .concurrent_updates(True)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         
         app.add_handler(CommandHandler("start", self.start))
         app.add_handler(CommandHandler("help", self.help_command))
@@ -0,0 +1,92 @@
+"""
+Shared fixtures — scripted LLM clients and a Brain wired to them.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.brain import Brain
+from tess_cli.core.llm_pool import LLMClientPool
+from tess_cli.core.llm_router import ProviderRouter
+from tess_cli.core.llm_limiter import KeyLimiter
+
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeClient:
+    """
+    Each create() pops the next outcome: text, an Exception, a list of stream
+    pieces, or (delay, outcome). Calls record the create() kwargs.
+    """
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def _next(self, kwargs):
+        self.calls.append(kwargs)
+        outcome = self.outcomes.pop(0) if self.outcomes else "late"
+        return outcome if isinstance(outcome, tuple) else (0, outcome)
+
+    def create(self, **kwargs):
+        delay, value = self._next(kwargs)
+        if delay: time.sleep(delay)
+        if isinstance(value, Exception): raise value
+        if kwargs.get("stream"):
+            return iter([chunk(piece) for piece in value])
+        return completion(value)
+
+    def close(self):
+        pass
+
+
+class FakeAsyncClient(FakeClient):
+    async def create(self, **kwargs):
+        delay, value = self._next(kwargs)
+        if delay: await asyncio.sleep(delay)
+        if isinstance(value, Exception): raise value
+        if kwargs.get("stream"):
+            async def gen():
+                for piece in value:
+                    yield chunk(piece)
+            return gen()
+        return completion(value)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def make_brain():
+    """
+    make_brain({provider: outcomes}, asynchronous=False, model=None) -> (brain, clients).
+    The first provider is the brain's primary; context enrichment and the intent
+    router are off so every turn reaches the fake clients.
+    """
+    def build(outcomes, asynchronous=False, model=None):
+        client_cls = FakeAsyncClient if asynchronous else FakeClient
+        clients = {provider: client_cls(o) for provider, o in outcomes.items()}
+        factory = lambda provider, model, key: (clients[provider], None)
+        pool = LLMClientPool(factory=factory, async_factory=factory)
+        brain = Brain(client_pool=pool, router=ProviderRouter(), limiter=KeyLimiter())
+        brain.provider = next(iter(clients))
+        if model:
+            brain.model = model
+        brain.response_cache = None
+        brain._enrich_context = lambda query: None
+        brain.intent_router = None
+        return brain, clients
+    return build
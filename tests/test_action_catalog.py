@@ -0,0 +1,140 @@
+"""
+Tests for the action catalog — retrieval, stable rendering and the per-request [ACTIONS] block.
+"""
+
+import os
+import re
+import json
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.brain import Brain
+from tess_cli.core.config import Config
+from tess_cli.core.action_catalog import ActionCatalog, ALWAYS_INCLUDED
+from tess_cli.core import coding_agent
+from tess_cli.core.coding_agent import (CORE_TOOL_DOC, TOOL_DOCS, CodingAgent, additional_tools_doc,
+                                        optional_tools_for, render_tools)
+
+
+@pytest.fixture
+def catalog():
+    return ActionCatalog()
+
+
+class TestCatalog:
+    def test_covers_schema_actions(self, catalog):
+        for name in ("launch_app", "whatsapp_op", "sysadmin_op", "trip_planner_op"):
+            assert name in catalog.entries
+        assert "error" not in catalog.entries
+
+    @pytest.mark.parametrize("query, expected", [
+        ("send a message to mom on whatsapp", "whatsapp_op"),
+        ("make a presentation about mars", "presentation_op"),
+        ("turn wifi off", "sysadmin_op"),
+        ("email the report to john", "gmail_op"),
+    ])
+    def test_selects_relevant_actions(self, catalog, query, expected):
+        names = catalog.select(query, top_k=6)
+        assert expected in names
+        assert set(ALWAYS_INCLUDED) <= set(names)
+        assert len(names) <= 6 + len(ALWAYS_INCLUDED)
+
+    def test_selection_is_in_catalog_order(self, catalog):
+        names = catalog.select("email and whatsapp and youtube")
+        order = list(catalog.entries)
+        assert names == sorted(names, key=order.index)
+
+    def test_recent_actions_stay_available(self, catalog):
+        assert "pdf_op" in catalog.select("now do the next one", recent=["pdf_op", "not_an_action"])
+
+    def test_skills_are_registered(self, catalog):
+        class Skill:
+            name = "WeatherSkill"
+            description = "Reports the forecast for a city."
+            intents = ["weather_op"]
+
+        catalog.add_skill(Skill())
+        assert "weather_op" in catalog.select("forecast for london")
+        assert "- weather_op: Reports the forecast" in catalog.render(["weather_op"])
+
+    def test_default_render_is_legacy_list(self, catalog):
+        prompt = Config.get_system_prompt(include_actions=True)
+        assert catalog.render() in prompt
+        assert "sysadmin_op" not in catalog.render()
+
+
+@pytest.fixture
+def brain(monkeypatch):
+    monkeypatch.setitem(Config._data["llm"], "action_catalog", {"enabled": True, "top_k": 4})
+    b = Brain()
+    b.intent_router = None
+    b._enrich_context = lambda query: None
+    b._current_context = None
+    return b
+
+
+class TestBrainActions:
+    def test_system_prompt_is_compact(self, brain):
+        assert "- pdf_op:" not in brain.history[0]["content"]
+        assert len(brain.history[0]["content"]) < len(Config.get_system_prompt(include_actions=True))
+
+    def test_actions_block_precedes_latest_message(self, brain):
+        with patch.object(Brain, "_call_api_with_retry", return_value='{"action": "reply_op", "content": "ok"}') as call:
+            brain.generate_command("merge these pdf files")
+        sent = call.call_args.args[0]
+        assert sent[-1] == {"role": "user", "content": "merge these pdf files"}
+        assert sent[-2]["content"].startswith("[ACTIONS]")
+        assert "- pdf_op:" in sent[-2]["content"]
+        # Stored history never carries the per-request block
+        assert not any(m["content"].startswith("[ACTIONS]") for m in brain.history)
+
+    def test_disabled_catalog_sends_no_block(self, brain):
+        Config._data["llm"]["action_catalog"]["enabled"] = False
+        assert brain._relevant_actions("merge these pdf files") is None
+
+
+class TestCodingAgentTools:
+    def test_full_list_numbers_every_tool(self):
+        every = render_tools({name for name, _ in TOOL_DOCS})
+        assert "10. git_commit" in every and "12. done" in every
+
+    def test_core_doc_leaves_out_optional_tools(self):
+        assert "run_command(" not in CORE_TOOL_DOC
+        assert "done(message)" in CORE_TOOL_DOC
+
+    def test_optional_tools_follow_keywords(self):
+        assert optional_tools_for("run the tests") == {"run_command"}
+        assert "git_commit" in optional_tools_for("commit my changes")
+        assert optional_tools_for("explain main.py") == set()
+        assert render_tools({"git_diff", "run_command"}).startswith("1. run_command")
+
+    def test_additional_tools_continue_the_core_numbering(self):
+        core_numbers = re.findall(r"^(\d+)\. ", CORE_TOOL_DOC, re.MULTILINE)
+        extra = additional_tools_doc({"git_diff", "run_command"})
+        assert re.findall(r"^(\d+)\. ", extra, re.MULTILINE) == [str(len(core_numbers) + 1), str(len(core_numbers) + 2)]
+
+    def test_tools_needed_later_in_the_loop_are_described(self, tmp_path, monkeypatch):
+        (tmp_path / "README.md").write_text("Run the suite with pytest before every release.\n")
+        replies = iter(['{"thought": "Read the readme", "tool": "read_file", "args": {"path": "README.md"}}',
+                        '{"thought": "Run it", "tool": "done", "args": {"message": "ok"}}'])
+        seen = []
+
+        class ScriptedBrain:
+            def _call_api_with_retry(self, messages, json_mode=False, temperature=0.7):
+                seen.append([m["content"] for m in messages if m["role"] == "system"])
+                return next(replies)
+
+            def _parse_json(self, text):
+                return json.loads(text)
+
+        monkeypatch.setattr(coding_agent.time, "sleep", lambda s: None)
+        agent = CodingAgent(ScriptedBrain(), workspace_path=str(tmp_path))
+        agent._system_prompt = "system"
+        agent._run_agent_loop("summarise the readme")
+
+        assert seen[0] == ["system"]
+        assert seen[1][-1] == additional_tools_doc({"run_command"})
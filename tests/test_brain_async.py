@@ -0,0 +1,64 @@
+"""
+Tests for the native asyncio Brain API (agenerate_command / arequest_completion).
+"""
+
+import os
+import sys
+import json
+import asyncio
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    from tess_cli.core.config import Config
+    monkeypatch.setitem(Config._data["llm"]["keys"], "openai", ["sk-test"])
+
+
+class TestAsyncBrain:
+    def test_agenerate_command(self, make_brain):
+        brain, clients = make_brain({"openai": ['{"action": "launch_app", "app_name": "Calculator"}']}, asynchronous=True)
+        cmd = asyncio.run(brain.agenerate_command("open calculator"))
+        assert cmd["action"] == "launch_app"
+        assert clients["openai"].calls[0]["response_format"] == {"type": "json_object"}
+        assert brain.history[-1]["role"] == "assistant"
+
+    def test_json_repair_applies(self, make_brain):
+        brain, _ = make_brain({"openai": ['Sure! ```json\n{"action": "reply_op", "content": "hey"}\n```']}, asynchronous=True)
+        cmd = asyncio.run(brain.agenerate_command("hello"))
+        assert cmd == {"action": "reply_op", "content": "hey"}
+
+    def test_waits_out_rate_limit_on_single_key(self, make_brain, monkeypatch):
+        brain, clients = make_brain({"openai": [Exception("Error code: 429. Please try again in 1.5s"), "ok"]}, asynchronous=True)
+        waits = []
+
+        async def no_sleep(delay):
+            waits.append(delay)
+        monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+        result = asyncio.run(brain.arequest_completion([{"role": "user", "content": "hi"}]))
+        assert result == "ok"
+        assert len(clients["openai"].calls) == 2
+        # The only key is cooling down for the provider's retry-after hint
+        assert 1.0 < max(waits) <= 1.5
+
+    def test_streamed_agenerate_command(self, make_brain):
+        raw = '{"action": "reply_op", "content": "Hello async"}'
+        brain, _ = make_brain({"openai": [[raw[:20], raw[20:]]]}, asynchronous=True)
+        tokens = []
+        cmd = asyncio.run(brain.agenerate_command("hello", on_token=tokens.append))
+        assert "".join(tokens) == "Hello async"
+        assert cmd["streamed"] is True
+
+    def test_concurrent_turns_share_the_loop(self, make_brain):
+        brain_a, _ = make_brain({"openai": ['{"action": "reply_op", "content": "a"}']}, asynchronous=True)
+        brain_b, _ = make_brain({"openai": ['{"action": "reply_op", "content": "b"}']}, asynchronous=True)
+
+        async def both():
+            return await asyncio.gather(brain_a.agenerate_command("one"), brain_b.agenerate_command("two"))
+
+        a, b = asyncio.run(both())
+        assert (a["content"], b["content"]) == ("a", "b")
@@ -0,0 +1,83 @@
+"""
+Tests for streamed Brain output — the incremental reply parser and generate_command(on_token=...).
+"""
+
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.brain import Brain, ReplyStreamParser
+
+
+def feed_all(parser, deltas):
+    return "".join(parser.feed(d) for d in deltas)
+
+
+class TestReplyStreamParser:
+    def test_reply_content_streams(self):
+        raw = '{"thought": "easy", "action": "reply_op", "content": "Hello there, friend!"}'
+        parser = ReplyStreamParser()
+        # Feed one character at a time to hit every split point
+        assert feed_all(parser, list(raw)) == "Hello there, friend!"
+        assert parser.emitted
+        assert parser.buffer == raw
+
+    def test_escapes_split_across_deltas(self):
+        raw = '{"action": "reply_op", "content": "line1\\nline2 \\"quoted\\" \\u00e9 \\ud83d\\ude00"}'
+        parser = ReplyStreamParser()
+        text = feed_all(parser, [raw[i:i + 3] for i in range(0, len(raw), 3)])
+        assert text == json.loads(raw)["content"]
+
+    def test_tool_actions_stay_silent(self):
+        raw = '{"action": "execute_command", "command": "dir", "content": "dir"}'
+        parser = ReplyStreamParser()
+        assert feed_all(parser, list(raw)) == ""
+        assert not parser.emitted
+
+    def test_stops_at_closing_quote(self):
+        parser = ReplyStreamParser()
+        text = parser.feed('{"action": "final_reply", "content": "done"')
+        text += parser.feed(', "extra": "not content"}')
+        assert text == "done"
+
+
+@pytest.fixture
+def brain():
+    b = Brain()
+    b._enrich_context = lambda query: None
+    b.intent_router = None # These tests exercise the LLM path
+    return b
+
+
+class TestGenerateCommandStreaming:
+    def test_streamed_reply_is_flagged(self, brain):
+        raw = '{"thought": "hi", "action": "reply_op", "content": "Hi!"}'
+        tokens = []
+        with patch.object(Brain, "stream_completion", return_value=iter([raw[:30], raw[30:]])):
+            cmd = brain.generate_command("hello there", on_token=tokens.append)
+
+        assert "".join(tokens) == "Hi!"
+        assert cmd["action"] == "reply_op"
+        assert cmd["streamed"] is True
+        # The flag is a UI hint only and must not leak into the conversation history
+        assert "streamed" not in json.loads(brain.history[-1]["content"])
+
+    def test_tool_call_is_not_flagged(self, brain):
+        raw = '{"action": "launch_app", "app_name": "Calculator"}'
+        tokens = []
+        with patch.object(Brain, "stream_completion", return_value=iter([raw])):
+            cmd = brain.generate_command("open calc", on_token=tokens.append)
+
+        assert tokens == []
+        assert cmd["action"] == "launch_app"
+        assert "streamed" not in cmd
+
+    def test_empty_stream_reports_error(self, brain):
+        with patch.object(Brain, "stream_completion", return_value=iter([])):
+            cmd = brain.generate_command("hello there", on_token=lambda d: None)
+        assert cmd["action"] == "error"
@@ -0,0 +1,165 @@
+"""
+Tests for knowledge-base chunking — Python by def/class, Markdown by heading,
+token-budgeted line windows for everything else, and the chunker registry.
+"""
+
+import os
+import sys
+import textwrap
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core import chunkers
+from tess_cli.core.chunkers import (MarkdownChunker, PythonChunker, TokenWindowChunker,
+                                    chunker_for, register_chunker)
+from tess_cli.core.config import Config
+
+
+class CharEstimate:
+    """~4 chars/token, as TokenCounter estimates without tiktoken, so budgets below are exact."""
+    def count(self, text):
+        return (len(text) + 3) // 4
+
+
+EST = CharEstimate()
+
+
+def chunk(chunker, text):
+    return chunker.feed(text) + chunker.finish()
+
+
+PYTHON_SOURCE = textwrap.dedent('''\
+    import os
+
+    LIMIT = 3
+
+
+    # Loads the settings file
+    @cached
+    def load_config(path):
+        with open(path) as f:
+            return f.read()
+
+
+    class Store:
+        """Keeps things."""
+
+        def put(self, key, value):
+            self.items[key] = value
+
+        def get(self, key):
+            return self.items.get(key)
+''')
+
+
+class TestPythonChunker:
+    def test_cuts_at_definitions_with_symbols_and_lines(self):
+        chunks = chunk(PythonChunker(max_tokens=30, counter=EST), PYTHON_SOURCE)
+        assert "".join(c["text"] for c in chunks) == PYTHON_SOURCE
+        by_symbol = {c.get("symbol"): c for c in chunks}
+        assert by_symbol["load_config"]["start_line"] == 6  # Leading comment and decorator included
+        assert by_symbol["load_config"]["text"].startswith("# Loads the settings file\n@cached\ndef load_config")
+        assert by_symbol["load_config"]["end_line"] == 12
+
+    def test_oversized_class_is_cut_at_methods(self):
+        chunks = chunk(PythonChunker(max_tokens=20, counter=EST), PYTHON_SOURCE)
+        symbols = [c.get("symbol") for c in chunks]
+        assert "Store.put" in symbols and "Store.get" in symbols
+        get = chunks[symbols.index("Store.get")]
+        assert get["text"].strip().startswith("def get") and get["end_line"] == 20
+
+    def test_small_definitions_are_packed_together(self):
+        chunks = chunk(PythonChunker(max_tokens=1000, counter=EST), PYTHON_SOURCE)
+        assert len(chunks) == 1
+        assert chunks[0]["symbol"] == "load_config, Store"
+        assert (chunks[0]["start_line"], chunks[0]["end_line"]) == (1, 20)
+
+    def test_syntax_errors_fall_back_to_line_windows(self):
+        chunks = chunk(PythonChunker(max_tokens=5, counter=EST), "def broken(:\n    pass\n" * 3)
+        assert len(chunks) > 1 and all("symbol" not in c for c in chunks)
+
+
+class TestMarkdownChunker:
+    def test_sections_carry_their_heading_path(self):
+        text = textwrap.dedent("""\
+            intro line
+
+            # Setup
+            Install it.
+            ## Linux
+            ```sh
+            # not a heading
+            make install
+            ```
+            ## Windows
+            Run the installer.
+        """)
+        chunks = chunk(MarkdownChunker(max_tokens=12, counter=EST), text)
+        # The intro is packed with the first section
+        assert [c.get("symbol") for c in chunks] == ["Setup", "Setup > Linux", "Setup > Windows"]
+        linux = chunks[1]
+        assert "# not a heading" in linux["text"] and (linux["start_line"], linux["end_line"]) == (5, 9)
+
+
+class TestTokenWindows:
+    def test_windows_respect_the_budget_without_overlap(self):
+        text = "".join(f"word{i} " * 5 + "\n" for i in range(50))
+        chunks = chunk(TokenWindowChunker(max_tokens=30, counter=EST), text)
+        assert all(EST.count(c["text"]) <= 30 for c in chunks)
+        assert "".join(c["text"] for c in chunks) == text
+        assert all(a["end_line"] + 1 == b["start_line"] for a, b in zip(chunks, chunks[1:]))
+
+    def test_whitespace_only_text_has_no_chunks(self):
+        assert chunk(TokenWindowChunker(), "  \n\n") == []
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    """Local knowledge base, 30-token chunks, and src/store.py to learn."""
+    from tess_cli.core import knowledge_base
+    monkeypatch.setattr(knowledge_base, "CHROMADB_AVAILABLE", False)
+    monkeypatch.setattr(Config, "TESS_DIR", str(tmp_path / "tess"))
+    monkeypatch.setitem(Config._data, "memory", {"chunk_tokens": 30})
+    monkeypatch.setattr(chunkers, "_counter", EST)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "store.py").write_text(PYTHON_SOURCE)
+    return knowledge_base.KnowledgeBase(db_path=str(tmp_path / "vectors"))
+
+
+class TestRegistry:
+    def test_strategy_follows_the_extension(self, monkeypatch):
+        assert isinstance(chunker_for("a/b.py"), PythonChunker)
+        assert isinstance(chunker_for("README.MD"), MarkdownChunker)
+        assert isinstance(chunker_for("notes.txt"), TokenWindowChunker)
+
+        monkeypatch.setattr(chunkers, "CHUNKERS", dict(chunkers.CHUNKERS))
+        register_chunker(MarkdownChunker, ".rst")
+        assert isinstance(chunker_for("guide.rst"), MarkdownChunker)
+
+    def test_structured_chunkers_must_define_segments(self):
+        class Unfinished(chunkers.StructuredChunker):
+            pass
+
+        with pytest.raises(TypeError):
+            Unfinished(counter=EST)
+
+    def test_budget_comes_from_config(self, monkeypatch):
+        monkeypatch.setitem(Config._data, "memory", {"chunk_tokens": 123})
+        assert chunker_for("x.txt").max_tokens == 123
+
+    def test_learned_chunks_carry_symbols(self, kb, tmp_path):
+        kb.learn_directory(str(tmp_path / "src"))
+        metas = kb.collection.get()["metadatas"]
+        assert "load_config" in [m.get("symbol") for m in metas]
+        assert all(m["start_line"] <= m["end_line"] for m in metas)
+
+    def test_changing_the_budget_rechunks_learned_files(self, kb, tmp_path):
+        kb.learn_directory(str(tmp_path / "src"))
+        assert kb.collection.count() > 1
+        assert "(1 unchanged" in kb.learn_directory(str(tmp_path / "src"))
+
+        Config._data["memory"]["chunk_tokens"] = 1000
+        assert "indexed 1 files" in kb.learn_directory(str(tmp_path / "src"))
+        assert kb.collection.count() == 1
@@ -0,0 +1,114 @@
+"""
+Tests for context enrichment — file-signature caching, concurrency and per-source timeouts.
+"""
+
+import json
+import os
+import sys
+import time
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.brain import Brain
+from tess_cli.core.config import Config
+from tess_cli.core.user_profile import UserProfile
+from tess_cli.core.context_providers import (
+    ContextGatherer, ContextProvider, FileCachedProvider, KnowledgeProvider, ProfileProvider
+)
+
+
+@pytest.fixture
+def profile_path(tmp_path, monkeypatch):
+    path = tmp_path / "user_profile.json"
+    monkeypatch.setattr(UserProfile, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(UserProfile, "PROFILE_PATH", str(path))
+    path.write_text(json.dumps({"name": "Sam", "stats": {"total_sessions": 3}}))
+    return path
+
+
+class Sleepy(ContextProvider):
+    def __init__(self, name, delay, text):
+        self.name, self.delay, self.text = name, delay, text
+
+    def fetch(self, query):
+        time.sleep(self.delay)
+        return self.text
+
+
+class TestFileCache:
+    def test_profile_is_read_once_until_changed(self, profile_path, monkeypatch):
+        provider = ProfileProvider()
+        loads = []
+        real_load = provider._load
+        monkeypatch.setattr(provider, "_load", lambda: loads.append(1) or real_load())
+
+        assert provider.fetch("q") == "User's name is Sam."
+        assert provider.fetch("q") == "User's name is Sam."
+        assert len(loads) == 1
+
+        profile_path.write_text(json.dumps({"name": "Alexandra"}))
+        assert provider.fetch("q") == "User's name is Alexandra."
+        assert len(loads) == 2
+
+    def test_reading_context_does_not_count_sessions(self, profile_path):
+        ProfileProvider().fetch("q")
+        assert json.loads(profile_path.read_text())["stats"]["total_sessions"] == 3
+
+    def test_missing_file_is_cached_too(self, tmp_path):
+        class Missing(FileCachedProvider):
+            calls = 0
+
+            def paths(self):
+                return [str(tmp_path / "nope.json")]
+
+            def _load(self):
+                Missing.calls += 1
+                return ""
+
+        provider = Missing()
+        provider.fetch("q"), provider.fetch("q")
+        assert Missing.calls == 1
+
+
+class TestGatherer:
+    def test_sources_run_concurrently_in_order(self):
+        gatherer = ContextGatherer([Sleepy("a", 0.2, "A"), Sleepy("b", 0.2, "B"), Sleepy("c", 0.0, "")])
+        start = time.perf_counter()
+        assert gatherer.gather("q") == "A\nB"
+        assert time.perf_counter() - start < 0.35
+
+    def test_slow_source_is_skipped(self, monkeypatch):
+        monkeypatch.setitem(Config._data["llm"], "enrichment", {"timeout_ms": 100})
+        gatherer = ContextGatherer([Sleepy("fast", 0.0, "fast"), Sleepy("slow", 1.0, "slow")])
+        start = time.perf_counter()
+        assert gatherer.gather("q") == "fast"
+        assert time.perf_counter() - start < 0.5
+
+    def test_failing_source_is_skipped(self):
+        class Broken(ContextProvider):
+            def fetch(self, query):
+                raise RuntimeError("db down")
+
+        assert ContextGatherer([Broken(), Sleepy("ok", 0, "ok")]).gather("q") == "ok"
+
+
+class TestBrainEnrichment:
+    def test_knowledge_and_profile(self, profile_path):
+        class KB:
+            def search_memory(self, query, n_results=3):
+                return f"notes about {query}"
+
+        brain = Brain()
+        brain.knowledge_db = KB()
+        brain._enrich_context("the project deadline")
+        assert brain._current_context == "User's name is Sam.\n[KEY_MEMORY] notes about the project deadline"
+
+    def test_knowledge_misses_are_dropped(self):
+        class KB:
+            def search_memory(self, query, n_results=3):
+                return "No matching knowledge found."
+
+        brain = Brain(knowledge_db=KB())
+        assert KnowledgeProvider(brain).fetch("anything") == ""
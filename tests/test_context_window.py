@@ -0,0 +1,131 @@
+"""
+Tests for token-budgeted conversation history — counting, trimming and background summary folds.
+"""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.brain import Brain
+from tess_cli.core.config import Config
+from tess_cli.core.context_window import TokenCounter, context_limit
+
+
+@pytest.fixture(autouse=True)
+def context_settings(monkeypatch):
+    settings = {
+        "max_request_tokens": 2000,
+        "recent_tokens": 400,
+        "summary_tokens": 100,
+        "reserve_completion_tokens": 256
+    }
+    monkeypatch.setitem(Config._data["llm"], "context", settings)
+    return settings
+
+
+@pytest.fixture
+def brain():
+    b = Brain()
+    b.history = [{"role": "system", "content": "You are TESS."}]
+    b._enrich_context = lambda query: None
+    b._current_context = None
+    b.memory = None # Keep fold summaries out of the real memory file
+    return b
+
+
+def turn(role, words):
+    return {"role": role, "content": " ".join(["word"] * words)}
+
+
+class TestTokenCounter:
+    def test_model_limits(self):
+        assert context_limit("llama-3.3-70b-versatile") == 131072
+        assert context_limit("gpt-4o-mini") == 128000
+        assert context_limit("something-new") == 8192
+
+    def test_counts_grow_with_text(self):
+        counter = TokenCounter("gpt-4o")
+        assert counter.count("") == 0
+        assert counter.count("hello world " * 50) > counter.count("hello world")
+
+    def test_truncate_fits_and_keeps_ends(self):
+        counter = TokenCounter("llama-3.3")
+        text = "START " + "filler " * 2000 + " END"
+        clipped = counter.truncate(text, 100)
+        assert counter.count(clipped) <= 100
+        assert clipped.startswith("START") and clipped.endswith("END")
+
+
+class TestBuild:
+    def test_small_history_passes_through(self, brain):
+        brain.history += [turn("user", 5), turn("assistant", 5), turn("user", 5)]
+        assert brain.window.build() == brain.history
+
+    def test_hard_budget_drops_oldest_turns(self, brain):
+        for i in range(40):
+            brain.history.append(turn("user" if i % 2 == 0 else "assistant", 100))
+        messages = brain.window.build("profile facts")
+        counter = brain.window.counter
+        assert counter.count_messages(messages) <= brain.window.budget()
+        assert messages[0] == brain.history[0]
+        assert messages[-1] is brain.history[-1]
+        assert messages[-2]["content"].startswith("[CTX]")
+        assert len(messages) < len(brain.history)
+
+    def test_oversized_message_is_truncated(self, brain):
+        brain.history.append(turn("user", 20000))
+        messages = brain.window.build()
+        assert brain.window.counter.count_messages(messages) <= brain.window.budget()
+        assert "[...truncated...]" in messages[-1]["content"]
+        # History keeps the original
+        assert "[...truncated...]" not in brain.history[-1]["content"]
+
+
+class TestFold:
+    def test_old_turns_fold_into_summary(self, brain):
+        for i in range(20):
+            brain.history.append(turn("user" if i % 2 == 0 else "assistant", 60))
+        before = len(brain.history)
+
+        with patch.object(Brain, "request_completion", return_value="User likes tea.") as call:
+            brain.window.maybe_fold()
+            brain.window.wait(5)
+
+        assert not call.call_args.kwargs.get("use_cache")
+        assert brain.window.summary == "User likes tea."
+        assert len(brain.history) < before
+        turns = brain.history[1:]
+        assert brain.window.counter.count_messages(turns) <= Config._data["llm"]["context"]["recent_tokens"]
+
+        messages = brain.window.build()
+        assert messages[1] == {"role": "system", "content": "[SUMMARY]\nUser likes tea."}
+
+    def test_no_fold_under_threshold(self, brain):
+        brain.history += [turn("user", 10), turn("assistant", 10)]
+        with patch.object(Brain, "request_completion") as call:
+            brain.window.maybe_fold()
+            brain.window.wait(5)
+        call.assert_not_called()
+
+    def test_reset_history_discards_fold(self, brain):
+        for i in range(20):
+            brain.history.append(turn("user", 60))
+
+        def reset_midway(*args, **kwargs):
+            brain.history = [] # e.g. ProfileManager.reset_profile
+            return "stale"
+
+        with patch.object(Brain, "request_completion", side_effect=reset_midway):
+            brain.window.maybe_fold()
+            brain.window.wait(5)
+        assert brain.window.summary == ""
+
+    def test_generate_command_uses_window(self, brain):
+        with patch.object(Brain, "_call_api_with_retry", return_value='{"action": "reply_op", "content": "hi"}') as call:
+            brain.generate_command("hello")
+        sent = call.call_args.args[0]
+        assert sent[-1] == {"role": "user", "content": "hello"}
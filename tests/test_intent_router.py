@@ -0,0 +1,116 @@
+"""
+Tests for the local intent router — pattern rules, the schema classifier and the Brain fast path.
+"""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.brain import Brain
+from tess_cli.core.intent_router import IntentRouter, SchemaIntentClassifier
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter()
+
+
+class TestRules:
+    @pytest.mark.parametrize("query, expected", [
+        ("volume up", {"action": "system_control", "sub_action": "volume_up"}),
+        ("Hey Tess, turn the volume down please", {"action": "system_control", "sub_action": "volume_down"}),
+        ("pause youtube", {"action": "youtube_op", "sub_action": "pause"}),
+        ("pause", {"action": "system_control", "sub_action": "play_pause"}),
+        ("next song", {"action": "system_control", "sub_action": "media_next"}),
+        ("lock", {"action": "system_control", "sub_action": "lock"}),
+        ("take a screenshot", {"action": "system_control", "sub_action": "screenshot"}),
+        ("play lofi beats on youtube", {"action": "youtube_op", "sub_action": "play", "query": "lofi beats"}),
+        ("open calculator", {"action": "launch_app", "app_name": "calculator"}),
+        ("search for weather in paris", {"action": "web_search_op", "query": "weather in paris"}),
+    ])
+    def test_routes(self, router, query, expected):
+        cmd = router.route(query)
+        assert cmd is not None
+        assert {k: cmd[k] for k in expected} == expected
+        assert cmd["fast_path"] is True
+
+    def test_known_folder_is_expanded(self, router):
+        cmd = router.route("list files in Downloads")
+        assert cmd["action"] == "file_op" and cmd["sub_action"] == "list"
+        assert cmd["path"] == os.path.expanduser("~/Downloads")
+
+    def test_captures_keep_the_users_casing(self, router):
+        cmd = router.route(r"list files in C:\Users\Rohit\Documents\MyProject")
+        assert cmd["path"] == r"C:\Users\Rohit\Documents\MyProject"
+        assert router.route("Google best pizza in Rome")["query"] == "best pizza in Rome"
+
+    @pytest.mark.parametrize("query", [
+        "tell me a joke",
+        "shutdown",
+        "restart the computer",
+        "open report.pdf",
+        "what's in the news today",
+        "search my files for taxes",
+        "how do I lock a file in python",
+        "search for my files named report",
+        "google maps",
+        "open my email",
+        "open the pod bay doors",
+        "open it",
+        "open that",
+        "open this",
+        "open them",
+        "open one",
+        "open again",
+        "open both",
+        "launch it please",
+    ])
+    def test_defers_to_llm(self, router, query):
+        assert router.route(query) is None
+
+
+class TestClassifier:
+    def test_labels_come_from_schemas(self):
+        labels = {(a, s) for a, s, _, _ in SchemaIntentClassifier().labels}
+        assert ("system_control", "volume_up") in labels
+        assert ("youtube_op", "fullscreen") in labels
+        assert not any(s in ("shutdown", "restart") for _, s in labels)
+
+    def test_short_phrases(self, router):
+        assert router.route("vol up")["sub_action"] == "volume_up"
+        cmd = router.route("yt next")
+        assert (cmd["action"], cmd["sub_action"]) == ("youtube_op", "next")
+        assert cmd["confidence"] >= 0.8
+
+    def test_extra_words_lower_confidence(self):
+        (action, sub, score), _ = SchemaIntentClassifier().classify("youtube volume up about cats")
+        assert score < 0.8
+
+
+@pytest.fixture
+def brain():
+    b = Brain()
+    b.intent_router = IntentRouter()
+    b._enrich_context = lambda query: None
+    return b
+
+
+class TestBrainFastPath:
+    def test_skips_llm(self, brain):
+        with patch.object(Brain, "_call_api_with_retry") as call:
+            cmd = brain.generate_command("mute")
+        call.assert_not_called()
+        assert cmd["action"] == "system_control" and cmd["fast_path"]
+        # Recorded without the routing flags
+        assert brain.history[-2]["content"] == "mute"
+        assert "fast_path" not in brain.history[-1]["content"]
+
+    def test_falls_back_to_llm(self, brain):
+        with patch.object(Brain, "_call_api_with_retry", return_value='{"action": "reply_op", "content": "Hi"}') as call:
+            cmd = brain.generate_command("how are you today?")
+        call.assert_called_once()
+        assert "fast_path" not in cmd
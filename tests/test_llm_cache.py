@@ -0,0 +1,106 @@
+"""
+Tests for the persistent LLM response cache and its use in Brain.request_completion.
+"""
+
+import os
+import sys
+import time
+import pytest
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.llm_cache import ResponseCache
+from tess_cli.core.brain import Brain
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = ResponseCache(path=str(tmp_path / "cache.db"), max_entries=3, ttl_seconds=60)
+    yield c
+    c.close()
+
+
+MESSAGES = [{"role": "user", "content": "Rate this command: dir"}]
+
+
+class TestResponseCache:
+    def test_roundtrip_and_counters(self, cache):
+        key = cache.make_key("groq", "llama", 0.7, MESSAGES, False)
+        assert cache.get(key) is None
+        cache.put(key, "SAFE")
+        assert cache.get(key) == "SAFE"
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_key_normalises_line_endings_and_outer_whitespace(self, cache):
+        a = cache.make_key("groq", "llama", 0.7, [{"role": "user", "content": "Rate this\r\ncommand"}], False)
+        b = cache.make_key("groq", "llama", 0.7, [{"role": "user", "content": "  Rate this\ncommand\n"}], False)
+        assert a == b
+
+    def test_key_keeps_indentation_and_newlines(self, cache):
+        nested = "Fix this:\nif ok:\n    run()\nstop()"
+        flat = "Fix this:\nif ok:\n    run()\n    stop()"
+        assert cache.make_key("groq", "llama", 0, [{"role": "user", "content": nested}], False) != \
+            cache.make_key("groq", "llama", 0, [{"role": "user", "content": flat}], False)
+        assert cache.make_key("groq", "llama", 0, [{"role": "user", "content": "a  b"}], False) != \
+            cache.make_key("groq", "llama", 0, [{"role": "user", "content": "a b"}], False)
+
+    def test_key_depends_on_request_shape(self, cache):
+        base = cache.make_key("groq", "llama", 0.7, MESSAGES, False)
+        assert base != cache.make_key("openai", "llama", 0.7, MESSAGES, False)
+        assert base != cache.make_key("groq", "other", 0.7, MESSAGES, False)
+        assert base != cache.make_key("groq", "llama", 0.2, MESSAGES, False)
+        assert base != cache.make_key("groq", "llama", 0.7, MESSAGES, True)
+
+    def test_ttl_expiry(self, cache):
+        cache.put("k", "old")
+        cache.ttl_seconds = 0
+        time.sleep(0.01)
+        assert cache.get("k") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_lru_bound(self, cache):
+        for i in range(5):
+            cache.put(f"k{i}", f"v{i}")
+            time.sleep(0.002)
+        cache.get("k0")  # Touch the oldest so it survives
+        cache._evict(time.time())
+        assert cache.stats()["entries"] == 3
+        assert cache.get("k0") == "v0"
+        assert cache.get("k1") is None
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "persist.db")
+        first = ResponseCache(path=path)
+        first.put("k", "v")
+        first.close()
+        second = ResponseCache(path=path)
+        assert second.get("k") == "v"
+        second.close()
+
+
+class TestBrainCaching:
+    def test_repeat_request_skips_api(self, cache):
+        brain = Brain(response_cache=cache)
+        with patch.object(Brain, "_call_api_with_retry", return_value="SAFE") as api:
+            assert brain.request_completion(MESSAGES, temperature=0, use_cache=True) == "SAFE"
+            assert brain.request_completion(MESSAGES, temperature=0, use_cache=True) == "SAFE"
+        assert api.call_count == 1
+
+    def test_uncached_by_default(self, cache):
+        brain = Brain(response_cache=cache)
+        with patch.object(Brain, "_call_api_with_retry", return_value="hi") as api:
+            brain.request_completion(MESSAGES)
+            brain.think("Write me a poem")
+            brain.think("Write me a poem")
+        assert api.call_count == 3
+        assert cache.stats()["entries"] == 0
+
+    def test_failures_are_not_cached(self, cache):
+        brain = Brain(response_cache=cache)
+        with patch.object(Brain, "_call_api_with_retry", return_value=None):
+            assert brain.request_completion(MESSAGES, use_cache=True) is None
+        assert cache.stats()["entries"] == 0
@@ -0,0 +1,113 @@
+"""
+Tests for the shared per-key rate limiter — key selection, cooldowns and retry-after parsing.
+"""
+
+import os
+import sys
+import time
+import pytest
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.config import Config
+from tess_cli.core.llm_limiter import KeyLimiter, parse_duration, retry_after
+
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.setitem(Config._data["llm"]["keys"], "groq", ["k0", "k1", "k2"])
+    monkeypatch.setitem(Config._data["llm"], "limits", {"groq": {"rpm": 2, "tpm": 1000}})
+
+
+class TestRetryAfter:
+    @pytest.mark.parametrize("text, seconds", [
+        ("7.66s", 7.66),
+        ("2m59.5s", 179.5),
+        ("120ms", 0.12),
+        ("3", 3.0),
+        ("soon", None),
+    ])
+    def test_parse_duration(self, text, seconds):
+        result = parse_duration(text)
+        assert result == pytest.approx(seconds) if seconds is not None else result is None
+
+    def test_header_wins(self):
+        error = Exception("429")
+        error.response = SimpleNamespace(headers={"retry-after": "4"})
+        assert retry_after(error) == 4.0
+
+    def test_message_hint(self):
+        error = Exception("Rate limit reached for model. Please try again in 7.66s. Visit ...")
+        assert retry_after(error) == pytest.approx(7.66)
+
+    def test_no_hint(self):
+        assert retry_after(Exception("Error code: 429")) is None
+
+
+class TestKeyLimiter:
+    def test_spreads_requests_over_keys(self):
+        limiter = KeyLimiter()
+        picked = [limiter.acquire("groq", 10)[0] for _ in range(3)]
+        assert sorted(picked) == [0, 1, 2]
+
+    def test_cooling_key_is_skipped_without_waiting(self):
+        limiter = KeyLimiter()
+        limiter.penalize("groq", 0, 30)
+        for _ in range(4):
+            index, wait = limiter.acquire("groq", 10)
+            assert index != 0 and wait == 0
+
+    def test_waits_only_when_every_key_is_exhausted(self):
+        limiter = KeyLimiter()
+        for index in range(3):
+            limiter.penalize("groq", index, 5)
+        index, wait = limiter.acquire("groq", 10)
+        assert 4 < wait <= 5
+
+    def test_max_wait_does_not_reserve(self):
+        limiter = KeyLimiter()
+        for index in range(3):
+            limiter.penalize("groq", index, 5)
+        _, wait = limiter.acquire("groq", 10, max_wait=0)
+        assert wait > 0
+        assert all(s["used"] == 0 for s in limiter.stats())
+
+    def test_token_budget_counts(self):
+        limiter = KeyLimiter()
+        index, _ = limiter.acquire("groq", 100)
+        limiter.record_usage("groq", index, actual=900, reserved=100)
+        # That key is now out of tokens, so the next big request goes elsewhere
+        other, wait = limiter.acquire("groq", 500)
+        assert other != index and wait == 0
+
+    def test_backoff_without_hint_grows(self):
+        limiter = KeyLimiter()
+        limiter.penalize("groq", 0)
+        first = limiter.stats()[0]["cooldown"]
+        limiter.penalize("groq", 0)
+        limiter.penalize("groq", 0)
+        assert limiter.stats()[0]["cooldown"] > first
+
+    def test_requests_refill_over_time(self, monkeypatch):
+        limiter = KeyLimiter()
+        monkeypatch.setitem(Config._data["llm"]["keys"], "groq", ["only"])
+        now = [1000.0]
+        monkeypatch.setattr(time, "time", lambda: now[0])
+        limiter.acquire("groq")
+        limiter.acquire("groq")
+        _, wait = limiter.acquire("groq", max_wait=0)
+        assert wait == pytest.approx(30.0) # rpm=2 -> one request every 30s
+        now[0] += 30
+        assert limiter.acquire("groq", max_wait=0)[1] == 0
+
+    def test_unconfigured_providers_are_not_throttled(self, monkeypatch):
+        monkeypatch.setitem(Config._data["llm"]["keys"], "openai", ["paid"])
+        limiter = KeyLimiter()
+        assert limiter.limits("openai") == (None, None)
+        waits = [limiter.acquire("openai", 50000)[1] for _ in range(500)]
+        assert max(waits) == 0
+        # 429s still cool the key down
+        limiter.penalize("openai", 0, 5)
+        assert limiter.acquire("openai", 10)[1] > 4
@@ -0,0 +1,123 @@
+"""
+Tests for the shared LLM client pool — reuse, key changes, health eviction and shutdown.
+"""
+
+import asyncio
+import os
+import sys
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.llm_pool import LLMClientPool
+
+
+class FakeClient:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool():
+    built = []
+
+    def factory(provider, model, api_key):
+        client = FakeClient(api_key)
+        built.append(client)
+        return client, None
+
+    p = LLMClientPool(factory=factory, max_failures=2)
+    p.built = built
+    return p
+
+
+class TestClientPool:
+    def test_client_is_reused(self, pool):
+        a, _ = pool.get("groq", "llama", "key-a", key_index=0)
+        b, _ = pool.get("groq", "llama", "key-a", key_index=0)
+        assert a is b
+        assert len(pool.built) == 1
+
+    def test_slots_are_per_key_and_provider(self, pool):
+        a, _ = pool.get("groq", "llama", "key-a", key_index=0)
+        b, _ = pool.get("groq", "llama", "key-b", key_index=1)
+        c, _ = pool.get("openai", "gpt", "key-a", key_index=0)
+        assert len({id(a), id(b), id(c)}) == 3
+
+    def test_changed_key_rebuilds_client(self, pool):
+        old, _ = pool.get("groq", "llama", "key-a", key_index=0)
+        new, _ = pool.get("groq", "llama", "key-new", key_index=0)
+        assert old is not new
+        assert old.closed
+
+    def test_missing_key(self, pool):
+        client, err = pool.get("groq", "llama", None)
+        assert client is None
+        assert "Missing API Key" in err
+
+    def test_rate_limits_do_not_evict(self, pool):
+        client, _ = pool.get("groq", "llama", "key-a")
+        for _ in range(5):
+            pool.report_failure("groq", 0, Exception("Error code: 429 - rate limit"))
+        again, _ = pool.get("groq", "llama", "key-a")
+        assert again is client
+
+    def test_repeated_failures_evict(self, pool):
+        client, _ = pool.get("groq", "llama", "key-a")
+        pool.report_failure("groq", 0, ConnectionError("reset by peer"))
+        assert pool.stats()[0]["healthy"] is False
+        pool.report_failure("groq", 0, ConnectionError("reset by peer"))
+        assert client.closed
+        fresh, _ = pool.get("groq", "llama", "key-a")
+        assert fresh is not client
+
+    def test_success_resets_health(self, pool):
+        pool.get("groq", "llama", "key-a")
+        pool.report_failure("groq", 0, ConnectionError("timeout"))
+        pool.report_success("groq", 0)
+        assert pool.stats()[0]["healthy"] is True
+
+    def test_close_releases_everything(self, pool):
+        a, _ = pool.get("groq", "llama", "key-a")
+        b, _ = pool.get("openai", "gpt", "key-b")
+        pool.close()
+        assert a.closed and b.closed
+        assert pool.stats() == []
+        # Still usable after close
+        c, _ = pool.get("groq", "llama", "key-a")
+        assert c is not a
+
+    def test_loop_shutdown_keeps_the_shared_pool(self):
+        built = []
+
+        class FakeAsyncClient(FakeClient):
+            async def close(self):
+                self.closed = True
+
+        def async_factory(provider, model, api_key):
+            built.append(FakeAsyncClient(api_key))
+            return built[-1], None
+
+        pool = LLMClientPool(factory=lambda p, m, k: (FakeClient(k), None), async_factory=async_factory)
+        sync, _ = pool.get("groq", "llama", "key-a")
+
+        async def elsewhere():
+            pool.get_async("groq", "llama", "key-a")
+
+        async def bot_lifetime():
+            pool.get_async("groq", "llama", "key-a")
+            await pool.aclose_loop()
+
+        other_loop = asyncio.new_event_loop()  # Kept alive, so the bot's loop can't reuse its id
+        other_loop.run_until_complete(elsewhere())
+        asyncio.run(bot_lifetime())
+        other_loop.close()
+        other, bot = built
+        assert bot.closed and not other.closed
+        assert not sync.closed
+        assert pool.get("groq", "llama", "key-a")[0] is sync
@@ -0,0 +1,147 @@
+"""
+Tests for provider routing — cooldowns, failover and hedged requests.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.config import Config
+from tess_cli.core.llm_router import ProviderRouter
+
+
+@pytest.fixture(autouse=True)
+def routing(monkeypatch):
+    monkeypatch.setitem(Config._data["llm"]["keys"], "groq", ["gsk-test"])
+    monkeypatch.setitem(Config._data["llm"]["keys"], "openai", ["sk-test"])
+    monkeypatch.setitem(Config._data["llm"]["keys"], "deepseek", [])
+    monkeypatch.setitem(Config._data["llm"]["keys"], "gemini", [])
+    settings = {
+        "mode": "failover",
+        "hedge_after_ms": 50,
+        "cooldown_seconds": 60,
+        "failure_threshold": 2,
+        "models": {"groq": "llama", "openai": "gpt"}
+    }
+    monkeypatch.setitem(Config._data["llm"], "routing", settings)
+    return settings
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class TestProviderRouter:
+    def test_single_mode_only_uses_primary(self, routing):
+        routing["mode"] = "single"
+        assert ProviderRouter().candidates("groq", "llama") == [("groq", "llama")]
+
+    def test_candidates_need_keys(self):
+        assert ProviderRouter().candidates("groq", "llama") == [("groq", "llama"), ("openai", "gpt")]
+
+    def test_rate_limits_are_left_to_the_limiter(self):
+        router = ProviderRouter()
+        for _ in range(5):
+            router.report_failure("groq", Exception("Error code: 429"))
+        assert router.is_available("groq")
+
+    def test_bench_skips_provider(self):
+        router = ProviderRouter()
+        router.bench("groq")
+        assert router.candidates("groq", "llama") == [("openai", "gpt")]
+        assert "groq" in router.status()
+
+    def test_repeated_failures_bench(self):
+        router = ProviderRouter()
+        router.report_failure("openai", ConnectionError("reset"))
+        assert router.is_available("openai")
+        router.report_failure("openai", ConnectionError("reset"))
+        assert not router.is_available("openai")
+
+    def test_all_benched_falls_back_to_primary(self):
+        router = ProviderRouter()
+        router.bench("groq")
+        router.bench("openai")
+        assert router.candidates("groq", "llama") == [("groq", "llama")]
+
+
+class TestFailover:
+    def test_rate_limit_fails_over_without_sleeping(self, make_brain, monkeypatch):
+        monkeypatch.setattr(time, "sleep", lambda s: pytest.fail("should not back off"))
+        brain, clients = make_brain({"groq": [Exception("Error code: 429")], "openai": ["from openai"]}, model="llama")
+        assert brain.request_completion(MESSAGES) == "from openai"
+        # Next request skips the cooling provider without calling it
+        clients["openai"].outcomes.append("again")
+        assert brain.request_completion(MESSAGES) == "again"
+        assert len(clients["groq"].calls) == 1
+
+    def test_hard_error_fails_over(self, make_brain):
+        brain, _ = make_brain({"groq": [ValueError("boom")], "openai": ["ok"]}, model="llama")
+        assert brain.request_completion(MESSAGES) == "ok"
+
+    def test_server_error_is_retried_with_backoff(self, make_brain, routing, monkeypatch):
+        routing["mode"] = "single"
+        sleeps = []
+        monkeypatch.setattr(time, "sleep", sleeps.append)
+        brain, clients = make_brain({"groq": [Exception("Error code: 500 - Internal Server Error"), "ok"]}, model="llama")
+        assert brain.request_completion(MESSAGES) == "ok"
+        assert len(clients["groq"].calls) == 2
+        assert len(sleeps) == 1 and 1 <= sleeps[0] < 2
+
+    def test_server_error_fails_over_instead_of_backing_off(self, make_brain, monkeypatch):
+        monkeypatch.setattr(time, "sleep", lambda s: pytest.fail("should not back off"))
+        brain, clients = make_brain({"groq": [Exception("Error code: 500")], "openai": ["from openai"]}, model="llama")
+        assert brain.request_completion(MESSAGES) == "from openai"
+        assert len(clients["groq"].calls) == 1
+
+    def test_async_server_error_is_retried(self, make_brain, routing, monkeypatch):
+        routing["mode"] = "single"
+        sleeps = []
+
+        async def no_sleep(delay):
+            sleeps.append(delay)
+        monkeypatch.setattr(asyncio, "sleep", no_sleep)
+        brain, clients = make_brain({"groq": [Exception("Error code: 503 - Service Unavailable"), "ok"]}, asynchronous=True, model="llama")
+        assert asyncio.run(brain.arequest_completion(MESSAGES)) == "ok"
+        assert len(clients["groq"].calls) == 2
+        assert max(sleeps) >= 1
+
+    def test_async_failover(self, make_brain):
+        brain, _ = make_brain({"groq": [Exception("Error code: 429")], "openai": ["async ok"]}, asynchronous=True, model="llama")
+        assert asyncio.run(brain.arequest_completion(MESSAGES)) == "async ok"
+
+
+class TestHedging:
+    def test_slow_primary_is_hedged(self, routing, make_brain):
+        routing["mode"] = "hedged"
+        brain, clients = make_brain({"groq": [(0.5, "slow")], "openai": ["fast"]}, model="llama")
+        start = time.time()
+        assert brain.request_completion(MESSAGES) == "fast"
+        assert time.time() - start < 0.4
+
+    def test_fast_primary_is_not_hedged(self, routing, make_brain):
+        routing["mode"] = "hedged"
+        brain, clients = make_brain({"groq": ["quick"], "openai": ["unused"]}, model="llama")
+        assert brain.request_completion(MESSAGES) == "quick"
+        assert clients["openai"].calls == []
+
+    def test_async_loser_is_cancelled(self, routing, make_brain):
+        routing["mode"] = "hedged"
+        brain, clients = make_brain({"groq": [(5, "slow")], "openai": ["fast"]}, asynchronous=True, model="llama")
+
+        async def run():
+            result = await brain.arequest_completion(MESSAGES)
+            # Anything still running besides us would be the un-cancelled loser
+            await asyncio.sleep(0)
+            others = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            return result, others
+
+        start = time.time()
+        result, others = asyncio.run(run())
+        assert result == "fast"
+        assert others == []
+        assert time.time() - start < 1
@@ -0,0 +1,385 @@
+"""
+Tests for MemoryEngine storage and retrieval — journal appends, crash recovery, compaction and BM25 recall.
+"""
+
+import json
+import os
+import sys
+import time
+import pytest
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.config import Config
+from tess_cli.core.memory_engine import MemoryEngine, MemoryJournal
+from tess_cli.core.memory_index import BM25Index
+
+
+@pytest.fixture
+def tess_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TESS_DIR", str(tmp_path))
+    monkeypatch.setitem(Config._data, "memory", {"fsync_interval_ms": 50, "compact_after": 1000})
+    return tmp_path
+
+
+def reopen(engine):
+    """A fresh engine over the same files, as after a restart."""
+    engine.store.journal.close()
+    with MemoryJournal._instances_lock:
+        MemoryJournal._instances.pop(os.path.abspath(engine.store.memory_file), None)
+    return MemoryEngine(engine.user_id)
+
+
+class TestJournal:
+    def test_store_appends_instead_of_rewriting(self, tess_dir):
+        engine = MemoryEngine("alice")
+        engine.store_memory("likes tea")
+        engine.store_memory("works at night", {"type": "fact"})
+
+        assert json.load(open(engine.store.memory_file)) == []
+        lines = open(engine.store.journal.path).read().splitlines()
+        assert [json.loads(l)["entry"]["text"] for l in lines] == ["likes tea", "works at night"]
+
+        restored = reopen(engine)
+        assert [m["text"] for m in restored.memories] == ["likes tea", "works at night"]
+        assert restored.memories[1]["metadata"] == {"type": "fact"}
+
+    def test_ids_are_unique(self, tess_dir):
+        engine = MemoryEngine("bob")
+        ids = [engine.store_memory(f"fact {i}") for i in range(50)]
+        assert len(set(ids)) == 50
+        assert len(reopen(engine).memories) == 50
+
+    def test_legacy_snapshot_still_loads(self, tess_dir):
+        os.makedirs(tess_dir / "tess_memory")
+        legacy = [{"id": "1", "timestamp": "t", "text": "old memory", "metadata": {}}]
+        (tess_dir / "tess_memory" / "carol_memory.json").write_text(json.dumps(legacy, indent=2))
+        engine = MemoryEngine("carol")
+        engine.store_memory("new memory")
+        assert [m["text"] for m in reopen(engine).memories] == ["old memory", "new memory"]
+
+
+class TestRecovery:
+    def test_torn_tail_is_dropped(self, tess_dir):
+        engine = MemoryEngine("dave")
+        engine.store_memory("kept")
+        engine.store.journal.close()
+        with open(engine.store.journal.path, "ab") as f:
+            f.write(b'{"op": "add", "entry": {"id": "9", "te')  # Crash mid-write
+
+        restored = reopen(engine)
+        assert [m["text"] for m in restored.memories] == ["kept"]
+        restored.store_memory("after crash")
+        assert [m["text"] for m in reopen(restored).memories] == ["kept", "after crash"]
+
+    def test_crash_between_snapshot_and_journal_cut(self, tess_dir):
+        engine = MemoryEngine("erin")
+        engine.store_memory("one")
+        engine.store_memory("two")
+        engine.store.journal.close()
+        # Snapshot already holds both, journal was never cut
+        snapshot = [json.loads(l)["entry"] for l in open(engine.store.journal.path)]
+        json.dump(snapshot, open(engine.store.memory_file, "w"))
+        assert [m["text"] for m in reopen(engine).memories] == ["one", "two"]
+
+
+class TestCompaction:
+    def test_compact_folds_journal_into_snapshot(self, tess_dir):
+        engine = MemoryEngine("frank")
+        for i in range(5):
+            engine.store_memory(f"fact {i}")
+        engine.store.journal.compact()
+
+        assert len(json.load(open(engine.store.memory_file))) == 5
+        assert os.path.getsize(engine.store.journal.path) == 0
+        engine.store_memory("fact 5")
+        assert len(reopen(engine).memories) == 6
+
+    def test_compaction_triggers_after_threshold(self, tess_dir):
+        Config._data["memory"]["compact_after"] = 10
+        engine = MemoryEngine("gina")
+        for i in range(25):
+            engine.store_memory(f"fact {i}")
+        engine.store.journal._compactor.join(5)
+        engine.store.journal.compact()
+        assert len(json.load(open(engine.store.memory_file))) == 25
+        assert [m["text"] for m in reopen(engine).memories] == [f"fact {i}" for i in range(25)]
+
+    def test_engines_sharing_a_file_keep_each_others_writes(self, tess_dir):
+        a, b = MemoryEngine("hal"), MemoryEngine("hal")
+        assert a.store.journal is b.store.journal
+        a.store_memory("from a")
+        b.store_memory("from b")
+        a.store.journal.compact()
+        assert {m["text"] for m in reopen(a).memories} == {"from a", "from b"}
+
+    def test_failed_journal_cut_is_rolled_back(self, tess_dir):
+        engine = MemoryEngine("ivy")
+        engine.store_memory("remember the milk")
+        engine.retrieve_context("milk")
+        journal = engine.store.journal
+        snapshot_before = open(engine.store.memory_file).read()
+        generation = journal._generation()
+
+        real_replace = os.replace
+        def replace(src, dst):
+            if dst == journal.path:
+                raise PermissionError("journal is open in another process")
+            real_replace(src, dst)
+
+        with patch("os.replace", side_effect=replace):
+            journal.compact()
+
+        assert journal._generation() == generation
+        assert open(engine.store.memory_file).read() == snapshot_before
+        assert not [f for f in os.listdir(os.path.dirname(journal.path)) if f.endswith((".tmp", ".bak"))]
+        restored = reopen(engine)
+        assert restored.memories[0]["access_count"] == 1  # Not replayed twice
+
+        restored.store.journal.compact()
+        assert os.path.getsize(restored.store.journal.path) == 0
+        assert reopen(restored).memories[0]["access_count"] == 1
+
+    def test_compactor_thread_logs_failures(self, tess_dir):
+        engine = MemoryEngine("jay")
+        engine.store_memory("something")
+        journal = engine.store.journal
+        with patch.object(MemoryJournal, "compact", side_effect=OSError("disk full")), \
+                patch("tess_cli.core.memory_engine.logger") as log:
+            journal.compact_async()
+            journal._compactor.join(5)
+        assert "disk full" in log.error.call_args[0][0]
+
+
+class TestBM25:
+    def test_ranks_rare_terms_higher(self):
+        index = BM25Index()
+        for i, text in enumerate(["the cat sat", "the dog ran", "the cat and the dog", "quantum physics homework"]):
+            index.add(str(i), text)
+        # Shorter document wins on equal term frequency
+        assert [doc for _, doc, _ in index.search("cat", 5)] == ["0", "2"]
+        assert index.search("quantum the", 1)[0][1] == "3"
+        assert index.search("nothing matches", 3) == []
+
+    def test_punctuation_and_case_are_ignored(self):
+        index = BM25Index()
+        index.add("1", "My favorite color is Neon Blue.")
+        assert index.search("favorite COLOR?", 1)[0][1] == "1"
+
+    def test_limit_and_tie_break(self):
+        index = BM25Index()
+        for i in range(10):
+            index.add(str(i), "same words")
+        assert [doc for _, doc, _ in index.search("same", 3)] == ["9", "8", "7"]
+
+
+class TestRetrieval:
+    def test_retrieve_context(self, tess_dir):
+        engine = MemoryEngine("ivy")
+        engine.store_memory("My favorite color is Neon Blue.")
+        engine.store_memory("The meeting moved to Thursday.")
+        assert engine.retrieve_context("favorite color", limit=1) == ["My favorite color is Neon Blue."]
+        assert engine.retrieve_context("unrelated", limit=3) == []
+
+    def test_saved_index_is_reused_and_extended(self, tess_dir):
+        engine = MemoryEngine("jay")
+        for i in range(20):
+            engine.store_memory(f"note {i} about topic{i}")
+        engine.store.index.save()
+        engine.store_memory("late note about gardening")
+
+        with patch.object(BM25Index, "add", autospec=True, side_effect=BM25Index.add) as add:
+            restored = reopen(engine)
+        assert add.call_count == 1  # Only the memory stored after the save
+        assert restored.retrieve_context("gardening", 1) == ["late note about gardening"]
+        assert restored.retrieve_context("topic7", 1) == ["note 7 about topic7"]
+
+    def test_stale_index_is_rebuilt(self, tess_dir):
+        engine = MemoryEngine("kim")
+        engine.store_memory("alpha")
+        engine.store.index.save()
+        with open(engine.store.index.path, "w") as f:
+            json.dump({"version": 1, "ids": ["bogus"], "doc_len": [1], "postings": {}}, f)
+        assert reopen(engine).retrieve_context("alpha", 1) == ["alpha"]
+
+    def test_recall_stays_fast(self, tess_dir):
+        engine = MemoryEngine("lee")
+        for i in range(20000):
+            engine.store.index.add(str(i), f"memory number {i} about subject{i % 500} and more filler words")
+        # The first recall starts a background save of the seeded index; keep it out of the timing
+        engine.retrieve_context("subject42", limit=3)
+        if engine.store._index_saver is not None:
+            engine.store._index_saver.join()
+        start = time.perf_counter()
+        for _ in range(20):
+            assert len(engine.retrieve_context("subject42", limit=3)) == 3
+        assert (time.perf_counter() - start) / 20 < 0.005
+
+
+@pytest.fixture
+def sqlite_backend(tess_dir):
+    Config._data["memory"]["backend"] = "sqlite"
+    return tess_dir
+
+
+class TestSqliteBackend:
+    def test_store_and_search(self, sqlite_backend):
+        engine = MemoryEngine("mia")
+        assert engine.store.name == "sqlite"
+        engine.store_memory("My favorite color is Neon Blue.", {"type": "explicit_fact"})
+        engine.store_memory("The meeting moved to Thursday.")
+        assert engine.retrieve_context("favorite color?", limit=1) == ["My favorite color is Neon Blue."]
+        assert engine.retrieve_context("unrelated", limit=3) == []
+        assert engine.count() == 2
+
+        row = engine.store.db.execute("SELECT user, type FROM memories ORDER BY seq LIMIT 1")[0]
+        assert row == ("mia", "explicit_fact")
+        mode = engine.store.db.execute("PRAGMA journal_mode")[0][0]
+        assert mode == "wal"
+
+    def test_users_are_isolated(self, sqlite_backend):
+        MemoryEngine("ned").store_memory("ned likes chess")
+        other = MemoryEngine("olga")
+        assert other.retrieve_context("chess") == []
+        assert other.count() == 0
+
+    def test_query_syntax_is_escaped(self, sqlite_backend):
+        engine = MemoryEngine("pat")
+        engine.store_memory("deploy with NOT and OR in the name")
+        assert engine.retrieve_context('"NOT" OR (deploy* AND', 1) == ["deploy with NOT and OR in the name"]
+        assert engine.retrieve_context("?!", 1) == []
+
+    def test_migrates_json_memories_once(self, tess_dir):
+        legacy = MemoryEngine("quinn")
+        legacy.store_memory("old json memory")
+        legacy.store.journal.flush()
+
+        Config._data["memory"]["backend"] = "sqlite"
+        engine = MemoryEngine("quinn")
+        assert [m["text"] for m in engine.memories] == ["old json memory"]
+        engine.store_memory("new sqlite memory")
+        # Re-opening does not import the JSON file again
+        assert MemoryEngine("quinn").count() == 2
+        assert int(engine.memories[1]["id"]) > int(engine.memories[0]["id"])
+
+    def test_unknown_backend_falls_back_to_json(self, tess_dir):
+        Config._data["memory"]["backend"] = "leveldb"
+        assert MemoryEngine("rae").store.name == "json"
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def capped(tess_dir, request):
+    Config._data["memory"].update({"backend": request.param, "max_entries_per_user": 10, "evict_to": 0.5,
+                                   "half_life_days": 30})
+    return tess_dir
+
+
+class TestLifecycle:
+    def test_heat_prefers_recent_and_recalled(self):
+        from tess_cli.core.memory_lifecycle import MemoryLifecycle
+        lifecycle, now = MemoryLifecycle(), time.time()
+        day = 86400
+        fresh = {"timestamp": "2100-01-01T00:00:00", "metadata": {}}
+        old = {"timestamp": "2000-01-01T00:00:00", "metadata": {}}
+        recalled = {**old, "access_count": 5, "last_access": now - day}
+        assert lifecycle.heat(recalled, now) > lifecycle.heat(old, now)
+        assert lifecycle.heat({**old, "last_access": now}, now) > lifecycle.heat({**old, "last_access": now - 60 * day}, now)
+        assert lifecycle.heat({**old, "metadata": {"type": "explicit_fact"}}, now) == float("inf")
+        assert lifecycle.heat(fresh, now) >= lifecycle.heat(old, now)
+
+    def test_cap_evicts_cold_to_archive(self, capped):
+        engine = MemoryEngine("sam")
+        engine.store_memory("user wants the blue theme", {"type": "explicit_fact"})
+        for i in range(8):
+            engine.store_memory(f"Context: summary number {i}")
+        # Recalled memories stay hot
+        assert engine.retrieve_context("summary number 1", 1) == ["Context: summary number 1"]
+        engine.store_memory("latest a")
+        engine.store_memory("latest b")  # 11 > cap of 10, back down to 5
+
+        hot = [m["text"] for m in engine.memories]
+        assert hot == ["user wants the blue theme", "Context: summary number 1", "Context: summary number 7",
+                       "latest a", "latest b"]
+        assert engine.archive.count() == 6
+
+        assert set(engine.retrieve_context("summary number 3", 2)) == {"Context: summary number 1", "Context: summary number 7"}
+        found = engine.retrieve_context("summary number 3", 3, include_archive=True)
+        assert found[-1] == "Context: summary number 3"
+
+    def test_access_counts_survive_restart(self, tess_dir):
+        engine = MemoryEngine("tia")
+        engine.store_memory("remember the milk")
+        engine.retrieve_context("milk")
+        engine.retrieve_context("milk")
+        assert reopen(engine).memories[0]["access_count"] == 2
+
+    def test_evictions_survive_restart_and_compaction(self, tess_dir):
+        Config._data["memory"].update({"max_entries_per_user": 4, "evict_to": 0.5})
+        engine = MemoryEngine("uma")
+        for i in range(5):
+            engine.store_memory(f"note {i}")
+        kept = [m["text"] for m in engine.memories]
+        assert len(kept) == 2
+        engine.store.journal.compact()
+        restored = reopen(engine)
+        assert [m["text"] for m in restored.memories] == kept
+        assert restored.retrieve_context("note", 5) and len(restored.retrieve_context("note", 5)) == 2
+
+
+LONG_FACT = ("The user is building a home automation dashboard in React with a Python FastAPI "
+             "backend and deploys it on a Raspberry Pi every Friday evening")
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(tess_dir, request):
+    Config._data["memory"]["backend"] = request.param
+    return tess_dir
+
+
+class TestDedup:
+    def test_exact_repeat_refreshes_instead_of_adding(self, backend):
+        engine = MemoryEngine("vic")
+        first = engine.store_memory("Remember: I like green tea.")
+        assert engine.store_memory("remember i like GREEN tea") == first
+        assert engine.count() == 1
+        assert engine.memories[0]["access_count"] == 1
+        assert engine.store_memory("remember I like black tea") != first
+
+    def test_near_duplicate_is_merged(self, backend):
+        engine = MemoryEngine("wes")
+        first = engine.store_memory(LONG_FACT)
+        assert engine.store_memory(LONG_FACT.replace(" evening", "")) == first
+        engine.store_memory("The user is building a home automation dashboard in Vue with a Go backend "
+                            "and deploys it on a server every Monday morning")
+        assert engine.count() == 2
+        assert engine.dedup_stats() == "1 of 3 writes deduplicated (0 exact, 1 near, 0.1 KB saved)"
+
+    def test_explicit_fact_replaces_automatic_copy(self, backend):
+        engine = MemoryEngine("xan")
+        engine.store_memory("user prefers dark mode")
+        pinned = engine.pin("User prefers dark mode!")
+        assert [m["id"] for m in engine.memories] == [pinned]
+        assert engine.store_memory("user prefers dark mode") == pinned
+
+    def test_index_is_rebuilt_from_stored_memories(self, tess_dir):
+        engine = MemoryEngine("yas")
+        first = engine.store_memory(LONG_FACT)
+        assert reopen(engine).store_memory(LONG_FACT) == first
+
+    def test_evicted_memories_leave_the_index(self, tess_dir):
+        Config._data["memory"].update({"max_entries_per_user": 2, "evict_to": 0.5})
+        engine = MemoryEngine("zed")
+        for i in range(3):
+            engine.store_memory(f"note {i}")
+        assert len(engine.dedup_index()) == engine.count() == 1
+        engine.store_memory("note 0")
+        assert engine.count() == 2
+
+    def test_can_be_disabled(self, tess_dir):
+        Config._data["memory"]["dedup"] = False
+        engine = MemoryEngine("ada")
+        engine.store_memory("same thing")
+        engine.store_memory("same thing")
+        assert engine.count() == 2
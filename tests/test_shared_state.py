@@ -0,0 +1,138 @@
+"""
+Tests for state shared between TESS processes — file locks, merged profile saves,
+memory journals followed across processes, and skills taught elsewhere.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.config import Config
+from tess_cli.core.memory_engine import MemoryEngine
+from tess_cli.core.shared_state import merge_changes
+from tess_cli.core.skill_manager import SkillManager
+from tess_cli.core.user_profile import UserProfile
+
+
+def run_processes(n, script, tmp_path):
+    """Starts n Python processes running script (with PROC replaced by the process number) and waits for all."""
+    prelude = f"import sys; sys.path.insert(0, {ROOT!r})\n"
+    procs = [
+        subprocess.Popen([sys.executable, "-c", prelude + textwrap.dedent(script).replace("PROC", str(i))],
+                         cwd=str(tmp_path), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for i in range(n)
+    ]
+    for p in procs:
+        _, err = p.communicate(timeout=120)
+        assert p.returncode == 0, err.decode()
+
+
+@pytest.fixture
+def tess_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TESS_DIR", str(tmp_path))
+    monkeypatch.setitem(Config._data, "memory", {"fsync_interval_ms": 50, "compact_after": 1000})
+    monkeypatch.setattr(UserProfile, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(UserProfile, "PROFILE_PATH", str(tmp_path / "user_profile.json"))
+    return tmp_path
+
+
+class TestLockedUpdate:
+    def test_concurrent_processes_lose_no_increments(self, tmp_path):
+        counter = tmp_path / "counter.json"
+        run_processes(4, f"""
+            from tess_cli.core.shared_state import locked_update
+            for _ in range(50):
+                locked_update({str(counter)!r}, lambda d: d.update(n=d["n"] + 1), default={{"n": 0}})
+        """, tmp_path)
+        assert json.loads(counter.read_text()) == {"n": 200}
+
+    def test_merge_keeps_both_sides(self):
+        base = {"name": None, "facts": ["a"], "stats": {"commands": 5, "last": "mon"}}
+        ours = {"name": "Sam", "facts": ["a", "b"], "stats": {"commands": 7, "last": "tue"}}
+        theirs = {"name": None, "facts": ["a", "c"], "stats": {"commands": 6, "last": "mon"}}
+        assert merge_changes(theirs, base, ours) == {
+            "name": "Sam", "facts": ["a", "c", "b"], "stats": {"commands": 8, "last": "tue"}
+        }
+
+
+class TestProfile:
+    def test_saves_from_two_instances_merge(self, tess_dir):
+        a = UserProfile()
+        b = UserProfile()
+        a.learn_fact("likes chess")
+        b.learn_fact("works nights")
+        b.track_command("memory_op")
+
+        data = json.loads((tess_dir / "user_profile.json").read_text())
+        assert [f["text"] for f in data["facts"]] == ["likes chess", "works nights"]
+        assert data["stats"]["total_sessions"] == 2
+        assert data["stats"]["total_commands"] == 1
+        assert "works nights" in a.get_facts_context()
+
+    def test_other_process_writes_are_seen(self, tess_dir):
+        profile = UserProfile()
+        run_processes(3, f"""
+            from tess_cli.core.user_profile import UserProfile
+            UserProfile.PROFILE_DIR = {str(tess_dir)!r}
+            UserProfile.PROFILE_PATH = {str(tess_dir / "user_profile.json")!r}
+            p = UserProfile()
+            p.learn_fact("fact from process PROC")
+        """, tess_dir)
+        profile.track_command()
+        assert profile.get_stats_summary()["sessions"] == 4
+        assert profile.get_stats_summary()["commands"] == 1
+        assert sorted(f["text"] for f in profile.data["facts"]) == [f"fact from process {i}" for i in range(3)]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+class TestSharedMemory:
+    def test_processes_writing_one_user_keep_every_memory(self, tess_dir, backend):
+        Config._data["memory"]["backend"] = backend
+        engine = MemoryEngine("shared")
+        engine.store_memory("written before the others started")
+        run_processes(3, f"""
+            from tess_cli.core.config import Config
+            Config.TESS_DIR = {str(tess_dir)!r}
+            Config._data["memory"] = {{"backend": {backend!r}, "compact_after": 40, "dedup": False}}
+            from tess_cli.core.memory_engine import MemoryEngine
+            engine = MemoryEngine("shared")
+            for n in range(60):
+                engine.store_memory(f"process PROC note {{n}}")
+            engine.store.journal.compact() if hasattr(engine.store, "journal") else None
+        """, tess_dir)
+
+        # Visible to the running engine without a restart
+        assert engine.count() == 181
+        assert len({m["id"] for m in engine.memories}) == 181
+        assert engine.retrieve_context("process 2 note 59", 1) == ["process 2 note 59"]
+
+    def test_engines_in_one_process_see_each_other(self, tess_dir, backend):
+        Config._data["memory"]["backend"] = backend
+        a, b = MemoryEngine("pair"), MemoryEngine("pair")
+        a.store_memory("the wifi password is on the fridge")
+        assert b.retrieve_context("wifi password") == ["the wifi password is on the fridge"]
+        b.store.remove([m["id"] for m in b.memories])
+        assert a.count() == 0
+
+
+class TestSkills:
+    def test_skill_taught_elsewhere_is_listed(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        here, there = SkillManager("u1"), SkillManager("u1")
+
+        class Planner:
+            def create_plan(self, goal):
+                return [{"action": "launch_app", "app_name": "spotify"}]
+
+        there.learn_skill("morning", "play music", Planner())
+        assert here.list_skills() == ["morning"]
+        assert here.get_skill("MORNING")["goal"] == "play music"
+        assert here.delete_skill("morning")
+        assert there.list_skills() == []
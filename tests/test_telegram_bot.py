@@ -0,0 +1,83 @@
+"""
+Tests for the Telegram front end — turns from one user are serialised, other users overlap.
+"""
+
+import os
+import sys
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+pytest.importorskip("telegram")
+
+from tess_cli.core.config import Config
+from tess_cli.interfaces import telegram_bot
+
+
+class SlowBrain:
+    """Records when each turn starts and ends; the first turn is the slow one."""
+    def __init__(self, events):
+        self.events = events
+
+    async def agenerate_command(self, text, on_token=None):
+        self.events.append(("start", text))
+        await asyncio.sleep(0.05 if text == "one" else 0)
+        self.events.append(("end", text))
+        return {"action": "reply_op", "content": text}
+
+
+class FakeProfiles:
+    def __init__(self, events):
+        self.brains = {}
+        self.events = events
+
+    def get_brain(self, user_id):
+        return self.brains.setdefault(user_id, SlowBrain(self.events))
+
+
+class FakeBot:
+    async def send_message(self, chat_id, text, **kwargs):
+        async def edit_text(text):
+            pass
+        return SimpleNamespace(edit_text=edit_text)
+
+
+def update(user_id, text):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=SimpleNamespace(id=user_id),
+                           message=SimpleNamespace(text=text))
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    monkeypatch.setattr(Config, "TELEGRAM_BOT_TOKEN", "123:test")
+    monkeypatch.setattr(telegram_bot, "process_action", lambda *args: None)
+    events = []
+    bot = telegram_bot.TessBot(FakeProfiles(events), *([None] * 10))
+    return bot, events
+
+
+class TestTurnOrdering:
+    def test_one_users_updates_run_in_order(self, bot):
+        bot, events = bot
+        context = SimpleNamespace(bot=FakeBot())
+
+        async def both():
+            await asyncio.gather(bot.handle_message(update(1, "one"), context),
+                                 bot.handle_message(update(1, "two"), context))
+
+        asyncio.run(both())
+        assert events == [("start", "one"), ("end", "one"), ("start", "two"), ("end", "two")]
+
+    def test_different_users_overlap(self, bot):
+        bot, events = bot
+        context = SimpleNamespace(bot=FakeBot())
+
+        async def both():
+            await asyncio.gather(bot.handle_message(update(1, "one"), context),
+                                 bot.handle_message(update(2, "two"), context))
+
+        asyncio.run(both())
+        assert events.index(("start", "two")) < events.index(("end", "one"))
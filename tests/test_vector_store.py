@@ -0,0 +1,486 @@
+"""
+Tests for the built-in vector store — memory-mapped storage, cosine top-k and the KnowledgeBase fallback.
+"""
+
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tess_cli.core.config import Config
+from tess_cli.core.vector_store import HashingEmbedder, LocalVectorStore
+
+
+class TinyEmbedder:
+    """Orthogonal axes per keyword, so expected neighbours are exact."""
+    dim = 4
+    name = "tiny"
+    WORDS = ["cat", "dog", "car", "tree"]
+
+    def __call__(self, texts):
+        return np.array([[t.count(w) for w in self.WORDS] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalVectorStore(str(tmp_path), name="test", embedding_function=TinyEmbedder())
+
+
+class TestLocalVectorStore:
+    def test_query_ranks_by_cosine(self, store):
+        store.upsert(ids=["a", "b", "c"], documents=["cat cat", "dog", "cat dog"],
+                     metadatas=[{"source": "x"}, {"source": "y"}, {"source": "z"}])
+        result = store.query(query_texts=["cat"], n_results=2)
+        assert result["ids"] == [["a", "c"]]
+        assert result["metadatas"][0][0] == {"source": "x"}
+        assert result["distances"][0][0] == pytest.approx(0, abs=1e-3)
+
+    def test_upsert_replaces_and_delete_frees_rows(self, store):
+        store.upsert(ids=["a", "b"], documents=["cat", "dog"])
+        assert store.query(["cat"], 1)["ids"] == [["a"]]  # Builds the float32 cache
+        store.upsert(ids=["a"], documents=["tree"])
+        assert store.query(["tree"], 1)["documents"] == [["tree"]]
+
+        store.delete(ids=["b"])
+        assert store.count() == 1
+        assert store.query(["dog"], 5)["ids"] == [["a"]]
+        store.add(ids=["c"], documents=["car"])
+        assert store._size == 2  # Row of "b" was reused
+        assert store.query(["car"], 1)["ids"] == [["c"]]
+
+    def test_delete_where_and_get(self, store):
+        store.upsert(ids=["a", "b", "c"], documents=["cat", "dog", "car"],
+                     metadatas=[{"source": "f1"}, {"source": "f1"}, {"source": "f2"}])
+        assert store.get(where={"source": "f1"})["ids"] == ["a", "b"]
+        store.delete(where={"source": "f1"})
+        assert store.get()["ids"] == ["c"]
+
+    def test_persists_and_grows(self, tmp_path):
+        LocalVectorStore.INITIAL_CAPACITY, initial = 4, LocalVectorStore.INITIAL_CAPACITY
+        try:
+            store = LocalVectorStore(str(tmp_path), name="grow", embedding_function=TinyEmbedder())
+            store.upsert(ids=[str(i) for i in range(10)], documents=["dog"] * 9 + ["tree"])
+            assert store.matrix.shape[0] >= 10 and store.matrix.dtype == np.float16
+        finally:
+            LocalVectorStore.INITIAL_CAPACITY = initial
+
+        reopened = LocalVectorStore(str(tmp_path), name="grow", embedding_function=TinyEmbedder())
+        assert reopened.count() == 10
+        assert reopened.query(["tree"], 1)["ids"] == [["9"]]
+
+    def test_embedder_change_reembeds(self, tmp_path):
+        store = LocalVectorStore(str(tmp_path), name="swap", embedding_function=TinyEmbedder())
+        store.upsert(ids=["a", "b"], documents=["the cat sat", "a red car"])
+        swapped = LocalVectorStore(str(tmp_path), name="swap", embedding_function=HashingEmbedder(dim=64))
+        assert swapped.matrix.shape[1] == 64
+        assert swapped.query(["cat sat"], 1)["ids"] == [["a"]]
+
+
+class TestHashingEmbedder:
+    def test_similar_text_is_closer(self):
+        embed = HashingEmbedder()
+        a, b, c = embed(["reset my router password", "how to reset the router password", "bake a chocolate cake"])
+        cos = lambda x, y: float(x @ y / np.linalg.norm(x) / np.linalg.norm(y))
+        assert cos(a, b) > cos(a, c)
+
+
+class TestKnowledgeBaseFallback:
+    def test_learns_directory_without_chroma(self, tmp_path, monkeypatch):
+        from tess_cli.core import knowledge_base
+        monkeypatch.setattr(knowledge_base, "CHROMADB_AVAILABLE", False)
+        monkeypatch.setattr(Config, "TESS_DIR", str(tmp_path / "tess"))
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "router.md").write_text("To reset the router password, hold the button for ten seconds.")
+        (docs / "cake.txt").write_text("Chocolate cake needs cocoa, flour and eggs.")
+
+        kb = knowledge_base.KnowledgeBase(db_path=str(tmp_path / "vectors"))
+        assert kb.available and isinstance(kb.collection.collection, LocalVectorStore)
+        assert "Successfully indexed 2 files" in kb.learn_directory(str(docs))
+        assert "router.md" in kb.search("router password reset", n_results=1)
+        assert "Vector DB: 2 chunks" in kb.get_stats()
+
+
+@pytest.fixture
+def local_kb(tmp_path, monkeypatch):
+    from tess_cli.core import knowledge_base
+    monkeypatch.setattr(knowledge_base, "CHROMADB_AVAILABLE", False)
+    monkeypatch.setattr(Config, "TESS_DIR", str(tmp_path / "tess"))
+    return knowledge_base.KnowledgeBase(db_path=str(tmp_path / "vectors"))
+
+
+class TestMemoryDedup:
+    def test_dedup_index_reads_only_memories(self, local_kb, tmp_path, monkeypatch):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "notes.md").write_text("notes about the build\n")
+        local_kb.learn_directory(str(docs))
+        local_kb.store_memory("The user prefers dark mode", {"type": "explicit_fact"})
+        local_kb._dedup = None  # As after a restart
+
+        store = local_kb.collection.collection
+        reads = []
+        real_get = store.get
+        monkeypatch.setattr(store, "get", lambda **kwargs: reads.append(real_get(**kwargs)) or reads[-1])
+        local_kb.store_memory("The user prefers dark mode!")
+
+        assert local_kb.collection.count() == 2  # The near-duplicate was not added
+        assert [r["ids"] for r in reads] == [[i for i in real_get()["ids"] if i.startswith("mem_")]]
+        assert local_kb.collection.get(where={"kind": "memory"})["metadatas"] == [
+            {"type": "explicit_fact", "kind": "memory"}]
+
+
+class TestMemoryArchive:
+    def test_evicted_memories_are_recalled_only_from_the_archive(self, local_kb, monkeypatch):
+        monkeypatch.setitem(Config._data["memory"], "max_entries_per_user", 4)
+        monkeypatch.setitem(Config._data["memory"], "evict_to", 0.5)
+        local_kb.store_memory("The wifi password is written under the router")
+        for text in ["User likes jazz records", "Dentist appointment moved to Friday",
+                     "Project deadline is in March", "The cat is called Miso"]:
+            local_kb.store_memory(text)
+
+        # Five memories over a cap of four: the three coldest went to the archive and left the vector DB
+        assert local_kb.collection.count() == 2
+        assert "wifi" not in local_kb.search("wifi password router", n_results=2)
+        recalled = local_kb.search("wifi password router", n_results=2, include_archive=True)
+        assert "[Source: memory archive] ---\nThe wifi password is written under the router" in recalled
+
+
+class TestIncrementalLearning:
+    def test_unchanged_files_are_skipped(self, local_kb, tmp_path, monkeypatch):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        for i in range(3):
+            (docs / f"note{i}.md").write_text(f"note number {i}")
+        assert "indexed 3 files" in local_kb.learn_directory(str(docs))
+
+        upserts = []
+        real_upsert = local_kb.collection.upsert
+        monkeypatch.setattr(local_kb.collection, "upsert", lambda **kw: upserts.append(kw["ids"]) or real_upsert(**kw))
+        (docs / "note1.md").write_text("note number one, rewritten")
+        os.utime(docs / "note2.md")  # Touched but identical
+
+        result = local_kb.learn_directory(str(docs))
+        assert "indexed 1 files" in result and "(2 unchanged, 0 removed)" in result
+        assert upserts == [[f"{docs / 'note1.md'}_0"]]
+
+    def test_shrunk_and_deleted_files_leave_no_chunks(self, local_kb, tmp_path):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "long.txt").write_text("x" * 4000)   # 3 chunks
+        (docs / "gone.txt").write_text("soon deleted")
+        local_kb.learn_directory(str(docs))
+        assert local_kb.collection.count() == 4
+
+        (docs / "long.txt").write_text("short now")
+        (docs / "gone.txt").unlink()
+        assert "(0 unchanged, 1 removed)" in local_kb.learn_directory(str(docs))
+        assert local_kb.collection.get()["ids"] == [f"{docs / 'long.txt'}_0"]
+
+    def test_chunks_from_before_the_manifest_are_cleaned_up(self, local_kb, tmp_path):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "a.md").write_text("current text")
+        stale = str(docs / "a.md")
+        local_kb.collection.upsert(ids=[f"{stale}_0", f"{stale}_1", f"{docs / 'old.md'}_0"],
+                                   documents=["old", "old", "old"],
+                                   metadatas=[{"source": stale, "chunk_index": 0}, {"source": stale, "chunk_index": 1},
+                                              {"source": str(docs / "old.md"), "chunk_index": 0}])
+        local_kb.learn_directory(str(docs))
+        assert local_kb.collection.get()["ids"] == [f"{stale}_0"]
+
+
+class TestIngestPipeline:
+    def test_files_are_stored_in_multi_file_batches(self, local_kb, tmp_path, monkeypatch):
+        docs = tmp_path / "docs"
+        (docs / "sub").mkdir(parents=True)
+        for i in range(10):
+            (docs / ("sub" if i % 2 else ".") / f"f{i}.txt").write_text(f"file {i}")
+        monkeypatch.setitem(Config._data, "memory", {"ingest_workers": 3, "ingest_batch_chunks": 4})
+        upserts, reports = [], []
+        real_upsert = local_kb.collection.upsert
+        monkeypatch.setattr(local_kb.collection, "upsert", lambda **kw: upserts.append(len(kw["ids"])) or real_upsert(**kw))
+
+        assert "indexed 10 files" in local_kb.learn_directory(str(docs), progress=reports.append)
+        assert upserts == [4, 4, 2]
+        assert local_kb.collection.count() == 10
+        assert [r["chunks"] for r in reports] == [4, 8, 10, 10]
+        assert reports[-1]["scanned"] == 10
+
+    def test_walker_skips_state_directories_by_name(self, tmp_path):
+        from tess_cli.core.ingest import scan_files
+        for d in [".git", "vector_db", "src/__pycache__", "my_vector_db_notes"]:
+            (tmp_path / d).mkdir(parents=True)
+            (tmp_path / d / "x.py").write_text("x = 1")
+        (tmp_path / "src" / "main.py").write_text("main")
+        (tmp_path / "src" / "image.png").write_bytes(b"\x89PNG")
+
+        found = sorted(os.path.relpath(p, tmp_path) for p, _ in scan_files(str(tmp_path)))
+        assert found == [os.path.join("my_vector_db_notes", "x.py"), os.path.join("src", "main.py")]
+
+
+class CountingEmbedder(TinyEmbedder):
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return super().__call__(texts)
+
+
+class TestEmbeddingService:
+    def test_cached_texts_are_not_embedded_again(self, tmp_path):
+        from tess_cli.core.embedding_service import EmbeddingCache, EmbeddingService
+        model = CountingEmbedder()
+        service = EmbeddingService(model, EmbeddingCache(str(tmp_path / "cache.db")))
+        first = service(["cat nap", "dog walk", "cat nap"])
+        assert model.calls == [["cat nap", "dog walk"]]
+
+        # A later run (new service, same cache file) re-embeds only what is new
+        model2 = CountingEmbedder()
+        again = EmbeddingService(model2, EmbeddingCache(str(tmp_path / "cache.db")))(["dog walk", "tree house", "cat nap"])
+        assert model2.calls == [["tree house"]]
+        np.testing.assert_allclose(again[[2, 0]], first[[0, 1]])
+
+    def test_concurrent_callers_share_batches(self):
+        from tess_cli.core.embedding_service import EmbeddingService
+        model = CountingEmbedder(delay=0.05)
+        service = EmbeddingService(model, cache=None, max_batch=64)
+        results = {}
+        threads = [threading.Thread(target=lambda i=i: results.update({i: service([f"doc {i}"])})) for i in range(12)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        assert len(results) == 12
+        assert sum(len(c) for c in model.calls) == 12
+        assert len(model.calls) < 12
+        assert service.stats["embedded"] == 12
+
+    def test_knowledge_base_reuses_vectors_across_stores(self, local_kb, tmp_path):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "a.md").write_text("some project notes")
+        local_kb.learn_directory(str(docs))
+        embedded = local_kb.embedder.stats["embedded"]
+
+        from tess_cli.core.knowledge_base import KnowledgeBase
+        other = KnowledgeBase(db_path=str(tmp_path / "other_vectors"))
+        assert other.embedder is local_kb.embedder
+        other.learn_directory(str(docs))
+        assert local_kb.embedder.stats["embedded"] == embedded
+        assert "Embeddings:" in other.get_stats()
+
+
+class TestHybridSearch:
+    @pytest.fixture
+    def retriever(self, tmp_path):
+        from tess_cli.core.retrieval import HybridRetriever, IndexedCollection, LexicalIndex
+        collection = IndexedCollection(LocalVectorStore(str(tmp_path), name="hybrid", embedding_function=TinyEmbedder()),
+                                       LexicalIndex(str(tmp_path / "lexical.db")))
+        collection.upsert(ids=["pets", "config", "trees"],
+                          documents=["the cat and the dog", "def load_config(): raise ConfigMissingError", "tree tree tree"],
+                          metadatas=[{"source": "pets.md"}, {"source": "src/settings_loader.py"}, {"source": "trees.md"}])
+        return HybridRetriever(collection, collection.lexical)
+
+    def test_exact_identifiers_and_file_names_rank_first(self, retriever):
+        for query in ["load_config", "ConfigMissingError", "settings_loader.py"]:
+            top = retriever.retrieve(query, n_results=2)[0]
+            assert top["id"] == "config", query
+            assert top["lexical_rank"] == 1 and top["source"] == "src/settings_loader.py"
+            assert top["score"] > 0
+
+    def test_found_by_both_sides_beats_found_by_one(self, retriever):
+        from tess_cli.core.retrieval import reciprocal_rank_fusion
+        fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]])
+        assert max(fused, key=fused.get) == "b"
+
+        hits = retriever.retrieve("cat tree", n_results=2)
+        assert {h["id"] for h in hits} == {"pets", "trees"}
+        assert all(h["vector_rank"] and h["lexical_rank"] for h in hits)
+
+    def test_lexical_answers_when_vector_search_fails(self, retriever, monkeypatch):
+        def down(**_): raise ConnectionError("vector store down")
+        monkeypatch.setattr(retriever.collection.collection, "query", down)
+        hits = retriever.retrieve("load_config", n_results=1)
+        assert [h["id"] for h in hits] == ["config"] and hits[0]["vector_rank"] is None
+
+    def test_reranker_reorders_candidates(self, retriever):
+        retriever.reranker = lambda query, texts: [-len(t) for t in texts]  # Shortest first
+        hits = retriever.retrieve("cat dog", n_results=3)
+        assert [h["id"] for h in hits] == ["trees", "pets", "config"]
+        assert hits[0]["score"] == -len("tree tree tree")
+
+    def test_chunks_written_before_the_lexical_index_are_searchable(self, local_kb):
+        local_kb.collection.collection.upsert(ids=["old_0"], documents=["the ERR_CERT_DATE_INVALID fix"],
+                                              metadatas=[{"source": "notes.md"}])
+        result = local_kb.search("ERR_CERT_DATE_INVALID", n_results=1)
+        assert "[Source: notes.md | score" in result and "fix" in result
+
+
+class TestQueryCache:
+    def test_repeated_queries_skip_the_vector_store(self, local_kb, monkeypatch):
+        local_kb.collection.upsert(ids=["n_0"], documents=["the router password is on the sticker"],
+                                   metadatas=[{"source": "notes.md"}])
+        queries = []
+        real_query = local_kb.collection.collection.query
+        monkeypatch.setattr(local_kb.collection.collection, "query",
+                            lambda **kw: queries.append(kw) or real_query(**kw))
+
+        first = local_kb.search_memory("Router password?", n_results=1)
+        assert local_kb.search_memory("  router PASSWORD ", n_results=1) == first
+        assert local_kb.retrieve("router password", n_results=1)[0]["id"] == "n_0"
+        assert local_kb.retrieve("router password.", n_results=1)[0]["id"] == "n_0"
+        assert len(queries) == 1
+        assert local_kb.query_cache.hits == 3
+
+        local_kb.search_memory("router password", n_results=2)
+        assert len(queries) == 2  # n_results is part of the key
+
+    def test_writes_invalidate_cached_results(self, local_kb):
+        assert "wifi" not in local_kb.search("wifi password", n_results=1)
+        local_kb.store_memory("the wifi password is hunter2")
+        assert "hunter2" in local_kb.search("wifi password", n_results=1)
+
+        local_kb.collection.upsert(ids=["w_0"], documents=["guest wifi password: welcome"],
+                                   metadatas=[{"source": "guest.md"}])
+        assert "guest.md" in local_kb.search("guest wifi password", n_results=3)
+        local_kb.collection.delete(ids=["w_0"])
+        assert "guest.md" not in local_kb.search("guest wifi password", n_results=3)
+
+    def test_least_recently_used_entry_is_dropped(self):
+        from tess_cli.core.retrieval import QueryCache
+        cache = QueryCache(max_entries=2)
+        cache.put("a", 0, 1)
+        cache.put("b", 0, 2)
+        assert cache.get("a", 0) == 1
+        cache.put("c", 0, 3)
+        assert cache.get("b", 0) is None and cache.get("a", 0) == 1 and cache.get("c", 0) == 3
+        assert cache.get("a", 1) is None  # Stale generation
+
+
+class TestStreamingIngest:
+    def test_streamed_chunks_do_not_depend_on_the_read_window(self, tmp_path):
+        from tess_cli.core.chunkers import TokenWindowChunker
+        from tess_cli.core.ingest import read_chunks
+        text = "".join(f"line {i} café — résumé\r\n" for i in range(400))
+        path = tmp_path / "doc.txt"
+        path.write_bytes(text.encode("utf-8"))
+
+        expected = None
+        for window in (7, 1000, 1 << 20):  # Windows split \r\n pairs and multi-byte characters
+            skip, digest, chunks = read_chunks(str(path), TokenWindowChunker(max_tokens=100), window=window)
+            assert skip is None
+            expected = expected or chunks
+            assert chunks == expected
+        assert "".join(c["text"] for c in expected) == text.replace("\r\n", "\n")
+        assert expected[0]["start_line"] == 1 and expected[-1]["end_line"] == 400
+
+    def test_binary_minified_and_oversized_files_are_skipped(self, local_kb, tmp_path, monkeypatch):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "notes.md").write_text("plain notes")
+        (docs / "dump.json").write_text("[" + ",".join(['{"k": 1}'] * 2000) + "]")
+        (docs / "app.min.js").write_text("var a=1;")
+        (docs / "blob.txt").write_bytes(b"\x00\x01\x02" * 100)
+        (docs / "huge.txt").write_text(("x" * 99 + "\n") * 30000)
+        monkeypatch.setitem(Config._data, "memory", {"ingest_max_file_mb": 2})
+
+        result = local_kb.learn_directory(str(docs))
+        assert "indexed 1 files" in result
+        assert "skipped 2 minified, 1 binary, 1 too large" in result
+        assert {m["source"] for m in local_kb.collection.get()["metadatas"]} == {str(docs / "notes.md")}
+
+    def test_file_that_becomes_unindexable_loses_its_chunks(self, local_kb, tmp_path):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "data.txt").write_text("readable for now")
+        local_kb.learn_directory(str(docs))
+        assert local_kb.collection.count() == 1
+
+        (docs / "data.txt").write_bytes(b"\x00" * 64)
+        assert "skipped 1 binary" in local_kb.learn_directory(str(docs))
+        assert local_kb.collection.count() == 0
+
+    def test_run_budget_keeps_the_rest_for_later(self, local_kb, tmp_path, monkeypatch):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        for i in range(4):
+            (docs / f"f{i}.txt").write_text(("y" * 99 + "\n") * 1000)
+        monkeypatch.setitem(Config._data, "memory", {"ingest_max_run_mb": 0.25})
+
+        assert "indexed 2 files" in local_kb.learn_directory(str(docs))
+        assert "indexed 2 files in" in local_kb.learn_directory(str(docs)) and local_kb.collection.count() > 0
+        assert "(4 unchanged" in local_kb.learn_directory(str(docs))
+
+
+class TestSnapshots:
+    def test_get_pages_and_returns_embeddings(self, store):
+        store.upsert(ids=["a", "b", "c"], documents=["cat", "dog", "car"])
+        page = store.get(include=["documents", "embeddings"], limit=2, offset=1)
+        assert page["ids"] == ["b", "c"]
+        assert page["embeddings"].tolist() == [[0, 1, 0, 0], [0, 0, 1, 0]]
+
+    def test_round_trip_loads_without_re_embedding(self, local_kb, tmp_path):
+        from tess_cli.core import knowledge_base
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        for i in range(3):
+            (docs / f"note{i}.md").write_text(f"note {i} about config_loader\n")
+        local_kb.learn_directory(str(docs))
+        local_kb.store_memory("The user prefers dark mode", {"type": "fact"})
+        snapshot = tmp_path / "kb.zip"
+        assert "Exported 4 chunks and 3 learned files" in local_kb.export_snapshot(str(snapshot))
+
+        fresh = knowledge_base.KnowledgeBase(db_path=str(tmp_path / "other"))
+        embedded = fresh.embedder.stats["embedded"]
+        assert "Imported 4 chunks" in fresh.import_snapshot(str(snapshot))
+        assert fresh.embedder.stats["embedded"] == embedded
+
+        before, after = local_kb.collection.get(include=["embeddings"]), fresh.collection.get(include=["embeddings"])
+        assert after["ids"] == before["ids"] and after["metadatas"] == before["metadatas"]
+        assert np.allclose(after["embeddings"], before["embeddings"], atol=1e-3)
+        assert fresh.retrieve("config_loader", n_results=1)[0]["metadata"]["source"].startswith(str(docs))
+        assert "(3 unchanged" in fresh.learn_directory(str(docs))
+
+    def test_embeddings_are_memory_mapped_from_the_zip(self, local_kb, tmp_path):
+        import zipfile
+        from tess_cli.core.kb_snapshot import open_embeddings
+        local_kb.store_memory("first memory")
+        local_kb.store_memory("a second, different memory")
+        snapshot = tmp_path / "kb.zip"
+        local_kb.export_snapshot(str(snapshot))
+        with zipfile.ZipFile(snapshot) as zf:
+            vectors = open_embeddings(str(snapshot), zf)
+            assert isinstance(vectors, np.memmap) and vectors.dtype == np.float16
+            assert np.allclose(vectors, local_kb.collection.get(include=["embeddings"])["embeddings"], atol=1e-3)
+
+    def test_newer_formats_other_embedders_and_other_files_are_refused(self, local_kb, tmp_path, monkeypatch):
+        import json
+        import zipfile
+        local_kb.store_memory("something worth keeping")
+        snapshot = tmp_path / "kb.zip"
+        local_kb.export_snapshot(str(snapshot))
+
+        newer = tmp_path / "newer.zip"
+        with zipfile.ZipFile(snapshot) as src, zipfile.ZipFile(newer, "w") as dst:
+            for item in src.infolist():
+                data = src.read(item)
+                if item.filename == "snapshot.json":
+                    data = json.dumps(dict(json.loads(data), version=99))
+                dst.writestr(item, data)
+        assert "newer than this TESS reads" in local_kb.import_snapshot(str(newer))
+
+        other = tmp_path / "other.zip"
+        with zipfile.ZipFile(other, "w") as zf:
+            zf.writestr("readme.txt", "hello")
+        assert "not a TESS knowledge-base snapshot" in local_kb.import_snapshot(str(other))
+
+        monkeypatch.setattr(local_kb.embedder, "name", "some-other-model")
+        assert "re-embedded" in local_kb.import_snapshot(str(snapshot))